@@ -0,0 +1,207 @@
+"""
+엔드포인트별 요청 수락 제어 (admission control)
+
+요청 하나가 여러 번의 느린 LLM 호출로 퍼지므로, 동시에 처리하는 요청 수를 엔드포인트마다 제한하고
+나머지는 크기가 정해진 대기열에서 기다리게 한다.
+- 동시 처리 상한(max_in_flight)을 넘으면 대기열(max_queue)에 넣고, 요청마다 대기 마감 시각(queue_timeout)을 둔다.
+- 대기열이 가득 차면 즉시 429, 마감까지 차례가 오지 않거나 예상 대기시간이 마감을 넘으면 503으로 응답한다.
+  둘 다 최근 처리 시간으로 추정한 Retry-After 헤더를 붙인다.
+- ASGI 미들웨어로 응답 본문(SSE 스트리밍 포함)을 다 보낼 때까지 슬롯을 잡고 있는다.
+- 대기열 길이, 대기 시간, 거절 수를 stats()로 노출한다.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+
+load_dotenv()
+
+
+class AdmissionRejected(Exception):
+    """수락하지 못한 요청 (status_code: 429 또는 503, retry_after: 초)"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    엔드포인트 하나의 동시 처리 슬롯과 FIFO 대기열.
+
+    Args:
+        name (str): 엔드포인트 경로 (로그/통계용)
+        max_in_flight (int): 동시에 처리하는 요청 수 (0이면 제한 없음)
+        max_queue (int): 슬롯을 기다릴 수 있는 요청 수
+        queue_timeout (float): 요청마다 슬롯을 기다리는 최대 시간(초)
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self.service_time: Optional[float] = None     # 최근 처리 시간의 지수 이동 평균(초)
+
+        # 통계
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.peak_queue = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """대기열 position번째 요청이 슬롯을 얻기까지 예상 시간(초). 처리 시간 기록이 없으면 0."""
+        if not self.service_time or not self.max_in_flight:
+            return 0.0
+        return math.ceil(position / self.max_in_flight) * self.service_time
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait(len(self._waiters) + 1)))
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        if status_code == 429:
+            self.rejected_full += 1
+        else:
+            self.rejected_deadline += 1
+        print(f"Admission '{self.name}': {reason} → {status_code} (대기 {len(self._waiters)}, 처리 중 {self.in_flight})")
+        return AdmissionRejected(status_code, self._retry_after(), reason)
+
+    async def acquire(self) -> None:
+        """
+        처리 슬롯을 얻는다. 얻지 못하면 AdmissionRejected를 던진다.
+
+        Raises:
+            AdmissionRejected: 대기열이 가득 참(429) / 대기 마감 초과 또는 초과 예상(503)
+        """
+        if not self.max_in_flight or (self.in_flight < self.max_in_flight and not self._waiters):
+            self.in_flight += 1
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(429, "대기열 가득 참")
+        if self.estimated_wait(len(self._waiters) + 1) > self.queue_timeout:
+            # 마감 전에 차례가 오지 않을 요청은 기다리게 하지 않고 바로 돌려보낸다
+            raise self._reject(503, "예상 대기시간이 마감 초과")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._waiters.remove(future)
+                future.cancel()
+                raise self._reject(503, f"{self.queue_timeout:.0f}초 안에 차례가 오지 않음")
+        except asyncio.CancelledError:
+            # 슬롯을 넘겨받은 직후 취소됐으면 다음 요청에 넘긴다
+            if future.done() and not future.cancelled():
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+                future.cancel()
+            raise
+        self._admit(time.monotonic() - start)
+
+    def release(self, elapsed: Optional[float] = None) -> None:
+        """처리가 끝난 슬롯을 대기열의 다음 요청에 넘기거나 반납한다."""
+        if elapsed is not None:
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)     # 슬롯을 그대로 넘기므로 in_flight는 그대로
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "peak_queue_depth": self.peak_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_full": self.rejected_full,
+            "rejected_deadline": self.rejected_deadline,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_service_ms": round(self.service_time * 1000, 1) if self.service_time else None,
+        }
+
+
+def build_controllers(paths: list[str]) -> dict[str, AdmissionController]:
+    """
+    경로마다 수락 제어기를 만든다. 기본값은 ADMISSION_MAX_IN_FLIGHT / ADMISSION_MAX_QUEUE / ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_LIMITS="/qna=8:16,/newquestions=4:8"(경로=max_in_flight:max_queue)로 경로별로 바꿀 수 있다.
+    """
+    max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+    max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+    queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    limits = {}
+    for item in filter(None, (part.strip() for part in os.getenv("ADMISSION_LIMITS", "").split(","))):
+        path, _, values = item.rpartition("=")
+        in_flight, _, queue = values.partition(":")
+        limits[path] = (int(in_flight), int(queue or max_queue))
+    return {
+        path: AdmissionController(path, *limits.get(path, (max_in_flight, max_queue)), queue_timeout)
+        for path in paths
+    }
+
+
+class AdmissionMiddleware:
+    """
+    등록된 경로의 POST 요청을 해당 제어기로 수락/대기/거절하는 ASGI 미들웨어.
+
+    Args:
+        app: 감쌀 ASGI 앱
+        controllers: 경로 → AdmissionController
+    """
+
+    def __init__(self, app, controllers: dict[str, AdmissionController]):
+        self.app = app
+        self.controllers = controllers
+
+    async def __call__(self, scope, receive, send):
+        controller = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            controller = self.controllers.get(scope["path"])
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - start)
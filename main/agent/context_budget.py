@@ -0,0 +1,157 @@
+import math
+import os
+import re
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from agent.transitions import STATUS_PATTERN
+
+load_dotenv()
+
+# 노드별로 참고하는 에이전트 출력 (사용자 메시지는 항상 포함)
+CONTEXT_NEEDS = {
+    "ExplainTheoryAgent": ["ProblemSolving", "ExternalSearch"],
+    "ExternalSearch": ["ExplainTheoryAgent", "ProblemSolving", "ProblemGeneration"],
+    "ProblemSolving": ["ExplainTheoryAgent", "ExternalSearch"],
+    "ProblemGeneration": ["ExplainTheoryAgent", "ExternalSearch"],
+    "GeneratingResponse": ["ExplainTheoryAgent", "ExternalSearch", "ProblemSolving", "ProblemGeneration"],
+    "TaskManager": ["ExplainTheoryAgent", "ExternalSearch", "ProblemSolving", "ProblemGeneration"],
+}
+
+# 원본 이미지를 그대로 받는 노드 (나머지 노드에는 이미지 대신 안내 문구를 넣는다)
+IMAGE_CONSUMERS = {"ProblemSolving"}
+IMAGE_PLACEHOLDER = "[사용자가 문제 이미지를 첨부함]"
+# Gemini가 이미지 한 장에 쓰는 토큰 수
+IMAGE_TOKENS = 258
+
+# TaskManager는 라우팅에 Status와 요지만 필요하므로 에이전트 출력마다 이 길이(토큰)만 남긴다.
+ROUTER_OUTPUT_TOKENS = 150
+
+TRIM_MARKER = "\n...(중략)...\n"
+# 남길 수 있는 길이가 이보다 짧으면(토큰) 잘린 앞부분에 쓸 만한 내용이 없으므로 Status 줄만 보낸다.
+MIN_TRIM_TOKENS = 32
+
+
+def estimate_tokens(content) -> int:
+    """토크나이저 없이 대략적인 토큰 수를 센다 (한글 1자 ≈ 1토큰, 그 외 4자 ≈ 1토큰, 이미지는 고정값)."""
+    if isinstance(content, list):
+        return sum(
+            IMAGE_TOKENS if isinstance(part, dict) and part.get("type") == "image_url"
+            else estimate_tokens(part.get("text", "") if isinstance(part, dict) else str(part))
+            for part in content
+        )
+    hangul = len(re.findall(r"[가-힣]", content))
+    return hangul + math.ceil((len(content) - hangul) / 4)
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """
+    앞부분을 max_tokens까지 남기고, 잘린 경우 마지막 Status 줄은 보존한다.
+    max_tokens가 MIN_TRIM_TOKENS보다 작으면 Status 줄만 남긴다 (Status 줄도 없으면 빈 문자열).
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    status = STATUS_PATTERN.findall(text)
+    tail = f"Status: {status[-1].upper()}" if status else ""
+    if max_tokens < MIN_TRIM_TOKENS:
+        return tail
+    # 토큰 추정치에 맞춰 남길 글자 수를 비례로 계산
+    keep = int(len(text) * max_tokens / estimate_tokens(text))
+    return text[:keep].rstrip() + TRIM_MARKER + tail
+
+
+def _strip_images(content):
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content:
+        if isinstance(part, dict) and part.get("type") == "image_url":
+            parts.append({"type": "text", "text": IMAGE_PLACEHOLDER})
+        else:
+            parts.append(part)
+    return parts
+
+
+class ContextBudget:
+    """
+    agent_node / supervisor_agent에 넘길 메시지를 고른다.
+    - 최신 사용자 메시지 + 해당 노드가 참고하는 에이전트들의 최신 출력만 전달
+    - 전체가 token_budget을 넘으면 오래된 출력부터 줄인다 (앞부분 + Status 줄만 유지)
+    - 전체 기록 대비 실제 전달한 토큰 수를 노드별로 누적한다
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("CONTEXT_BUDGET", "on") != "off"
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+        self.router_token_budget = int(os.getenv("CONTEXT_ROUTER_TOKEN_BUDGET", "1500"))
+        self.full_tokens = defaultdict(int)
+        self.sent_tokens = defaultdict(int)
+        self.calls = defaultdict(int)
+
+    def select(self, messages, node: str, record: bool = True) -> list:
+        """
+        node에게 보낼 메시지 목록을 만든다.
+
+        Args:
+            messages: 그래프 상태의 전체 메시지 기록
+            node (str): 메시지를 받을 노드 이름
+            record (bool): False면 통계에 세지 않는다 (실제로 보내지 않고 입력만 미리 볼 때)
+
+        Returns:
+            list: 선택·축약된 메시지 목록 (시간순)
+        """
+        full = sum(estimate_tokens(m.content) for m in messages)
+        if not self.enabled:
+            if record:
+                self._record(node, full, full)
+            return list(messages)
+
+        users = [m for m in messages if m.name == "User"]
+        # 에이전트마다 가장 최근 출력만 남긴다 (재실행으로 쌓인 이전 출력은 버린다)
+        latest = {}
+        for i, m in enumerate(messages):
+            if m.name in CONTEXT_NEEDS.get(node, []):
+                latest[m.name] = (i, m)
+        outputs = [m for _, m in sorted(latest.values(), key=lambda item: item[0])]
+
+        user = None
+        if users:
+            content = users[-1].content if node in IMAGE_CONSUMERS else _strip_images(users[-1].content)
+            user = HumanMessage(content=content, name="User")
+
+        budget = self.router_token_budget if node == "TaskManager" else self.token_budget
+        remaining = budget - (estimate_tokens(user.content) if user else 0)
+        selected = []
+        # 최신 출력부터 예산을 배정해, 예산이 모자라면 오래된 출력이 줄어든다.
+        for m in reversed(outputs):
+            limit = max(remaining, 0)
+            if node == "TaskManager":
+                limit = min(limit, ROUTER_OUTPUT_TOKENS)
+            content = trim_text(m.content, limit) if isinstance(m.content, str) else m.content
+            if not content:
+                continue
+            remaining -= estimate_tokens(content)
+            selected.append(HumanMessage(content=content, name=m.name))
+        selected.reverse()
+
+        result = ([user] if user else []) + selected
+        if record:
+            self._record(node, full, sum(estimate_tokens(m.content) for m in result))
+        return result
+
+    def _record(self, node: str, full: int, sent: int) -> None:
+        self.calls[node] += 1
+        self.full_tokens[node] += full
+        self.sent_tokens[node] += sent
+
+    def stats(self) -> dict:
+        return {
+            node: {
+                "calls": self.calls[node],
+                "full_tokens": self.full_tokens[node],
+                "sent_tokens": self.sent_tokens[node],
+            }
+            for node in self.calls
+        }
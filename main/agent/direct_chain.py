@@ -0,0 +1,57 @@
+"""
+도구가 필요 없는 에이전트용 단일 호출 체인
+
+ProblemSolving / ProblemGeneration / GeneratingResponse는 더미 도구만 가진 ReAct 에이전트라
+모델이 의미 없는 도구 호출에 턴을 쓰면 LLM 왕복이 두 배가 된다.
+같은 프롬프트를 prompt → model 한 번으로 실행하는 체인을 만들되, 입출력은 create_react_agent와 같게
+({"messages": [...]} → {"messages": [..., AIMessage]}) 맞춰 agent_node에서 그대로 .agent.ainvoke로 부른다.
+"""
+import os
+
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langgraph.prebuilt import create_react_agent
+
+load_dotenv()
+
+# 단일 호출 체인으로 실행할 노드 (쉼표로 구분, 비우면 모두 ReAct 에이전트)
+DIRECT_CHAIN_AGENTS = {
+    name.strip()
+    for name in os.getenv("DIRECT_CHAIN_AGENTS", "ProblemSolving,ProblemGeneration,GeneratingResponse").split(",")
+    if name.strip()
+}
+
+
+def direct_chain(llm, prompt) -> Runnable:
+    """
+    prompt → llm 한 번 호출로 응답하는 체인. 응답 메시지를 입력 메시지 뒤에 붙여 돌려준다.
+
+    Args:
+        llm: langchain 채팅 모델
+        prompt: {messages} 플레이스홀더를 가진 ChatPromptTemplate
+
+    Returns:
+        Runnable: {"messages": [...]}를 받아 {"messages": [..., AIMessage]}를 돌려주는 체인
+    """
+    return (
+        RunnablePassthrough.assign(reply=prompt | llm)
+        | (lambda x: {"messages": [*x["messages"], x["reply"]]})
+    ).with_config(run_name="DirectChain")
+
+
+def build_agent(name: str, llm, tools: list, prompt) -> Runnable:
+    """
+    name이 DIRECT_CHAIN_AGENTS에 있으면 단일 호출 체인을, 아니면 기존 ReAct 에이전트를 만든다.
+
+    Args:
+        name (str): 워크플로 노드 이름 (예: "ProblemSolving")
+        llm: langchain 채팅 모델
+        tools (list): ReAct 모드에서 쓸 도구 목록
+        prompt: 에이전트 프롬프트 (ReAct 모드에서는 state_modifier)
+
+    Returns:
+        Runnable: .ainvoke({"messages": [...]})로 호출하는 에이전트
+    """
+    if name in DIRECT_CHAIN_AGENTS:
+        return direct_chain(llm, prompt)
+    return create_react_agent(llm, tools, state_modifier=prompt)
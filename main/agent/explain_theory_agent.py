@@ -1,13 +1,27 @@
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from llm_registry import llm_registry
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 from langgraph.prebuilt import create_react_agent
-from langchain_community.vectorstores import FAISS
-from langchain.tools import Tool
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+from vector_stores import registry
+from hybrid_search import HybridSearcher
+from merged_search import MergedSearcher
+from embedding_cache import CachedEmbeddings
 import os
 
 load_dotenv()
 
+
+class TheorySearchInput(BaseModel):
+    """theory_search 도구 입력 스키마"""
+    queries: list[str] = Field(
+        description="Search queries for the concept, e.g. ['chain rule derivative', '연쇄법칙 미분']. "
+                    "Include both an English and a Korean phrasing."
+    )
+
+
 class ExplainTheoryAgent:
     """
     LangChain 도구를 사용하여 외부 자료를 검색하고 요약하는 에이전트 클래스.
@@ -18,94 +32,82 @@ class ExplainTheoryAgent:
         # 환경 변수에서 Google API 키를 가져온다.
         GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-        # Google Generative AI Chat 모델을 초기화
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro-preview-06-05",      # 사용할 LLM 모델 이름
+        # 공유 레지스트리에서 Google Generative AI Chat 모델을 가져옴 (같은 모델 설정이면 응답 생성 에이전트와 같은 클라이언트)
+        self.llm = llm_registry.get(
+            "gemini-2.5-pro-preview-06-05",      # 사용할 LLM 모델 이름
             google_api_key=GOOGLE_API_KEY,                # 인증을 위한 API 키
             convert_system_message_to_human=True,          # 시스템 메시지를 인간 메시지처럼 변환
             temperature=0.2                                # 응답 랜덤성 정도 (0 ~ 1)
         )
 
-        # Google Generative AI 임베딩 모델을 초기화
-        base_embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-exp-03-07"      # 사용할 임베딩 모델 경로/이름
+        # Google Generative AI 임베딩 모델을 초기화 (답변 캐시 등 외부에서도 재사용)
+        # 질의 임베딩은 캐시하고, 동시에 들어온 캐시 미스는 한 번의 배치 호출로 묶는다
+        self.embeddings = base_embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model="models/gemini-embedding-exp-03-07"  # 사용할 임베딩 모델 경로/이름
+            ),
+            batch_kwargs={"task_type": "RETRIEVAL_QUERY"},  # 배치 호출도 embed_query와 같은 질의용 벡터로
         )
 
-        # --- 계산학(calcculus) 관련 RAG 도구 구성 ---
-        # 로컬에 저장된 FAISS 벡터스토어를 로드 (벡터 디시리얼라이제이션 허용)
-        cal_vectorstore = FAISS.load_local(
-            "vectorstore",                                # 벡터스토어 디렉터리 이름
-            base_embeddings,                              # 위에서 초기화한 임베딩 객체
-            allow_dangerous_deserialization=True           # 위험할 수 있는 직렬화 해제 허용 여부
-        )
-        # 벡터스토어를 검색기(retriever) 형태로 변환
-        cal_retriever = cal_vectorstore.as_retriever(search_kwargs={"k": 2})
-
-        # 실제 검색을 수행하는 함수 정의 (질문을 입력하면 관련 문서 리스트 반환)
-        def calculus_search_fn(query: str) -> list[dict]:
-            # FAISS retriever를 통해 쿼리와 관련된 문서들을 가져옴
-            docs = cal_retriever.get_relevant_documents(query)
-            # 각 문서에서 필요한 정보만 추출하여 리스트 형태로 반환
-            return [
-                {
-                    "text": doc.page_content,                 # 문서 내용(텍스트)
+        # --- 계산학(calcculus) 교재 + Markdown(md) 한글 학습 가이드 통합 RAG 도구 구성 ---
+        # 로컬 FAISS 벡터스토어들을 레지스트리에 등록 (첫 검색 때 프로세스당 한 번만 로드, 같은 임베딩 객체 사용)
+        registry.register("vectorstore", "vectorstore", base_embeddings)
+        registry.register("md_vectorstore", "md_vectorstore", base_embeddings)
+        # md 가이드는 같은 청크로 만든 BM25 색인과 벡터 검색을 합친 하이브리드 검색기 사용 (헤더 용어가 그대로 맞으면 임베딩 호출 생략)
+        self.md_searcher = HybridSearcher(lambda: registry.get("md_vectorstore"))
+
+        # 교재 검색 함수 (인덱스가 없으면 빈 결과)
+        def calculus_search(query: str, k: int) -> list:
+            store = registry.get("vectorstore")
+            return store.similarity_search(query, k=k) if store else []
+
+        # 두 저장소를 스레드 풀에서 동시에 검색하고 RRF로 합치는 통합 검색기
+        self.searcher = MergedSearcher({
+            "textbook": calculus_search,
+            "guide": self.md_searcher.search,
+        })
+
+        # 검색 결과 문서에서 필요한 정보만 추출하여 리스트 형태로 반환 (가이드 문서는 URL 포함)
+        def format_docs(results) -> list[dict]:
+            formatted = []
+            for source, doc in results:
+                item = {
+                    "source": source,                          # textbook(영문 교재) / guide(한글 가이드)
+                    "text": doc.page_content,                  # 문서 내용(텍스트)
                     "chapter": doc.metadata.get("Header 1"),   # 문서 메타데이터에서 "Header 1" 값
-                    "section": doc.metadata.get("Header 2")    # 문서 메타데이터에서 "Header 2" 값
+                    "section": doc.metadata.get("Header 2"),   # 문서 메타데이터에서 "Header 2" 값
                 }
-                for doc in docs
-            ]
-
-        # LangChain Tool 형태로 래핑: 이름, 설명을 포함
-        self.cal_tool = Tool.from_function(
-            calculus_search_fn,
-            name="calculus_search",
-            description=(
-                "Search academic calculus textbooks (ENGLISH CONTENT) for authoritative mathematical content. "
-                "This database contains English textbooks - always use ENGLISH queries for best results. "
-                "Use this tool to find rigorous definitions, theorems, proofs, examples, formulas, and applications. "
-                "Returns relevant textbook sections with chapter and section metadata for accurate, scholarly explanations."
-            )
-        )
-
-        # --- Markdown(md) 파일 기반 RAG 도구 구성 (한글 학습 가이드용) ---
-        # 로컬에 저장된 md_vectorstore 벡터스토어를 로드
-        md_vectorstore = FAISS.load_local(
-            "md_vectorstore",                             # md 벡터스토어 디렉터리 이름
-            base_embeddings,                              # 동일한 임베딩 객체 사용
-            allow_dangerous_deserialization=True           # 위험할 수 있는 직렬화 해제 허용 여부
-        )
-        # 벡터스토어를 검색기로 변환
-        md_retriever = md_vectorstore.as_retriever(search_kwargs={"k": 2})
-
-        # Markdown 검색 함수 정의 (한글 쿼리 입력 시 관련 문서 반환)
-        def md_search_fn(query: str) -> list[dict]:
-            # FAISS retriever를 통해 문서 검색
-            docs = md_retriever.get_relevant_documents(query)
-            # 문서 리스트에서 필요한 정보만 추출
-            return [
-                {
-                    "text": doc.page_content,                 # md 파일의 내용
-                    "chapter": doc.metadata.get("Header 1"),   # 메타데이터의 "Header 1"
-                    "section": doc.metadata.get("Header 2"),   # 메타데이터의 "Header 2"
-                    "url": doc.metadata["url"],                # 문서가 위치한 URL
-                }
-                for doc in docs
-            ]
-
-        # LangChain Tool 형태로 래핑: 이름, 설명 포함
-        self.md_tool = Tool.from_function(
-            md_search_fn,
-            name="md_search",
+                if doc.metadata.get("url"):
+                    item["url"] = doc.metadata["url"]          # 문서가 위치한 URL
+                formatted.append(item)
+            return formatted
+
+        # 실제 검색을 수행하는 함수 정의 (질문 목록을 입력하면 관련 문서 리스트 반환)
+        def theory_search_fn(queries: list[str]) -> list[dict]:
+            return format_docs(self.searcher.search(queries))
+
+        # 비동기 버전: 검색은 스레드 풀에서 실행되어 이벤트 루프를 막지 않는다
+        async def theory_search_afn(queries: list[str]) -> list[dict]:
+            return format_docs(await self.searcher.asearch(queries))
+
+        # LangChain Tool 형태로 래핑: 이름, 설명, 입력 스키마 포함 (동기/비동기 구현 모두 등록)
+        self.search_tool = StructuredTool.from_function(
+            theory_search_fn,
+            coroutine=theory_search_afn,
+            name="theory_search",
             description=(
-                "Search user-friendly markdown calculus learning guides (KOREAN CONTENT) for accessible explanations. "
-                "This database contains Korean markdown guides - always use KOREAN queries for best results. "
-                "Use this tool to find simplified summaries, study guides, and educational content with URLs. "
-                "Returns markdown sections with static page URLs for additional learning resources."
-            )
+                "Search BOTH calculus knowledge bases in a single call: academic calculus textbooks (ENGLISH CONTENT) "
+                "for rigorous definitions, theorems, proofs and formulas, and markdown learning guides (KOREAN CONTENT) "
+                "for accessible explanations, examples and study-page URLs. "
+                "Pass a list of queries - include at least one ENGLISH and one KOREAN phrasing of the concept. "
+                "All queries are searched against both databases concurrently and the results are merged and deduplicated. "
+                "Each result has a source ('textbook' or 'guide'), text, chapter, section and, for guides, a url."
+            ),
+            args_schema=TheorySearchInput,
         )
 
-        # 생성된 두 개의 Tool을 리스트로 묶어둠 (나중에 에이전트에 전달)
-        self.tools = [self.cal_tool, self.md_tool]
+        # 에이전트에 전달할 도구 목록 (통합 검색 도구 하나로 두 저장소를 모두 검색)
+        self.tools = [self.search_tool]
 
         # --- 에이전트가 사용할 프롬프트 템플릿 정의 ---
         # TaskManager가 처리할 이론 설명용 프롬프트 레이아웃을 선언
@@ -121,24 +123,23 @@ class ExplainTheoryAgent:
                     - Provide highly structured, well-researched theoretical explanations in the specified text format.
 
                     ## CORE RESPONSIBILITIES & STANDARDS
-                    1.  **Research Strategy:** Use both `calculus_search` (for academic rigor) and `md_search` (for accessible explanations/resources) tools to gather comprehensive information based on the user's query.
+                    1.  **Research Strategy:** Call `theory_search` **once** with a list of queries (English and Korean phrasings of the concept) to gather both academic rigor and accessible explanations/resources based on the user's query.
                     2.  **Content Synthesis:** Combine retrieved academic rigor with accessible, easy-to-understand explanations. Prioritize accuracy and clarity.
                     3.  **Source Integration:** Clearly incorporate relevant information from search results into your explanation.
                     4.  **Educational Value:** Provide clear, systematic explanations suitable for college-level students, starting from basic concepts and progressing to applications.
                     5.  **LaTeX Formatting:** Ensure **ALL mathematical expressions and formulas use correct LaTeX formatting**. Use `$` for inline math and `$$` for display math.
                    
                     ## AVAILABLE TOOLS
-                    - **calculus_search:** Academic textbooks with formal definitions, theorems, and rigorous mathematical content. **(Use ENGLISH queries)**
-                    - **md_search:** User-friendly markdown learning guides with accessible explanations, examples, and additional resource URLs. **(Use KOREAN queries)**
+                    - **theory_search:** Searches academic textbooks (formal definitions, theorems, rigorous content; ENGLISH) and markdown learning guides (accessible explanations, examples, resource URLs; KOREAN) concurrently in one call, returning merged and deduplicated results tagged with `source` ('textbook' or 'guide').
 
-                    Choose appropriate tools based on the type of information needed and the nature of the inquiry. You may use one or both tools depending on the complexity and desired depth of the explanation.
+                    Put every query you need into a single `theory_search` call. Only call it again if the first results are clearly insufficient.
 
                     ---
                     ## SEARCH STRATEGY (Internal Thought Process)
-                    - **Tool Selection:** Choose tools based on the type of information needed.
-                        - `calculus_search`: For formal mathematical definitions, theorems, and academic rigor (always use English queries for this tool).
-                        - `md_search`: For practical explanations, examples, and learning resources (always use Korean queries for this tool).
-                    - **Query Approach:** Use clear mathematical terminology that precisely describes the concept you're searching for. Ensure the query language matches the tool's requirement.
+                    - **Query Selection:** Pass 2-4 queries in one call.
+                        - At least one ENGLISH query: matches the textbooks (formal definitions, theorems, academic rigor).
+                        - At least one KOREAN query: matches the learning guides (practical explanations, examples, learning resources).
+                    - **Query Approach:** Use clear mathematical terminology that precisely describes the concept you're searching for.
                     - **Information Synthesis:** When using multiple sources, combine information coherently and logically to provide a comprehensive understanding. Prioritize the most relevant and authoritative information.
                     ---
 
@@ -157,7 +158,7 @@ class ExplainTheoryAgent:
                     [One or more clear, step-by-step examples or real-world applications that illustrate the concept. Integrate LaTeX as needed. If no specific examples are found, state 'Not applicable'.]
 
                     Additional Resources:
-                    [List any relevant URLs found using the md_search tool, e.g., "- [Link Title](URL)". If no URLs are found, state 'None found'.]
+                    [List any relevant URLs in `theory_search` results with source 'guide', e.g., "- [Link Title](URL)". If no URLs are found, state 'None found'.]
                     
                     Status: [COMPLETE, FAILED]
 
@@ -165,8 +166,8 @@ class ExplainTheoryAgent:
                     -   Is the explanation mathematically absolutely accurate and authoritative?
                     -   Is all LaTeX notation correct and properly formatted (using `$` and `$$` delimiters)?
                     -   Is the explanation clear, systematic, and appropriate for a college student?
-                    -   Are both academic (calculus_search) and accessible (md_search) perspectives integrated where appropriate?
-                    -   Are any relevant URLs from `md_search` included in 'Additional Resources'?
+                    -   Are both academic ('textbook') and accessible ('guide') perspectives integrated where appropriate?
+                    -   Are any relevant URLs from 'guide' results included in 'Additional Resources'?
                     -   Does the output strictly adhere to the `RESPONSE FORMAT`?
                     
                     ## STATUS DECISION LOGIC (Internal Thought Process)
@@ -187,7 +188,7 @@ class ExplainTheoryAgent:
 
         # create_react_agent를 사용하여 실제 에이전트 인스턴스를 생성
         # - self.llm: 위에서 설정한 ChatGoogleGenerativeAI 모델
-        # - tools: 계산 학습 자료 검색 도구(calculus_search, md_search)
+        # - tools: 계산 학습 자료 통합 검색 도구(theory_search)
         # - state_modifier: 프롬프트 템플릿 (theory_explanation_prompt)
         self.agent = create_react_agent(
             self.llm,
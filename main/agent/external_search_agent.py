@@ -1,4 +1,4 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_registry import llm_registry
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.tools.tavily_search import TavilySearchResults
 from dotenv import load_dotenv
@@ -20,13 +20,13 @@ class ExternalSearchAgent:
         GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")    # Google LLM 호출을 위한 API 키
         TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")    # Tavily 검색 도구 사용을 위한 API 키
 
-        # ChatGoogleGenerativeAI 모델을 초기화
+        # 공유 레지스트리에서 ChatGoogleGenerativeAI 모델을 가져옴 (같은 모델의 동시 호출/속도 제한을 함께 적용)
         # - model: 사용할 Gemini 모델 버전
         # - google_api_key: 위에서 가져온 Google API 키
         # - convert_system_message_to_human: 시스템 메시지를 인간 메시지처럼 변환 여부
         # - temperature: 생성 응답의 랜덤성 정도 (0~1, 낮을수록 결정적)
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-preview-05-20",
+        self.llm = llm_registry.get(
+            "gemini-2.5-flash-preview-05-20",
             google_api_key=GOOGLE_API_KEY,
             convert_system_message_to_human=True,
             temperature=0.2
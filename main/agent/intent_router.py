@@ -0,0 +1,264 @@
+import asyncio
+import glob
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 질의 의도별 키워드 규칙 (정규식)
+INTENT_PATTERNS = {
+    "ProblemGeneration": [
+        r"문제.{0,4}(만들|생성|출제|내\s*줘|내\s*주)", r"퀴즈", r"연습\s*문제",
+        r"generate .*problem", r"practice problem", r"\bquiz",
+    ],
+    "ProblemSolving": [
+        r"풀어", r"풀이", r"계산", r"구하(시오|여라|라|세요)", r"구해", r"값은", r"증명",
+        r"\bsolve", r"\bcalculate", r"\bevaluate", r"\bcompute", r"find the",
+    ],
+    "ExplainTheoryAgent": [
+        r"설명", r"이란", r"무엇", r"뭐야", r"뭔가요", r"뭐예요", r"정의", r"개념", r"의미", r"차이", r"원리",
+        r"\bexplain", r"what is", r"\bdefine", r"definition",
+    ],
+}
+
+# 헤더 용어 추출 시 제외할 단어 (주제 판별에 도움이 되지 않는 말)
+HEADER_STOPWORDS = {
+    "chapter", "and", "the", "of", "in", "to", "for", "with", "first", "second", "order", "test", "value",
+    "mean", "meaning", "method", "rule", "rules", "laws", "physical", "natural", "linear", "multiple",
+    "field", "space", "models", "calculating",
+    "예시", "개념", "확인", "답변", "계속", "정리", "요약", "문제", "활용", "방법", "기본", "응용", "규칙",
+    "법칙", "정의", "의미", "성질", "가능", "가지", "경우", "계산", "그리고", "다양한", "대한", "따른",
+    "무엇인", "사이", "상대", "생략", "설명", "섹션", "소개", "위에", "위한", "의한", "이상", "이용한",
+    "일반", "일정", "있는지", "점이", "조건", "중복", "찾기", "챕터", "특수", "특정", "판별", "하는",
+    "한계", "해석", "해설", "형태", "유형", "풀이", "본문", "부분", "관계", "수학", "공학", "이론", "중심",
+    "비교", "불가능한", "독립", "분포", "이항", "정규", "확률", "운동", "속도", "거리", "길이", "질량",
+}
+
+# 수식 표기가 있으면 미적분 주제로 본다.
+MATH_NOTATION = re.compile(r"[∫∑√π∞=^]|\$|\\(int|frac|lim|sum|sqrt)|d/dx|\b(lim|sin|cos|tan|ln|log)\b")
+
+# 한국어 조사 (헤더 용어 끝에서 떼어낸다)
+KOREAN_PARTICLES = ("의", "와", "과", "및", "을", "를", "은", "는", "이", "가", "에")
+
+
+@dataclass
+class RouteGuess:
+    next: str           # 첫 번째로 실행할 에이전트
+    confidence: float   # 0 ~ 1
+    reason: str         # 로그용 판단 근거
+    parallel: list[str] = field(default_factory=list)   # next와 함께 병렬 실행할 에이전트
+
+    @property
+    def plan(self) -> list[str]:
+        return [self.next, *self.parallel]
+
+
+def user_content(state) -> tuple[str, bool]:
+    """상태에서 사용자 입력의 텍스트와 이미지 포함 여부를 꺼낸다."""
+    content = state.user_input
+    if isinstance(content, str):
+        return content, False
+    texts = [part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text"]
+    has_image = any(isinstance(part, dict) and part.get("type") == "image_url" for part in content)
+    return " ".join(texts), has_image
+
+
+class IntentRouter:
+    """
+    LLM 호출 없이 첫 번째 에이전트를 고르는 로컬 의도 분류기.
+    키워드 규칙으로 의도를 찾고, chapters_md 챕터 헤더(용어 일치 또는 임베딩 최근접 중심)로
+    미적분 주제 여부를 판별한다. 신뢰도가 threshold 미만이면 TaskManager(LLM)에 맡긴다.
+    """
+
+    def __init__(self, embeddings=None, chapters_dir: str = "chapters_md"):
+        self.embeddings = embeddings
+        # 이 값 이상이면 LLM 라우터를 건너뛴다.
+        self.threshold = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.75"))
+        # 챕터 중심 임베딩과의 코사인 유사도가 이 값 이상이면 미적분 주제로 본다.
+        self.topic_threshold = float(os.getenv("INTENT_ROUTER_TOPIC_THRESHOLD", "0.7"))
+        # 빠른 경로로 결정한 요청 중 이 비율만큼 LLM 라우터를 백그라운드로 같이 돌려 일치율을 잰다.
+        self.shadow_rate = float(os.getenv("INTENT_ROUTER_SHADOW_RATE", "0.05"))
+        self.enabled = os.getenv("INTENT_ROUTER", "on") != "off"
+
+        self.patterns = {intent: [re.compile(p, re.IGNORECASE) for p in patterns]
+                         for intent, patterns in INTENT_PATTERNS.items()}
+        self.chapter_headers = self._load_chapter_headers(chapters_dir)
+        self.header_terms = self._build_header_terms(self.chapter_headers)
+
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_names: list[str] = []
+        self._centroid_lock = asyncio.Lock()
+        self._centroids_failed = False
+        self._shadow_tasks: set = set()
+
+        # 통계
+        self.fast_path = 0
+        self.fallbacks = 0
+        self.compared = 0
+        self.agreed = 0
+
+    @staticmethod
+    def _load_chapter_headers(chapters_dir: str) -> dict[str, list[str]]:
+        """챕터 파일별 '#', '##' 헤더 텍스트 목록"""
+        headers = {}
+        for path in sorted(glob.glob(os.path.join(chapters_dir, "*.md"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            with open(path, encoding="utf-8") as f:
+                headers[name] = [
+                    line.lstrip("#").strip()
+                    for line in f
+                    if re.match(r"^#{1,2}\s", line) and line.lstrip("#").strip()
+                ]
+        return headers
+
+    @staticmethod
+    def _build_header_terms(chapter_headers: dict[str, list[str]]) -> dict[str, str]:
+        """헤더에 나오는 용어 → 챕터 이름"""
+        terms = {}
+        for chapter, headers in chapter_headers.items():
+            for header in headers:
+                for token in re.findall(r"[가-힣]+|[A-Za-z]{4,}", header):
+                    token = token.lower()
+                    if len(token) > 2 and token.endswith(KOREAN_PARTICLES):
+                        token = token[:-1]
+                    if len(token) >= 2 and token not in HEADER_STOPWORDS:
+                        terms.setdefault(token, chapter)
+        return terms
+
+    def match_intents(self, text: str) -> set[str]:
+        intents = {intent for intent, patterns in self.patterns.items() if any(p.search(text) for p in patterns)}
+        if "ProblemGeneration" in intents and "ExplainTheoryAgent" not in intents:
+            # 생성한 문제를 풀어달라는 요청(/newquestions)은 문제 생성 한 가지 의도로 본다.
+            return {"ProblemGeneration"}
+        return intents
+
+    def request_intents(self, state) -> set[str]:
+        """사용자 요청에 담긴 의도 집합 (이미지는 문제 풀이)"""
+        text, has_image = user_content(state)
+        if has_image:
+            return {"ProblemSolving"}
+        return self.match_intents(text)
+
+    def match_chapter_term(self, text: str) -> Optional[str]:
+        """질의에 챕터 헤더 용어가 그대로 들어 있으면 해당 챕터 이름을 반환한다."""
+        lowered = text.lower()
+        # 긴 용어부터 확인해 '편미분'이 '미분'보다 먼저 잡히도록 한다.
+        for term in sorted(self.header_terms, key=len, reverse=True):
+            if term in lowered:
+                return self.header_terms[term]
+        return None
+
+    def find_terms(self, text: str) -> list[str]:
+        """질의에 나오는 챕터 헤더 용어를 등장 순서대로 반환한다 (더 긴 용어에 포함된 용어는 제외)."""
+        lowered = text.lower()
+        found = []
+        for term in sorted(self.header_terms, key=len, reverse=True):
+            if term in lowered and not any(term in longer for longer in found):
+                found.append(term)
+        return sorted(found, key=lowered.index)
+
+    async def _ensure_centroids(self) -> bool:
+        if self._centroids is not None:
+            return True
+        if self._centroids_failed or self.embeddings is None or not self.chapter_headers:
+            return False
+        async with self._centroid_lock:
+            if self._centroids is not None:
+                return True
+            try:
+                names, centroids = [], []
+                for chapter, headers in self.chapter_headers.items():
+                    vectors = np.asarray(await self.embeddings.aembed_documents(headers), dtype=np.float32)
+                    centroid = vectors.mean(axis=0)
+                    centroids.append(centroid / np.linalg.norm(centroid))
+                    names.append(chapter)
+                self._centroid_names = names
+                self._centroids = np.stack(centroids)
+            except Exception as e:
+                print(f"IntentRouter: 챕터 임베딩 생성 실패, 키워드 규칙만 사용합니다 ({e})")
+                self._centroids_failed = True
+                return False
+        return True
+
+    async def nearest_chapter(self, text: str) -> Optional[tuple[str, float]]:
+        """질의 임베딩과 가장 가까운 챕터 중심과 코사인 유사도"""
+        if not text.strip() or not await self._ensure_centroids():
+            return None
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        except Exception as e:
+            print(f"IntentRouter: 질의 임베딩 실패 ({e})")
+            return None
+        scores = self._centroids @ (vector / np.linalg.norm(vector))
+        best = int(np.argmax(scores))
+        return self._centroid_names[best], float(scores[best])
+
+    async def classify(self, state) -> RouteGuess:
+        """첫 번째 에이전트와 신뢰도를 추정한다."""
+        text, has_image = user_content(state)
+        if has_image:
+            return RouteGuess("ProblemSolving", 1.0, "이미지 포함")
+
+        intents = self.match_intents(text)
+        if intents == {"ProblemGeneration"}:
+            return RouteGuess("ProblemGeneration", 0.95, "문제 생성 키워드")
+        if intents == {"ExplainTheoryAgent", "ProblemSolving"}:
+            # 이론 설명과 문제 풀이는 서로의 결과가 필요 없으므로 병렬로 실행한다.
+            return RouteGuess("ExplainTheoryAgent", 0.8, "설명 + 풀이 복합 의도", parallel=["ProblemSolving"])
+        if len(intents) > 1:
+            guess = next(i for i in ("ProblemSolving", "ExplainTheoryAgent", "ProblemGeneration") if i in intents)
+            return RouteGuess(guess, 0.3, f"복합 의도 {sorted(intents)}")
+
+        # 미적분 주제인지 판별: 헤더 용어 일치 → 없으면 임베딩 최근접 챕터
+        chapter = self.match_chapter_term(text)
+        if MATH_NOTATION.search(text):
+            on_topic, topic_reason = True, "수식 표기"
+        elif chapter is not None:
+            on_topic, topic_reason = True, f"헤더 용어 일치: {chapter}"
+        else:
+            nearest = await self.nearest_chapter(text)
+            on_topic = nearest is not None and nearest[1] >= self.topic_threshold
+            topic_reason = f"최근접 챕터: {nearest[0]} ({nearest[1]:.2f})" if nearest else "주제 판별 불가"
+
+        if intents:
+            intent = intents.pop()
+            return RouteGuess(intent, 0.9 if on_topic else 0.5, f"키워드, {topic_reason}")
+        if on_topic:
+            return RouteGuess("ExplainTheoryAgent", 0.8, f"의도 키워드 없음, {topic_reason}")
+        return RouteGuess("GeneratingResponse", 0.2, f"미적분 주제 아님, {topic_reason}")
+
+    def record_agreement(self, local_next: str, llm_next: str) -> None:
+        """로컬 판단과 LLM 라우터 판단의 일치 여부를 기록하고 누적 일치율을 출력한다."""
+        self.compared += 1
+        self.agreed += int(local_next == llm_next)
+        print(
+            f"IntentRouter 일치율: {self.agreed}/{self.compared} ({self.agreed / self.compared:.1%}) "
+            f"- 로컬 {local_next} / LLM {llm_next}"
+        )
+
+    def shadow_compare(self, guess: RouteGuess, llm_call) -> None:
+        """빠른 경로 결정과 LLM 라우터 결과를 백그라운드로 비교한다 (응답 지연 없음)."""
+        async def _run():
+            try:
+                result = await llm_call
+                self.record_agreement(guess.next, result.next)
+            except Exception as e:
+                print(f"IntentRouter: 섀도 비교 실패 ({e})")
+
+        task = asyncio.create_task(_run())
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "fast_path": self.fast_path,
+            "fallbacks": self.fallbacks,
+            "compared": self.compared,
+            "agreed": self.agreed,
+            "agreement_rate": round(self.agreed / self.compared, 4) if self.compared else None,
+        }
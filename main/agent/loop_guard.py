@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from metrics import REQUEST_HOPS
+
+load_dotenv()
+
+
+def find_cycle(nodes: list[str]) -> Optional[list[str]]:
+    """
+    노드 실행 순서의 끝이 같은 구간의 반복(A→B→A→B, A→A)으로 끝나면 그 구간을 돌려준다.
+
+    Args:
+        nodes (list[str]): 지금까지 실행한 노드 + 다음에 실행할 노드
+
+    Returns:
+        Optional[list[str]]: 반복된 구간 (반복이 없으면 None)
+    """
+    for size in range(1, len(nodes) // 2 + 1):
+        if nodes[-size:] == nodes[-2 * size:-size]:
+            return nodes[-size:]
+    return None
+
+
+class LoopGuard:
+    """
+    감독자 루프 제어.
+    - hop 예산: GeneratingResponse 전에 실행할 수 있는 에이전트 hop 수 (LOOP_MAX_HOPS, 0이면 제한 없음)
+    - 순환 감지: 같은 에이전트 구간이 반복되려 하면(A→B→A→B) 더 돌지 않는다
+    - 같은 (에이전트, 입력) 호출은 다시 실행하지 않고 이전 출력을 재사용한다
+    - 같은 입력으로 이미 실패했거나 이미 한 번 재사용한 에이전트로 다시 가려 하면 더 돌지 않는다
+    - 에이전트 하나를 요청당 LOOP_MAX_VISITS번보다 많이 실행하지 않는다 (A→B→A→C→A 같은 왕복, 0이면 제한 없음)
+    - 요청별 hop 수 분포를 기록한다
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LOOP_GUARD", "on") != "off"
+        self.max_hops = int(os.getenv("LOOP_MAX_HOPS", "4"))
+        self.max_visits = int(os.getenv("LOOP_MAX_VISITS", "2"))
+
+        # 통계
+        self.hop_counts: Counter = Counter()     # 요청당 에이전트 hop 수(GeneratingResponse 포함) → 요청 수
+        self.duplicates_skipped = 0
+        self.cycles = 0
+        self.revisits = 0
+        self.hop_budget_hits = 0
+        self.recursion_exits = 0                 # GeneratingResponse 없이 recursion_limit에 걸려 끝난 요청 수
+
+    @staticmethod
+    def input_key(messages: list) -> str:
+        """
+        에이전트에 보낼 메시지 목록의 지문.
+        ContextBudget.select()는 에이전트 자신의 이전 출력을 넣지 않으므로, 다른 결과가 바뀌지 않았다면 같은 값이 나온다.
+        """
+        payload = json.dumps([(m.name, m.content) for m in messages], ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def hops_spent(self, state) -> bool:
+        return self.enabled and bool(self.max_hops) and len(state.hops) >= self.max_hops
+
+    def revisit(self, state, node: str, input_key: str) -> Optional[str]:
+        """
+        node를 다시 실행해도 얻을 것이 없는 이유. 없으면 None.
+        - 같은 입력으로 만든 마지막 결과가 FAILED이거나, 그 결과를 이미 한 번 재사용했다
+        - 이번 요청에서 이미 max_visits번 실행했다
+        """
+        visits = [hop for hop in state.hops if hop.node == node]
+        previous = state.results.get(node)
+        if previous is not None and input_key and previous.input_key == input_key:
+            if previous.status == "FAILED":
+                return f"{node}이(가) 같은 입력으로 이미 실패함"
+            if any(hop.reused for hop in state.hops[previous.hop + 1:] if hop.node == node):
+                return f"{node}의 같은 입력 결과를 이미 재사용함"
+        if self.max_visits and len(visits) >= self.max_visits:
+            return f"{node} {len(visits)}회 실행함 (최대 {self.max_visits}회)"
+        return None
+
+    def check(self, state, next_node: str, input_key: str = "") -> Optional[str]:
+        """
+        next_node를 실행하면 안 되는 이유 (hop 예산 소진 / 순환 / 소용없는 재방문). 실행해도 되면 None.
+
+        Args:
+            state: 그래프 상태 (hops에 지금까지의 실행 기록)
+            next_node (str): 라우터가 고른 다음 에이전트
+            input_key (str): next_node가 받을 입력의 지문 (input_key())
+        """
+        if not self.enabled:
+            return None
+        if self.hops_spent(state):
+            self.hop_budget_hits += 1
+            return f"hop 예산 {self.max_hops}회 소진"
+        cycle = find_cycle([hop.node for hop in state.hops] + [next_node])
+        if cycle:
+            self.cycles += 1
+            return f"순환 감지 ({' → '.join(cycle)} 반복)"
+        reason = self.revisit(state, next_node, input_key)
+        if reason:
+            self.revisits += 1
+            return f"순환 감지 ({reason})"
+        return None
+
+    def record(self, hops: int, recursion: bool = False) -> None:
+        """
+        요청 하나가 끝날 때 실행한 에이전트 hop 수를 기록한다.
+
+        Args:
+            hops (int): 실행한 에이전트 hop 수 (GeneratingResponse까지 갔으면 포함)
+            recursion (bool): GeneratingResponse 없이 recursion_limit에 걸려 끝났는지
+        """
+        if recursion:
+            self.recursion_exits += 1
+        self.hop_counts[hops] += 1
+        REQUEST_HOPS.observe(hops)
+
+    def stats(self) -> dict:
+        total = sum(self.hop_counts.values())
+        ordered = sorted(self.hop_counts.elements())
+
+        def percentile(p: float) -> Optional[int]:
+            return ordered[min(total - 1, int(total * p))] if total else None
+
+        return {
+            "enabled": self.enabled,
+            "max_hops": self.max_hops,
+            "max_visits": self.max_visits,
+            "requests": total,
+            "hop_distribution": dict(sorted(self.hop_counts.items())),
+            "avg_hops": round(sum(ordered) / total, 2) if total else 0.0,
+            "p50_hops": percentile(0.5),
+            "p95_hops": percentile(0.95),
+            "max_hops_seen": ordered[-1] if total else None,
+            "duplicates_skipped": self.duplicates_skipped,
+            "cycles": self.cycles,
+            "revisits": self.revisits,
+            "hop_budget_hits": self.hop_budget_hits,
+            "recursion_exits": self.recursion_exits,
+        }
+
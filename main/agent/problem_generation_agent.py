@@ -1,13 +1,28 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_registry import llm_registry
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.prebuilt import create_react_agent
+from agent.direct_chain import build_agent
 from langchain_core.tools import tool
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from metrics import QUESTION_GENERATION_LATENCY
 import os
 
 # .env 파일에 설정된 API 키 등을 환경 변수로 로드
 load_dotenv()
 
+class NewQuestionResponse(BaseModel):
+    """객관식 문제 한 개 (/newquestions 응답 스키마)"""
+    chapter : str = Field(description="Chapter name chosen from the available chapters list")
+    question: str = Field(description="Problem statement with all math in LaTeX ($...$ or $$...$$)")
+    choice1: str = Field(description="Option 1 (LaTeX)")
+    choice2: str = Field(description="Option 2 (LaTeX)")
+    choice3: str = Field(description="Option 3 (LaTeX)")
+    choice4: str = Field(description="Option 4 (LaTeX)")
+    answer: int = Field(description="Number of the correct option: 1, 2, 3 or 4")
+    solution: str = Field(description="Step-by-step solution / explanation in Korean with LaTeX")
+    difficulty: str = Field(description="One of EASY, NORMAL, HARD")
+    ai_summary: str = Field(description="One-sentence Korean summary of what the problem checks")
+
 class ProblemGenerationAgent:
     """
     공학수학 문제를 생성하는 에이전트 클래스
@@ -19,13 +34,13 @@ class ProblemGenerationAgent:
         # 환경 변수에서 Google API 키를 가져옴
         GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-        # ChatGoogleGenerativeAI 모델을 초기화
+        # 공유 레지스트리에서 ChatGoogleGenerativeAI 모델을 가져옴 (같은 모델의 동시 호출/속도 제한을 함께 적용)
         # - model: 사용할 Gemini 모델 버전
         # - google_api_key: 위에서 가져온 Google API 키
         # - convert_system_message_to_human: 시스템 메시지를 인간 메시지처럼 변환할지 여부
         # - temperature: 생성 응답의 랜덤성 정도 (0~1, 낮을수록 결정적이며 같은 입력에 대해 비슷한 응답을 생성)
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-preview-05-20",
+        self.llm = llm_registry.get(
+            "gemini-2.5-flash-preview-05-20",
             google_api_key=GOOGLE_API_KEY,
             convert_system_message_to_human=True,
             temperature=0.7
@@ -146,12 +161,44 @@ class ProblemGenerationAgent:
             ("placeholder", "{messages}")  # 실제 사용자 메시지가 이 위치에 삽입됨
         ])
 
-        # create_react_agent 함수를 통해 에이전트를 생성
+        # 에이전트를 생성 (DIRECT_CHAIN_AGENTS에 포함되면 도구 없이 LLM 한 번 호출하는 체인)
         # - llm: 위에서 초기화한 ChatGoogleGenerativeAI LLM
-        # - tools: 문제 생성을 위한 더미 툴 리스트
-        # - state_modifier: ChatPromptTemplate으로 구성한 문제 생성용 프롬프트
-        self.agent = create_react_agent(
-            self.llm,
-            self.tools,
-            state_modifier=self.generation_prompt
-        )
+        # - tools: 문제 생성을 위한 더미 툴 리스트 (ReAct 모드에서만 사용)
+        # - prompt: ChatPromptTemplate으로 구성한 문제 생성용 프롬프트
+        self.agent = build_agent("ProblemGeneration", self.llm, self.tools, self.generation_prompt)
+
+        # --- 직접 생성 모드 (/newquestions 전용) ---
+        # TaskManager를 거치지 않고 한 번의 LLM 호출로 NewQuestionResponse 형태의 구조화된 출력을 만든다.
+        self.structured_prompt = ChatPromptTemplate.from_messages([
+            (
+                "system",
+                f"""You are the **University Calculus Problem Generation Agent**.
+            Create exactly ONE high-quality, college-level, multiple-choice calculus problem from the request JSON, solve it, and return it in the given structured schema.
+
+            ## REQUIREMENTS
+            - Match `topics` to the most relevant chapter from: {self.chapter}
+            - Difficulty (EASY / NORMAL / HARD): EASY = basic concepts and simple calculations, NORMAL = standard applications and routine techniques, HARD = multi-step problems of moderate complexity. Follow the requested `difficulty`; default NORMAL.
+            - Reflect the learning goal described in `summarized`, and use `quiz_examples` only as a style reference.
+            - Exactly four options (choice1 ~ choice4) with precisely one correct answer; the three distractors must be plausible and based on common student errors.
+            - `answer` is the number (1-4) of the correct option.
+            - `solution` is a concise step-by-step solution in Korean that verifies the correct option.
+            - `ai_summary` is one Korean sentence describing what the problem checks.
+            - Use proper LaTeX for ALL mathematical expressions: `$...$` inline, `$$...$$` display.
+            - Double-check that the problem, the correct answer and the solution are mathematically consistent."""
+            ),
+            ("human", "{request}"),
+        ])
+        self.structured_agent = self.structured_prompt | self.llm.with_structured_output(NewQuestionResponse)
+
+    async def agenerate_question(self, request: str) -> NewQuestionResponse:
+        """
+        문제 생성 요청(JSON 문자열)으로 객관식 문제 한 개를 바로 생성한다.
+
+        Args:
+            request (str): NewQuestionRequest를 직렬화한 JSON 문자열
+
+        Returns:
+            NewQuestionResponse: 풀이가 포함된 구조화된 문제
+        """
+        with QUESTION_GENERATION_LATENCY.time():
+            return await self.structured_agent.ainvoke({"request": request})
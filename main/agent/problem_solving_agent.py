@@ -1,6 +1,6 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_registry import llm_registry
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.prebuilt import create_react_agent
+from agent.direct_chain import build_agent
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 import os
@@ -19,13 +19,13 @@ class ProblemSolvingAgent:
         # 환경 변수에서 Google API 키를 가져옴
         GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-        # ChatGoogleGenerativeAI 모델을 초기화
+        # 공유 레지스트리에서 ChatGoogleGenerativeAI 모델을 가져옴 (같은 모델의 동시 호출/속도 제한을 함께 적용)
         # - model: 사용할 Gemini 모델 버전
         # - google_api_key: 위에서 가져온 API 키
         # - convert_system_message_to_human: 시스템 메시지를 인간 메시지처럼 변환할지 여부
         # - temperature: 생성 응답의 랜덤성 정도 (0~1, 낮을수록 결정적)
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro-preview-05-06",
+        self.llm = llm_registry.get(
+            "gemini-2.5-pro-preview-05-06",
             google_api_key=GOOGLE_API_KEY,
             convert_system_message_to_human=True,
             temperature=0.1
@@ -110,12 +110,8 @@ class ProblemSolvingAgent:
             ("placeholder", "{messages}")  # 실제 사용자 메시지가 이 위치에 삽입됨
         ])
 
-        # create_react_agent 함수를 통해 실제 에이전트 인스턴스를 생성
+        # 실제 에이전트 인스턴스를 생성 (DIRECT_CHAIN_AGENTS에 포함되면 도구 없이 LLM 한 번 호출하는 체인)
         # - llm: 위에서 초기화한 ChatGoogleGenerativeAI LLM
-        # - tools: 더미 문제 풀이 툴 리스트
-        # - state_modifier: ChatPromptTemplate으로 구성한 문제 풀이용 프롬프트
-        self.agent = create_react_agent(
-            self.llm,
-            self.tools,
-            state_modifier=self.solving_prompt
-        )
+        # - tools: 더미 문제 풀이 툴 리스트 (ReAct 모드에서만 사용)
+        # - prompt: ChatPromptTemplate으로 구성한 문제 풀이용 프롬프트
+        self.agent = build_agent("ProblemSolving", self.llm, self.tools, self.solving_prompt)
@@ -1,6 +1,6 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_registry import llm_registry
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.prebuilt import create_react_agent
+from agent.direct_chain import build_agent
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 import os
@@ -14,8 +14,8 @@ class ResponseGenerationAgent:
     def __init__(self):
         GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro-preview-06-05",
+        self.llm = llm_registry.get(
+            "gemini-2.5-pro-preview-06-05",
             google_api_key=GOOGLE_API_KEY,
             convert_system_message_to_human=True,
             temperature=0.2
@@ -142,5 +142,6 @@ class ResponseGenerationAgent:
             ("placeholder", "{messages}")
         ])
         
-        self.agent = create_react_agent(self.llm, self.tools, state_modifier = self.response_prompt)
+        # DIRECT_CHAIN_AGENTS에 포함되면 도구 없이 LLM 한 번 호출하는 체인, 아니면 ReAct 에이전트
+        self.agent = build_agent("GeneratingResponse", self.llm, self.tools, self.response_prompt)
     
\ No newline at end of file
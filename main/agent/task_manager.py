@@ -4,11 +4,23 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 import os
-from langchain_openai import ChatOpenAI
+from llm_registry import llm_registry
 load_dotenv()
 members = ["ExternalSearch", "ProblemSolving", "ProblemGeneration", "GeneratingResponse", "ExplainTheoryAgent"]
+worker_members = [m for m in members if m != "GeneratingResponse"]
 class RouteResponse(BaseModel):
     next: Literal[*members]
+    parallel: List[Literal[*worker_members]] = Field(
+        default_factory=list,
+        description="Other independent agents to run concurrently with `next`. Leave empty for a single agent.",
+    )
+
+    @property
+    def plan(self) -> List[str]:
+        """이번 hop에 실행할 에이전트 목록 (중복 제거, 2개 이상이면 병렬 실행)"""
+        if self.next == "GeneratingResponse":
+            return [self.next]
+        return list(dict.fromkeys([self.next, *self.parallel]))
 
 class TaskManager:
     """
@@ -19,8 +31,8 @@ class TaskManager:
 
         OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-        self.llm = ChatOpenAI(
-            model_name="gpt-4-turbo",
+        self.llm = llm_registry.get(
+            "gpt-4-turbo",
             openai_api_key=OPENAI_API_KEY,
             temperature=0.1,
         )
@@ -71,10 +83,15 @@ class TaskManager:
             #### Multi-Agent Workflows:
             ```
             "Explain X and create problems" → ExplainTheoryAgent → ProblemGeneration → GeneratingResponse
-            "Solve this and explain theory" → ProblemSolving → ExplainTheoryAgent → GeneratingResponse  
+            "Solve this and explain theory" → [ProblemSolving + ExplainTheoryAgent in parallel] → GeneratingResponse  
             "Research X and explain" → ExternalSearch → ExplainTheoryAgent → GeneratingResponse
             ```
 
+            #### Parallel Execution:
+            - When the request has several **independent** parts, set `next` to one agent and list the others in `parallel`. They run at the same time and all results are collected before the next routing decision.
+            - Only parallelize agents that do not need each other's output (e.g. solving a given problem and explaining a theory). Keep dependent steps sequential (e.g. ProblemGeneration that should build on an ExplainTheoryAgent result).
+            - Leave `parallel` empty for single-agent steps and whenever `next` is `GeneratingResponse`.
+
             ## AGENT SELECTION CRITERIA
 
             - **ExplainTheoryAgent**: Theory explanations, definitions, "explain/what is/define"
@@ -0,0 +1,48 @@
+import re
+from typing import Optional
+
+# TaskManager 프롬프트의 "ERROR RECOVERY & FALLBACK STRATEGIES"를 표로 옮긴 것
+# 에이전트가 Status: FAILED를 내면 이동할 대체 에이전트
+FAILURE_FALLBACK = {
+    "ExplainTheoryAgent": "ExternalSearch",
+    "ProblemSolving": "ExplainTheoryAgent",
+    "ProblemGeneration": "ExternalSearch",
+    "ExternalSearch": "ExplainTheoryAgent",
+}
+
+STATUS_PATTERN = re.compile(r"Status\W*\s*(COMPLETE|FAILED)", re.IGNORECASE)
+
+
+def parse_status(content) -> Optional[str]:
+    """에이전트 출력의 마지막 'Status: COMPLETE/FAILED' 값을 읽는다. 없으면 None."""
+    if not isinstance(content, str):
+        return None
+    matches = STATUS_PATTERN.findall(content)
+    return matches[-1].upper() if matches else None
+
+
+def decide_transition(state, intents: set[str]) -> tuple[Optional[str], str]:
+    """
+    방금 끝난 에이전트의 Status와 요청 의도로 다음 노드를 정한다.
+
+    Args:
+        state: 그래프 상태 (마지막 hop이 방금 실행된 에이전트)
+        intents: 사용자 요청에서 찾은 의도 집합
+
+    Returns:
+        (다음 노드 이름 또는 None, 판단 근거). None이면 표로 결정할 수 없어 TaskManager에 맡긴다.
+    """
+    name, result = state.last_result()
+    if result.status is None:
+        return None, f"{name} Status 없음"
+    if len(intents) > 1:
+        return None, f"복합 의도 {sorted(intents)}"
+
+    if result.status == "COMPLETE":
+        return "GeneratingResponse", f"{name} COMPLETE"
+
+    # FAILED: 대체 에이전트를 아직 실행하지 않았다면 그쪽으로, 이미 실행했다면 한계를 안고 응답 생성
+    fallback = FAILURE_FALLBACK.get(name)
+    if fallback is not None and fallback not in state.results:
+        return fallback, f"{name} FAILED → 대체 경로"
+    return "GeneratingResponse", f"{name} FAILED, 대체 경로 소진"
@@ -0,0 +1,308 @@
+"""
+의미 기반(semantic) 답변 캐시
+
+정규화한 질의 문자열과 그 임베딩을 키로 답변을 저장하고,
+코사인 유사도가 임계값 이상인 거의 같은 질문에는 저장된 답변을 돌려준다.
+- 크기 제한 + LRU 제거, TTL 만료
+- 적중/미스 카운터
+- 저장소(backend) 교체 가능: 메모리(InMemoryCacheBackend), 재시작 후에도 유지되는 SQLite(SQLiteCacheBackend)
+"""
+import re
+import sqlite3
+import threading
+import time
+import traceback
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """공백/대소문자/끝 문장부호 차이를 없앤 캐시 키용 문자열을 만든다."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.~")
+
+
+@dataclass
+class CacheEntry:
+    key: str                # 정규화된 질의
+    query: str              # 원래 질의
+    embedding: np.ndarray   # 단위 벡터로 정규화된 임베딩 (float32)
+    answer: str
+    created_at: float
+    last_access: float
+
+
+class InMemoryCacheBackend:
+    """
+    프로세스 메모리에 답변을 보관하는 저장소.
+    OrderedDict 순서를 최근 사용 순서로 유지해 LRU 제거에 사용한다.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 86400.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None   # 유사도 검색용 임베딩 행렬 (변경 시 다시 만든다)
+        self._matrix_keys: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def _touch(self, entry: CacheEntry, now: float) -> None:
+        entry.last_access = now
+        self._entries.move_to_end(entry.key)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """정규화된 질의가 정확히 같은 항목을 찾는다."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, now):
+            self._remove(key)
+            return None
+        self._touch(entry, now)
+        return entry
+
+    def search(self, embedding: np.ndarray, threshold: float) -> Optional[tuple[CacheEntry, float]]:
+        """
+        임계값 이상인 항목 중 만료되지 않은 것 가운데 코사인 유사도가 가장 높은 항목의 (항목, 유사도)를 반환한다.
+        가장 비슷한 항목이 만료됐으면 지우고 그다음으로 비슷한 항목을 본다.
+        """
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[k].embedding for k in self._matrix_keys])
+
+        scores = self._matrix @ embedding
+        candidates = np.flatnonzero(scores >= threshold)
+        now = time.time()
+        expired, match = [], None
+        for index in candidates[np.argsort(-scores[candidates])]:
+            entry = self._entries[self._matrix_keys[index]]
+            if self._expired(entry, now):
+                expired.append(entry.key)
+                continue
+            match = entry, float(scores[index])
+            break
+
+        for key in expired:
+            self._remove(key)
+        if match is not None:
+            self._touch(match[0], now)
+        return match
+
+    def put(self, entry: CacheEntry) -> None:
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        self._matrix = None
+        self.evict()
+
+    def evict(self) -> None:
+        """만료된 항목과 크기 제한을 넘는 가장 오래 쓰지 않은 항목을 제거한다."""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            self._remove(key)
+        while len(self._entries) > self.max_size:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._matrix = None
+
+    def flush(self) -> None:
+        """기록할 저장소가 없으므로 아무것도 하지 않는다 (SQLiteCacheBackend와 같은 인터페이스)."""
+
+
+class SQLiteCacheBackend(InMemoryCacheBackend):
+    """
+    SQLite 파일에 기록하는 저장소 (재시작 후에도 캐시 유지).
+    검색은 메모리 사본에서 하고, 추가/삭제는 SQLite에 바로 기록한다(write-through).
+    적중 때마다 바뀌는 마지막 사용 시각은 모아 두었다가 flush_size개가 쌓이거나 flush_interval초가 지나면
+    (또는 다음 추가/삭제 때) 한 번에 기록한다. 적중 경로에서 매번 커밋(fsync)하지 않기 위해서다.
+    """
+
+    def __init__(
+        self,
+        path: str = "answer_cache.sqlite3",
+        max_size: int = 1000,
+        ttl: float = 86400.0,
+        flush_size: int = 64,
+        flush_interval: float = 30.0,
+    ):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending: dict[str, float] = {}    # 아직 기록하지 않은 마지막 사용 시각
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answer_cache (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT key, query, embedding, answer, created_at, last_access FROM answer_cache ORDER BY last_access"
+        ).fetchall()
+        for key, query, blob, answer, created_at, last_access in rows:
+            self._entries[key] = CacheEntry(
+                key, query, np.frombuffer(blob, dtype=np.float32).copy(), answer, created_at, last_access
+            )
+        # 저장된 파일에 남아 있던 만료/초과 항목 정리
+        self.evict()
+
+    def _write_pending(self) -> None:
+        """모아 둔 마지막 사용 시각을 기록한다 (커밋은 호출한 쪽에서, self._lock 안에서 호출)."""
+        if self._pending:
+            self._conn.executemany(
+                "UPDATE answer_cache SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._pending.items()],
+            )
+            self._pending.clear()
+        self._last_flush = time.time()
+
+    def flush(self) -> None:
+        """모아 둔 마지막 사용 시각을 바로 기록한다 (종료 시 호출)."""
+        with self._lock:
+            self._write_pending()
+            self._conn.commit()
+
+    def _remove(self, key: str) -> None:
+        super()._remove(key)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+            self._write_pending()
+            self._conn.commit()
+
+    def _touch(self, entry: CacheEntry, now: float) -> None:
+        super()._touch(entry, now)
+        self._pending[entry.key] = now
+        if len(self._pending) >= self.flush_size or now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def put(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self._pending.pop(entry.key, None)
+            self._write_pending()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.query, entry.embedding.astype(np.float32).tobytes(),
+                 entry.answer, entry.created_at, entry.last_access),
+            )
+            self._conn.commit()
+        super().put(entry)
+
+    def clear(self) -> None:
+        super().clear()
+        with self._lock:
+            self._pending.clear()
+            self._conn.execute("DELETE FROM answer_cache")
+            self._conn.commit()
+
+
+class SemanticAnswerCache:
+    """
+    process_query 앞단에 두는 답변 캐시.
+
+    1) 정규화된 질의가 정확히 같으면 임베딩 호출 없이 바로 적중
+    2) 아니면 질의를 임베딩해 코사인 유사도 threshold 이상인 저장 답변을 반환
+    3) 둘 다 아니면 compute()로 답변을 만들고 저장
+    """
+
+    def __init__(self, embeddings, backend: Optional[InMemoryCacheBackend] = None, threshold: float = 0.95):
+        self.embeddings = embeddings      # langchain Embeddings (예: ExplainTheoryAgent.embeddings)
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    async def _aembed(self, key: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(key), dtype=np.float32)
+        except Exception as e:
+            # 임베딩 실패는 캐시 미스로 취급하고 요청 처리는 계속한다.
+            print(f"답변 캐시 임베딩 오류: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def get_or_compute(
+        self,
+        query: str,
+        compute: Callable[[], Awaitable[Optional[str]]],
+        cacheable: Callable[[str], bool] = bool,
+    ) -> Optional[str]:
+        """
+        캐시된 답변을 찾고, 없으면 compute()를 실행해 결과를 저장한다.
+
+        Args:
+            query (str): 사용자의 질의
+            compute: 캐시 미스일 때 답변을 만드는 코루틴 함수
+            cacheable: 새로 만든 답변을 저장할지 정하는 함수 (기본: 빈 답변이 아니면 저장)
+
+        Returns:
+            Optional[str]: 캐시된 답변 또는 새로 만든 답변
+        """
+        key = normalize_query(query)
+        entry = self.backend.get(key)
+        if entry is not None:
+            self.exact_hits += 1
+            print(f"답변 캐시 적중(정확 일치): {query}")
+            return entry.answer
+
+        embedding = await self._aembed(key)
+        if embedding is not None:
+            match = self.backend.search(embedding, self.threshold)
+            if match is not None:
+                entry, score = match
+                self.semantic_hits += 1
+                print(f"답변 캐시 적중(유사도 {score:.3f}): {query} ≈ {entry.query}")
+                return entry.answer
+
+        self.misses += 1
+        answer = await compute()
+        if answer and cacheable(answer) and embedding is not None:
+            now = time.time()
+            try:
+                self.backend.put(CacheEntry(key, query, embedding, answer, now, now))
+            except Exception:
+                print(f"답변 캐시 저장 오류: \n{traceback.format_exc()}")
+        return answer
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "size": len(self.backend),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,121 @@
+"""
+수락 제어(admission control) 벤치마크
+
+실제 FastAPI 앱(main.app)에 httpx ASGI 전송으로 /qna 요청 N개를 한꺼번에 보낸다 (서버/네트워크 없이).
+에이전트는 가짜로 바꾸되, 동시에 실행 중인 호출이 --capacity개를 넘으면 그 비율만큼 느려지게 해
+제공자 처리량이 포화되는 상황을 흉내낸다.
+- off: 제한 없이 모두 수락 → 모든 요청의 지연시간이 함께 늘어난다
+- on:  동시 처리 상한 + 대기열 + 마감 → 수락된 요청은 빠르게 끝나고, 나머지는 429/503 + Retry-After를 바로 받는다
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.admission --requests 60 --capacity 8 --max-in-flight 4 --max-queue 8 --queue-timeout 3
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+from collections import Counter
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+os.environ["ANSWER_CACHE_BACKEND"] = "off"
+
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import main as server
+import workflow
+from benchmarks.concurrency import fake_router
+
+
+class SaturatingProvider:
+    """동시 호출 수가 capacity를 넘으면 호출마다 (동시 호출 수 / capacity)배 느려지는 가짜 제공자"""
+
+    def __init__(self, latency: float, capacity: int):
+        self.latency = latency
+        self.capacity = capacity
+        self.active = 0
+
+    def agent(self, name: str) -> RunnableLambda:
+        async def _run(state):
+            self.active += 1
+            try:
+                await asyncio.sleep(self.latency * max(1.0, self.active / self.capacity))
+            finally:
+                self.active -= 1
+            return {"messages": [AIMessage(content=f"{name} 결과\nStatus: COMPLETE")]}
+        return RunnableLambda(_run)
+
+
+def install(provider: SaturatingProvider, router_latency: float) -> None:
+    workflow.Task_Manager.agent = fake_router(router_latency)
+    for name, agent in [
+        ("ExternalSearch", workflow.search_agent),
+        ("ProblemSolving", workflow.solving_agent),
+        ("ProblemGeneration", workflow.generating_agent),
+        ("GeneratingResponse", workflow.response_agent),
+        ("ExplainTheoryAgent", workflow.explain_theory_agent),
+    ]:
+        agent.agent = provider.agent(name)
+
+
+async def burst(n: int) -> dict:
+    results = []
+
+    async def one(client, i):
+        start = time.perf_counter()
+        response = await client.post("/qna", json={"query": f"질문 {i}: 함수의 극한이란?"})
+        results.append((response.status_code, time.perf_counter() - start, response.headers.get("retry-after")))
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(n)))
+        elapsed = time.perf_counter() - start
+
+    ok = sorted(t for code, t, _ in results if code == 200)
+    rejected = [t for code, t, _ in results if code != 200]
+    return {
+        "codes": Counter(code for code, _, _ in results),
+        "elapsed": elapsed,
+        "ok_p50": statistics.median(ok) if ok else 0.0,
+        "ok_p99": ok[min(len(ok) - 1, int(len(ok) * 0.99))] if ok else 0.0,
+        "reject_max": max(rejected) if rejected else 0.0,
+        "retry_after": sorted({r for code, _, r in results if r}),
+    }
+
+
+async def main(n: int, latency: float, capacity: int, max_in_flight: int, max_queue: int, queue_timeout: float) -> None:
+    provider = SaturatingProvider(latency, capacity)
+    install(provider, router_latency=latency / 4)
+    controller = server.admission_controllers["/qna"]
+    print(f"/qna 요청 {n}개 동시, 에이전트 {latency}초(동시 {capacity}개 초과 시 비례해 느려짐)")
+    for mode, in_flight in (("off", 0), ("on", max_in_flight)):
+        controller.max_in_flight, controller.max_queue, controller.queue_timeout = in_flight, max_queue, queue_timeout
+        controller.service_time = None
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await burst(n)
+        codes = ", ".join(f"{code}×{count}" for code, count in sorted(result["codes"].items()))
+        print(
+            f"{mode:<3} [{codes}] 전체 {result['elapsed']:6.2f}초 | 성공 p50 {result['ok_p50']:5.2f}초, "
+            f"p99 {result['ok_p99']:5.2f}초 | 거절 응답 최대 {result['reject_max'] * 1000:6.1f}ms | "
+            f"Retry-After {result['retry_after']}"
+        )
+    print(f"통계: {controller.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--agent-latency", type=float, default=0.5, help="포화되지 않았을 때 가짜 에이전트 1회 지연시간(초)")
+    parser.add_argument("--capacity", type=int, default=8, help="느려지지 않고 동시에 처리할 수 있는 에이전트 호출 수")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.agent_latency, args.capacity, args.max_in_flight, args.max_queue, args.queue_timeout))
@@ -0,0 +1,91 @@
+"""
+동시 요청 벤치마크
+
+LLM/검색 호출을 지연시간만 흉내내는 가짜 러너블로 교체한 뒤,
+같은 워커(이벤트 루프) 위에서 N개의 요청을 순차/동시 실행해 전체 소요 시간을 비교한다.
+비동기 경로가 제대로 동작한다면 동시 실행 시간은 sum(latency)가 아니라 max(latency)에 가까워야 한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.concurrency --requests 8 --agent-latency 0.5 --router-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+import workflow
+from agent.task_manager import RouteResponse
+
+
+def fake_agent(name: str, latency: float) -> RunnableLambda:
+    """지정한 지연시간 후 Status: COMPLETE 응답을 돌려주는 가짜 에이전트"""
+    async def _run(state):
+        await asyncio.sleep(latency)
+        return {"messages": [AIMessage(content=f"{name} 결과\nStatus: COMPLETE")]}
+    return RunnableLambda(_run)
+
+
+def fake_router(latency: float) -> RunnableLambda:
+    """User 메시지 다음에는 ExplainTheoryAgent, 그 외에는 GeneratingResponse로 보내는 가짜 TaskManager"""
+    async def _route(state):
+        await asyncio.sleep(latency)
+        last = state["messages"][-1]
+        return RouteResponse(next="ExplainTheoryAgent" if last.name == "User" else "GeneratingResponse")
+    return RunnableLambda(_route)
+
+
+def install_fakes(agent_latency: float, router_latency: float) -> None:
+    workflow.Task_Manager.agent = fake_router(router_latency)
+    for name, agent in [
+        ("ExternalSearch", workflow.search_agent),
+        ("ProblemSolving", workflow.solving_agent),
+        ("ProblemGeneration", workflow.generating_agent),
+        ("GeneratingResponse", workflow.response_agent),
+        ("ExplainTheoryAgent", workflow.explain_theory_agent),
+    ]:
+        agent.agent = fake_agent(name, agent_latency)
+
+
+async def run_one(i: int) -> float:
+    state = {"user_input": f"질문 {i}: 함수의 극한이란 무엇인가요?"}
+    start = time.perf_counter()
+    await workflow.graph.ainvoke(state, RunnableConfig(recursion_limit=10))
+    return time.perf_counter() - start
+
+
+async def main(n: int) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 순차 실행: 요청 하나의 지연시간 기준값
+        start = time.perf_counter()
+        latencies = [await run_one(i) for i in range(n)]
+        sequential = time.perf_counter() - start
+
+        # 동시 실행: 한 이벤트 루프에서 N개 요청을 동시에 처리
+        start = time.perf_counter()
+        await asyncio.gather(*(run_one(i) for i in range(n)))
+        concurrent = time.perf_counter() - start
+
+    print(f"요청 수: {n}")
+    print(f"요청당 지연시간 max: {max(latencies):.3f}초, sum: {sum(latencies):.3f}초")
+    print(f"순차 실행: {sequential:.3f}초")
+    print(f"동시 실행: {concurrent:.3f}초 (max 대비 {concurrent / max(latencies):.2f}배)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMA 그래프 동시 요청 벤치마크")
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--agent-latency", type=float, default=0.5)
+    parser.add_argument("--router-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    install_fakes(args.agent_latency, args.router_latency)
+    asyncio.run(main(args.requests))
@@ -0,0 +1,109 @@
+"""
+ReAct 에이전트 vs 단일 호출 체인 벤치마크 (ProblemSolving / ProblemGeneration / GeneratingResponse)
+
+세 에이전트의 실제 프롬프트와 더미 도구를 그대로 쓰고, 모델만 가짜 채팅 모델로 바꿔
+요청당 LLM 호출 수와 지연시간을 비교한다.
+가짜 모델은 호출마다 --llm-latency초 걸리고, ReAct 모드에서는 첫 턴에 --tool-call-rate 확률로
+더미 도구를 "호출"한다 (Gemini Pro가 더미 도구를 부르는 경우를 흉내). 도구 결과를 받으면 최종 응답을 낸다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.direct_chain --requests 20 --llm-latency 0.5 --tool-call-rate 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.prebuilt import create_react_agent
+
+from agent.direct_chain import direct_chain
+from agent.problem_generation_agent import ProblemGenerationAgent
+from agent.problem_solving_agent import ProblemSolvingAgent
+from agent.response_generation_agent import ResponseGenerationAgent
+
+
+class FakeGemini(BaseChatModel):
+    """호출 수를 세고 지연시간을 흉내내는 가짜 채팅 모델. 도구가 바인딩되면 가끔 더미 도구를 부른다."""
+
+    latency: float = 0.5
+    tool_call_rate: float = 0.5
+    calls: int = 0
+    bound_tools: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound_tools = list(tools)
+        return self
+
+    def _reply(self, messages) -> AIMessage:
+        self.calls += 1
+        rng = random.Random(self.calls)
+        if self.bound_tools and not isinstance(messages[-1], ToolMessage) and rng.random() < self.tool_call_rate:
+            tool = self.bound_tools[0]
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": tool.name, "args": {k: "draft" for k in tool.args}, "id": f"call_{self.calls}"}],
+            )
+        return AIMessage(content="결과\nStatus: COMPLETE")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+async def measure(agent, model: FakeGemini, n: int) -> dict:
+    model.calls = 0
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        result = await agent.ainvoke({"messages": [HumanMessage(content=f"질문 {i}: x^2의 도함수는?", name="User")]})
+        latencies.append(time.perf_counter() - start)
+        assert "Status: COMPLETE" in result["messages"][-1].content
+    return {"calls": model.calls / n, "p50": statistics.median(latencies), "mean": statistics.mean(latencies)}
+
+
+async def main(n: int, llm_latency: float, tool_call_rate: float) -> None:
+    agents = {
+        "ProblemSolving": (ProblemSolvingAgent(), "solving_prompt"),
+        "ProblemGeneration": (ProblemGenerationAgent(), "generation_prompt"),
+        "GeneratingResponse": (ResponseGenerationAgent(), "response_prompt"),
+    }
+    print(f"에이전트별 요청 {n}개, LLM 호출 {llm_latency}초, 더미 도구 호출 확률 {tool_call_rate}")
+    for name, (agent, prompt_attr) in agents.items():
+        prompt = getattr(agent, prompt_attr)
+        for mode in ("react", "direct"):
+            model = FakeGemini(latency=llm_latency, tool_call_rate=tool_call_rate)
+            runnable = (
+                create_react_agent(model, agent.tools, state_modifier=prompt) if mode == "react"
+                else direct_chain(model, prompt)
+            )
+            result = await measure(runnable, model, n)
+            print(
+                f"{name:<18} {mode:<6} 요청당 LLM 호출 {result['calls']:.2f}회 | "
+                f"p50 {result['p50'] * 1000:7.1f}ms | 평균 {result['mean'] * 1000:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="가짜 LLM 호출 1회 지연시간(초)")
+    parser.add_argument("--tool-call-rate", type=float, default=0.5, help="ReAct 첫 턴에 더미 도구를 부를 확률")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.llm_latency, args.tool_call_rate))
@@ -0,0 +1,114 @@
+"""
+질의 임베딩 캐시/마이크로 배칭 벤치마크
+
+여러 요청이 동시에 질의를 임베딩하는 상황(검색 스레드 풀)을 흉내내 원격 임베딩 호출 수와 전체 소요 시간을 비교한다.
+질의는 benchmarks/md_queries.jsonl에서 중복을 허용해 뽑고, 일부는 공백/문장부호만 다른 변형으로 바꾼다.
+- direct: 캐시 없이 매번 embed_query
+- cache:  LRU 캐시만 (배치 대기 없음)
+- batch:  LRU 캐시 + 마이크로 배처 (동시 미스를 --window-ms 동안 모아 한 번에 호출)
+- disk:   같은 SQLite 파일로 새 프로세스가 시작했다고 가정 (메모리 캐시는 비어 있음)
+임베딩은 결정적 가짜 임베딩이며 원격 호출 1회마다 --embed-latency초 지연을 흉내낸다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.embedding_cache --requests 400 --concurrency 16 --embed-latency 0.2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from embedding_cache import CachedEmbeddings, EmbeddingDiskStore
+from md_ingest import EMBEDDING_DIM
+
+QUERIES_PATH = Path(__file__).with_name("md_queries.jsonl")
+
+
+class RemoteEmbeddings(Embeddings):
+    """원격 호출 수를 세고 호출마다 latency초 지연 (배치 호출도 1회로 센다)"""
+
+    def __init__(self, latency: float):
+        self.embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def embed_query(self, text: str) -> list[float]:
+        self._call()
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        self._call()
+        return self.embeddings.embed_documents(texts)
+
+
+def make_workload(n: int, rng: random.Random) -> list[str]:
+    queries = [json.loads(line)["query"] for line in QUERIES_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+    workload = []
+    for _ in range(n):
+        q = rng.choice(queries)
+        if rng.random() < 0.3:
+            q = "  " + q.replace(" ", "  ") + "?"     # 정규화하면 같은 키가 되는 변형
+        workload.append(q)
+    return workload
+
+
+def run(embeddings: Embeddings, remote: RemoteEmbeddings, workload: list[str], concurrency: int) -> dict:
+    remote.calls = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(embeddings.embed_query, workload))
+    return {"elapsed": time.perf_counter() - start, "calls": remote.calls}
+
+
+def main(n_requests: int, concurrency: int, embed_latency: float, window_ms: float) -> None:
+    workload = make_workload(n_requests, random.Random(0))
+    remote = RemoteEmbeddings(embed_latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.sqlite3")
+        cache = CachedEmbeddings(remote)
+        cache.window = 0.0
+        batch = CachedEmbeddings(remote)
+        batch.window = window_ms / 1000
+        batch.disk = EmbeddingDiskStore(path, "bench")
+        modes = {"direct": remote, "cache": cache, "batch": batch}
+        print(f"요청 {n_requests}개 (서로 다른 질의 {len({q.strip() for q in workload})}개 이하), 동시 {concurrency}, "
+              f"원격 호출 {embed_latency}초, 배치 대기 {window_ms}ms")
+        for name, embeddings in modes.items():
+            result = run(embeddings, remote, workload, concurrency)
+            stats = embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else {}
+            print(
+                f"{name:<7} 원격 호출 {result['calls']:>4}회 | 소요 {result['elapsed']:6.2f}초 | "
+                f"적중률 {stats.get('hit_rate', 0.0):.3f} | 평균 배치 {stats.get('avg_batch_size', 1.0)}"
+            )
+
+        restarted = CachedEmbeddings(remote)
+        restarted.disk = EmbeddingDiskStore(path, "bench")
+        result = run(restarted, remote, workload, concurrency)
+        stats = restarted.stats()
+        print(
+            f"{'disk':<7} 원격 호출 {result['calls']:>4}회 | 소요 {result['elapsed']:6.2f}초 | "
+            f"적중률 {stats['hit_rate']:.3f} | 디스크 적중 {stats['disk_hits']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="원격 임베딩 호출 1회 지연시간(초)")
+    parser.add_argument("--window-ms", type=float, default=10.0, help="마이크로 배처 대기 시간(ms)")
+    args = parser.parse_args()
+    main(args.requests, args.concurrency, args.embed_latency, args.window_ms)
@@ -0,0 +1,139 @@
+"""
+전체 그래프 오프라인 벤치마크 (API 키/네트워크 없이 CI에서 실행 가능)
+
+benchmarks.offline_stubs로 TaskManager와 다섯 에이전트의 모든 LLM, Gemini 임베딩, Tavily 검색을
+지연시간과 응답이 결정적인 가짜로 바꾼 뒤, 나머지(의도 라우터, 감독자 루프 제어, 시간 예산, 컨텍스트 예산,
+ReAct 도구 호출, 벡터스토어 검색, LLM 제한기)는 실제 코드 그대로 두고 미적분 질의 모음을 재생한다.
+질의마다 각본(graph_queries.jsonl의 route / parallel / fail)대로 TaskManager가 라우팅하고 에이전트가 답한다.
+
+동시 실행 수별로 처리량(요청/초), 요청 지연시간 p50/p99, 요청당 hop 수, 노드별 LLM 호출 수,
+요청당 입력/출력 토큰 수, 임베딩/검색 호출 수, 중간 답변 수를 출력한다.
+오류가 난 요청이 있으면 종료 코드 1로 끝난다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.full_graph --requests 48 --concurrency 1,4,16 --llm-latency 0.8 --router-latency 0.4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+
+from langchain_core.runnables import RunnableConfig
+
+from benchmarks.offline_stubs import Script, install
+
+install()   # workflow가 에이전트를 만들기 전에 바꿔야 한다
+
+import workflow
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "graph_queries.jsonl")
+
+
+def load_queries(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(queries: list[dict], n: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, hops, errors, partial = [], [], Counter(), 0
+
+    async def one(i: int) -> None:
+        nonlocal partial
+        query = queries[i % len(queries)]["query"]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await workflow.graph.ainvoke({"user_input": query}, RunnableConfig(recursion_limit=20))
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            hops.append(len(result["hops"]))
+            partial += workflow.is_partial_answer(workflow.final_answer(result))
+
+    Script.reset_counters()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "hops": hops,
+        "errors": errors,
+        "partial": partial,
+        "llm_calls": Counter(Script.llm_calls),
+        "prompt_tokens": Script.prompt_tokens,
+        "completion_tokens": Script.completion_tokens,
+        "embed_calls": Script.embed_calls,
+        "search_calls": Script.search_calls,
+    }
+
+
+def report(concurrency: int, n: int, result: dict) -> None:
+    latencies = result["latencies"] or [0.0]
+    calls = result["llm_calls"]
+    by_node = ", ".join(f"{name} {count / n:.2f}" for name, count in sorted(calls.items()))
+    print(
+        f"동시 {concurrency:>3} | {n / result['elapsed']:6.2f} 요청/초 | p50 {statistics.median(latencies):.2f}초 "
+        f"p99 {percentile(latencies, 0.99):.2f}초 | 요청당 hop {statistics.mean(result['hops'] or [0]):.2f}, "
+        f"LLM 호출 {sum(calls.values()) / n:.2f}회, 토큰 입력 {result['prompt_tokens'] / n:.0f} / 출력 {result['completion_tokens'] / n:.0f}"
+    )
+    print(
+        f"        노드별 LLM 호출/요청: {by_node} | 임베딩 {result['embed_calls']}회, 검색 {result['search_calls']}회 | "
+        f"중간 답변 {result['partial']}, 오류 {dict(result['errors']) or 0}"
+    )
+
+
+async def main(args) -> int:
+    queries = load_queries(args.queries)
+    Script.routes = {item["query"]: item for item in queries}
+    Script.llm_latency, Script.router_latency = args.llm_latency, args.router_latency
+    Script.embed_latency, Script.search_latency, Script.jitter = args.embed_latency, args.search_latency, args.jitter
+    # 의도 라우터는 각본과 관계없이 첫 hop을 정하므로 기본으로 꺼 둔다
+    workflow.intent_router.enabled = args.intent_router == "on"
+
+    print(
+        f"질의 {len(queries)}개 × 요청 {args.requests}개, 에이전트 LLM {args.llm_latency}초 / TaskManager {args.router_latency}초 "
+        f"(로그정규 sigma {args.jitter}), 임베딩 {args.embed_latency}초, 검색 {args.search_latency}초, 의도 라우터 {args.intent_router}"
+    )
+    # 워밍업: 벡터스토어/임베딩 캐시 로드, 시간 예산 추정치 학습 (질의마다 한 번)
+    await run(queries, len(queries), len(queries))
+
+    failed = False
+    for concurrency in args.concurrency:
+        result = await run(queries, args.requests, concurrency)
+        report(concurrency, args.requests, result)
+        failed |= bool(result["errors"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMA 전체 그래프 오프라인 벤치마크")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="에이전트(Gemini) LLM 호출 1회 기준 지연시간(초)")
+    parser.add_argument("--router-latency", type=float, default=0.4, help="TaskManager LLM 호출 1회 기준 지연시간(초)")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--intent-router", choices=["on", "off"], default="off", help="on이면 의도 라우터가 각본보다 먼저 첫 hop을 정한다")
+    parser.add_argument("--jitter", type=float, default=0.3, help="지연시간 로그정규 분포의 sigma (0이면 고정)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
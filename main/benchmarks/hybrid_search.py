@@ -0,0 +1,104 @@
+"""
+한국어 가이드(md_vectorstore) 검색 방식 벤치마크 (벡터 / BM25 / 하이브리드)
+
+benchmarks/md_queries.jsonl의 질의 세트(청크에서 뽑지 않은 별도 질의, 정답은 챕터 번호)로
+방식별 recall@k(상위 k개 중 정답 챕터 청크가 있는 질의 비율), 질의당 지연시간, 임베딩 호출 수를 비교한다.
+
+기본은 API 없이 결정적 가짜 임베딩(호출마다 --embed-latency초 지연)을 쓰므로 벡터/하이브리드 recall은 의미가 없어
+"-"로 표시하고 지연시간/호출 수만 보여 준다 (BM25 recall은 임베딩과 무관하므로 그대로 표시). 실제 recall을 보려면 GOOGLE_API_KEY를 설정하고 --real-embeddings로 실행한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.hybrid_search --k 2 --embed-latency 0.3
+    python -m benchmarks.hybrid_search --k 2 --real-embeddings
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from hybrid_search import HybridSearcher
+from md_ingest import EMBEDDING_DIM
+from vector_stores import load_faiss
+
+QUERIES_PATH = Path(__file__).with_name("md_queries.jsonl")
+
+
+class CountingEmbeddings(Embeddings):
+    """질의 임베딩 호출 수를 세고, 가짜 임베딩이면 지연시간을 흉내낸다."""
+
+    def __init__(self, embeddings, latency: float = 0.0):
+        self.embeddings = embeddings
+        self.latency = latency
+        self.calls = 0
+
+    async def aembed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await self.embeddings.aembed_query(text)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+
+async def evaluate(searcher: HybridSearcher, embeddings: CountingEmbeddings, queries: list[dict], k: int) -> dict:
+    embeddings.calls = 0
+    hits, latencies = 0, []
+    for q in queries:
+        start = time.perf_counter()
+        docs = await searcher.asearch(q["query"], k=k)
+        latencies.append(time.perf_counter() - start)
+        hits += any(doc.metadata.get("url", "")[-2:] in q["chapters"] for doc in docs)
+    return {
+        "recall": hits / len(queries),
+        "p50": statistics.median(latencies),
+        "mean": statistics.mean(latencies),
+        "embed_calls": embeddings.calls,
+    }
+
+
+async def main(k: int, embed_latency: float, real_embeddings: bool) -> None:
+    if real_embeddings:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = CountingEmbeddings(GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-exp-03-07"))
+    else:
+        embeddings = CountingEmbeddings(DeterministicFakeEmbedding(size=EMBEDDING_DIM), latency=embed_latency)
+    store = load_faiss("md_vectorstore", embeddings)
+    queries = [json.loads(line) for line in QUERIES_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    modes = {}
+    vector = HybridSearcher(lambda: store)
+    vector.enabled = False                  # BM25를 건너뛰고 벡터 검색만
+    modes["vector"] = vector
+    lexical = HybridSearcher(lambda: store)
+    lexical.confidence = 0.0                # 항상 BM25 결과만
+    modes["bm25"] = lexical
+    modes["hybrid"] = HybridSearcher(lambda: store)
+
+    print(f"질의 {len(queries)}개, recall@{k} ({'실제' if real_embeddings else '가짜'} 임베딩)")
+    if not real_embeddings:
+        print("주의: 가짜 임베딩이라 vector/hybrid recall은 의미가 없습니다 (지연시간/호출 수만 참고, 실제 recall은 --real-embeddings)")
+    for name, searcher in modes.items():
+        result = await evaluate(searcher, embeddings, queries, k)
+        recall = f"{result['recall']:.3f}" if real_embeddings or name == "bm25" else "    -"
+        print(
+            f"{name:<7} recall@{k} {recall} | p50 {result['p50'] * 1000:7.1f}ms | "
+            f"평균 {result['mean'] * 1000:7.1f}ms | 임베딩 호출 {result['embed_calls']:>3}회"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--embed-latency", type=float, default=0.3, help="가짜 임베딩 호출 1회 지연시간(초)")
+    parser.add_argument("--real-embeddings", action="store_true", help="Gemini 임베딩 API 사용 (GOOGLE_API_KEY 필요)")
+    args = parser.parse_args()
+    asyncio.run(main(args.k, args.embed_latency, args.real_embeddings))
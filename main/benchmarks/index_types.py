@@ -0,0 +1,120 @@
+"""
+인덱스 형식 벤치마크 (flat / fp16 / sq8 / ivf / ivf_sq8)
+
+md_vectorstore의 실제 임베딩(기본 276개)을 바탕으로 형식별 인덱스를 임시 디렉터리에 만들고,
+flat 결과를 정답으로 한 recall@k, 질의당 검색 지연시간, 디스크 크기, 로드 후 RSS 증가량을 비교한다.
+- 질의: 말뭉치 벡터 두 개를 섞고 잡음을 더한 벡터 (말뭉치에 없는 질의)
+- --scale N: 실제 벡터에 잡음을 더해 N개로 늘린 말뭉치 (교재 벡터스토어처럼 큰 인덱스 흉내)
+- RSS는 형식마다 새 프로세스에서 mmap으로 로드한 뒤 측정한다 (Linux)
+- IVF는 nprobe가 군집 수(nlist) 이상이면 모든 군집을 훑어 flat과 같아지므로, nprobe를 nlist의 절반 이하로 줄여 잰다.
+  원본 276개로는 nlist가 7이라 IVF 수치는 참고용이다 (--scale로 늘려서 비교할 것)
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.index_types --k 5 --queries 200
+    python -m benchmarks.index_types --k 5 --scale 20000 --nprobe 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from vector_stores import INDEX_TYPES, build_index, index_file, ivf_nlist, read_index
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1])
+    return 0
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_corpus(path: str, scale: int, rng: np.random.Generator) -> np.ndarray:
+    base = faiss.read_index(str(index_file(path)))
+    vectors = base.reconstruct_n(0, base.ntotal)
+    if scale <= len(vectors):
+        return vectors
+    picks = rng.integers(0, len(vectors), scale - len(vectors))
+    noisy = normalize(vectors[picks] + rng.normal(0, 0.02, (len(picks), vectors.shape[1])))
+    return np.vstack([vectors, noisy])
+
+
+def make_queries(corpus: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    a, b = rng.integers(0, len(corpus), (2, n))
+    mix = corpus[a] + 0.5 * corpus[b] + rng.normal(0, 0.01, (n, corpus.shape[1]))
+    return normalize(mix)
+
+
+def measure(file: Path, index_type: str, nprobe: int, queries: np.ndarray, truth: np.ndarray, k: int, queue) -> None:
+    """새 프로세스에서 인덱스를 로드해 RSS 증가량, 지연시간, recall을 잰다."""
+    before = rss_kb()
+    index = read_index(file, index_type, mmap=True, nprobe=nprobe)
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = statistics.mean(len(set(f) & set(t)) / k for f, t in zip(found, truth))
+    queue.put({
+        "recall": recall,
+        "p50": statistics.median(latencies),
+        "p99": float(np.percentile(latencies, 99)),
+        "rss": rss_kb() - before,
+    })
+
+
+def main(path: str, k: int, n_queries: int, scale: int, nprobe: int) -> None:
+    rng = np.random.default_rng(0)
+    corpus = make_corpus(path, scale, rng)
+    queries = make_queries(corpus, n_queries, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = faiss.IndexFlatL2(corpus.shape[1])
+        flat.add(corpus)
+        faiss.write_index(flat, str(index_file(tmp)))
+        _, truth = flat.search(queries, k)
+
+        nlist = ivf_nlist(len(corpus))
+        # nprobe >= nlist면 IVF가 모든 군집을 검색해 recall/지연시간이 flat과 다를 바 없으므로 군집 일부만 보게 줄인다
+        probe = min(nprobe, max(1, nlist // 2))
+        print(f"벡터 {len(corpus)}개 × {corpus.shape[1]}차원, 질의 {n_queries}개, recall@{k} (flat 기준)")
+        print(f"IVF nlist={nlist}, nprobe={probe} (군집 {probe / nlist:.0%} 검색{', 요청한 nprobe ' + str(nprobe) + '에서 줄임' if probe != nprobe else ''})")
+        if probe >= nlist:
+            print("※ 군집이 하나뿐이라 IVF 결과는 flat과 같다 (--scale로 말뭉치를 늘릴 것)")
+        ctx = mp.get_context("fork")
+        for index_type in INDEX_TYPES:
+            start = time.perf_counter()
+            file = index_file(tmp) if index_type == "flat" else build_index(tmp, index_type)
+            build = time.perf_counter() - start
+            queue = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(file, index_type, probe, queries, truth, k, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            print(
+                f"{index_type:<8} recall@{k} {result['recall']:.3f} | p50 {result['p50'] * 1000:6.2f}ms | "
+                f"p99 {result['p99'] * 1000:6.2f}ms | 디스크 {os.path.getsize(file) / 1e6:7.2f}MB | "
+                f"RSS +{result['rss'] / 1e3:7.2f}MB | 생성 {build:.2f}초"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="md_vectorstore")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=0, help="말뭉치를 이 개수까지 늘린다 (0이면 원본 그대로)")
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+    main(args.path, args.k, args.queries, args.scale, args.nprobe)
@@ -0,0 +1,67 @@
+"""
+md_vectorstore 증분 빌드 벤치마크
+
+chapters_md를 임시 디렉터리에 복사해 결정적 가짜 임베딩(API 호출 없음, 호출마다 지연시간만 흉내)으로
+전체 빌드 → 변경 없이 재실행 → 챕터 하나 수정 후 재실행 순서로 돌리고,
+단계별 임베딩 청크 수/호출 수/소요 시간을 비교한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.ingest --embed-latency 0.2 --batch-size 32 --concurrency 4
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from md_ingest import CHAPTERS_DIR, EMBEDDING_DIM, ingest
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    """호출마다 latency초 기다린 뒤 결정적 임베딩을 돌려주는 가짜 임베딩 (호출 수를 센다)"""
+    latency: float = 0.0
+    calls: int = 0
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self.embed_documents(texts)
+
+
+async def main(embed_latency: float, batch_size: int, concurrency: int) -> None:
+    embeddings = SlowFakeEmbedding(size=EMBEDDING_DIM, latency=embed_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        chapters_dir = Path(tmp) / "chapters_md"
+        index_dir = str(Path(tmp) / "md_vectorstore")
+        shutil.copytree(CHAPTERS_DIR, chapters_dir)
+
+        async def step(label: str) -> None:
+            embeddings.calls = 0
+            start = time.perf_counter()
+            report = await ingest(embeddings, str(chapters_dir), index_dir, batch_size, concurrency)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:<12} 청크 {report['total']:>4} | 임베딩 {report['added']:>4}개 / 호출 {embeddings.calls:>3}회 | "
+                f"삭제 {report['deleted']:>3} | {elapsed:.3f}초"
+            )
+
+        await step("전체 빌드")
+        await step("변경 없음")
+
+        # 챕터 하나의 첫 문단을 수정
+        path = sorted(chapters_dir.glob("*.md"))[0]
+        text = path.read_text(encoding="utf-8")
+        path.write_text(text.replace("\n", "\n(수정된 문단)\n", 2), encoding="utf-8")
+        await step("챕터 1개 수정")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="임베딩 호출 1회 지연시간(초)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.embed_latency, args.batch_size, args.concurrency))
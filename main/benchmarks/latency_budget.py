@@ -0,0 +1,104 @@
+"""
+요청 시간 예산(deadline) 벤치마크
+
+가짜 에이전트로 그래프를 실행하되, 호출 중 --slow-rate 비율은 --slow-latency초 걸리게 하고(제공자 지연 꼬리),
+ExplainTheoryAgent는 --fail-rate 확률로 FAILED를 내 대체 경로(ExternalSearch) hop이 늘어나게 한다.
+- off: 시간 예산 없음 → 느린 호출이 그대로 요청 지연시간이 된다
+- on:  --budget초 예산 → 느린 에이전트는 제한 시간에 끊기고, 남은 시간이 부족하면 바로 GeneratingResponse로 가며,
+       GeneratingResponse까지 늦으면 지금까지의 결과로 중간 답변을 돌려준다
+요청 지연시간 p50/p99/최대와 중간 답변 비율을 비교한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.latency_budget --requests 40 --agent-latency 0.3 --slow-rate 0.2 --slow-latency 5 --budget 2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+os.environ["INTENT_ROUTER"] = "off"
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+import workflow
+from benchmarks.concurrency import fake_router
+
+
+def tail_agent(name: str, rng: random.Random, latency: float, slow_rate: float, slow_latency: float, fail_rate: float) -> RunnableLambda:
+    """대부분 latency초, slow_rate 비율로 slow_latency초 걸리는 가짜 에이전트"""
+    async def _run(state):
+        await asyncio.sleep(slow_latency if rng.random() < slow_rate else latency)
+        status = "FAILED" if name == "ExplainTheoryAgent" and rng.random() < fail_rate else "COMPLETE"
+        return {"messages": [AIMessage(content=f"{name} 결과\nStatus: {status}")]}
+    return RunnableLambda(_run)
+
+
+def install(seed: int, latency: float, slow_rate: float, slow_latency: float, fail_rate: float) -> None:
+    rng = random.Random(seed)
+    workflow.Task_Manager.agent = fake_router(latency / 2)
+    for name, agent in [
+        ("ExternalSearch", workflow.search_agent),
+        ("ProblemSolving", workflow.solving_agent),
+        ("ProblemGeneration", workflow.generating_agent),
+        ("GeneratingResponse", workflow.response_agent),
+        ("ExplainTheoryAgent", workflow.explain_theory_agent),
+    ]:
+        agent.agent = tail_agent(name, rng, latency, slow_rate, slow_latency, fail_rate)
+
+
+async def run(n: int) -> dict:
+    async def one(i):
+        start = time.perf_counter()
+        result = await workflow.graph.ainvoke({"user_input": f"질문 {i}: 함수의 극한이란?"}, RunnableConfig(recursion_limit=10))
+        return time.perf_counter() - start, workflow.is_partial_answer(workflow.final_answer(result))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(one(i) for i in range(n)))
+    latencies = sorted(t for t, _ in results)
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(n - 1, int(n * 0.99))],
+        "max": latencies[-1],
+        "partial": sum(partial for _, partial in results),
+    }
+
+
+async def main(args) -> None:
+    budget = workflow.latency_budget
+    print(
+        f"요청 {args.requests}개 동시, 에이전트 {args.agent_latency}초 (느린 호출 {args.slow_rate:.0%}는 {args.slow_latency}초), "
+        f"ExplainTheoryAgent 실패율 {args.fail_rate:.0%}"
+    )
+    for mode, seconds in (("off", 0.0), ("on", args.budget)):
+        install(args.seed, args.agent_latency, args.slow_rate, args.slow_latency, args.fail_rate)
+        budget.budget, budget.response_min_timeout = seconds, args.response_min_timeout
+        budget.default_estimate = args.agent_latency
+        budget.estimates.clear()
+        budget.forced_response, budget.partial_answers = 0, 0
+        budget.timeouts.clear()
+        result = await run(args.requests)
+        print(
+            f"{mode:<3} 예산 {seconds:4.1f}초 | p50 {result['p50']:5.2f}초, p99 {result['p99']:5.2f}초, 최대 {result['max']:5.2f}초 | "
+            f"중간 답변 {result['partial']}/{args.requests} | 강제 응답 {budget.forced_response} | 제한 초과 {dict(budget.timeouts)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--agent-latency", type=float, default=0.3, help="가짜 에이전트 1회 지연시간(초)")
+    parser.add_argument("--slow-rate", type=float, default=0.2, help="느린 호출 비율")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="느린 호출 지연시간(초)")
+    parser.add_argument("--fail-rate", type=float, default=0.3, help="ExplainTheoryAgent가 FAILED를 낼 확률")
+    parser.add_argument("--budget", type=float, default=2.0, help="요청당 시간 예산(초)")
+    parser.add_argument("--response-min-timeout", type=float, default=0.5, help="GeneratingResponse 최소 제한 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+"""
+LLM 레지스트리 동시 호출/속도 제한 벤치마크 (가짜 채팅 모델)
+
+가짜 provider는 호출마다 --llm-latency초 걸리고, 제공자 쿼터(--quota-rpm, --quota-in-flight)를 넘는 호출은
+429 응답을 받았다고 보고 센다. 두 호출자가 한 모델을 함께 쓴다.
+- 배경 작업(문제 풀 채우기처럼): --background개 호출을 한꺼번에
+- 대화형 요청: 배경 작업 직후 --interactive개 호출
+제한 없음 / 레지스트리 제한(쿼터에 맞춘 rpm, max_in_flight)을 비교해 429 수, 전체 소요 시간,
+대화형 호출의 대기시간(공정한 대기열 덕분에 배경 작업이 끝날 때까지 기다리지 않는지)을 본다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.llm_limits --background 40 --interactive 5 --quota-rpm 120 --quota-in-flight 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+QUOTA = {"rpm": 120.0, "in_flight": 4}
+
+
+class Provider:
+    """가짜 제공자 측 상태 (진행 중 호출 수, 최근 1분 호출 시각, 쿼터 초과 수)"""
+
+    in_flight = 0
+    rejected = 0
+    recent: deque = deque()
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.in_flight, cls.rejected, cls.recent = 0, 0, deque()
+
+
+class QuotaFakeChatModel(BaseChatModel):
+    """제공자 쿼터를 흉내내는 가짜 채팅 모델 (쿼터 초과 호출 수를 센다)"""
+
+    model: str = "fake"
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "quota-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        now = time.monotonic()
+        window = Provider.recent
+        while window and now - window[0] > 60:
+            window.popleft()
+        window.append(now)
+        Provider.in_flight += 1
+        if Provider.in_flight > QUOTA["in_flight"] or len(window) > QUOTA["rpm"]:
+            Provider.rejected += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            Provider.in_flight -= 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+async def call(model, caller: str) -> float:
+    start = time.perf_counter()
+    await model.ainvoke("질문", config={"metadata": {"langgraph_node": caller}})
+    return time.perf_counter() - start
+
+
+async def scenario(limits: str, background: int, interactive: int, latency: float) -> dict:
+    os.environ["LLM_LIMITS"] = limits
+    from llm_registry import LLMRegistry
+    registry = LLMRegistry()
+    model = registry.get("fake", provider=QuotaFakeChatModel, latency=latency)
+    Provider.reset()
+
+    start = time.perf_counter()
+    bg = [asyncio.create_task(call(model, "QuestionPool")) for _ in range(background)]
+    await asyncio.sleep(0)
+    fg = await asyncio.gather(*(call(model, "GeneratingResponse") for _ in range(interactive)))
+    await asyncio.gather(*bg)
+    return {
+        "elapsed": time.perf_counter() - start,
+        "rejected": Provider.rejected,
+        "interactive_p50": statistics.median(fg),
+        "interactive_max": max(fg),
+        "peak": registry.stats()["fake"]["peak_in_flight"],
+    }
+
+
+async def main(background: int, interactive: int, latency: float) -> None:
+    total = background + interactive
+    print(f"호출 {total}개 (배경 {background}, 대화형 {interactive}), 쿼터 {QUOTA['rpm']:.0f}rpm / 동시 {QUOTA['in_flight']}")
+    modes = {
+        "제한 없음": "fake=0:0",
+        "레지스트리": f"fake={QUOTA['rpm']}:{QUOTA['in_flight']}",
+    }
+    for name, limits in modes.items():
+        result = await scenario(limits, background, interactive, latency)
+        print(
+            f"{name:<6} 429 {result['rejected']:>3}회 | 최대 동시 {result['peak']:>3} | 전체 {result['elapsed']:6.2f}초 | "
+            f"대화형 p50 {result['interactive_p50']:5.2f}초, 최대 {result['interactive_max']:5.2f}초"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--background", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="가짜 LLM 호출 1회 지연시간(초)")
+    parser.add_argument("--quota-rpm", type=float, default=120)
+    parser.add_argument("--quota-in-flight", type=int, default=4)
+    args = parser.parse_args()
+    QUOTA.update(rpm=args.quota_rpm, in_flight=args.quota_in_flight)
+    asyncio.run(main(args.background, args.interactive, args.llm_latency))
@@ -0,0 +1,113 @@
+"""
+감독자 루프 제어(hop 예산, 순환 감지, 중복 호출 재사용) 벤치마크
+
+가짜 에이전트는 Status 줄을 내지 않아 매 hop마다 TaskManager가 다음 노드를 고르게 하고,
+가짜 TaskManager는 --loop-rate 확률로 GeneratingResponse 대신 ExplainTheoryAgent / ExternalSearch / ProblemGeneration 중
+하나를 다시 고른다 (같은 에이전트를 오가며 맴도는 라우터를 흉내).
+루프 제어 없음/있음에서 요청당 에이전트 호출 수, TaskManager 호출 수, hop 수 분포, recursion_limit 도달 수를 비교한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.loop_guard --requests 200 --loop-rate 0.7 --max-hops 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+from collections import Counter
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+os.environ["INTENT_ROUTER"] = "off"
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+import workflow
+from agent.task_manager import RouteResponse
+
+LOOP_TARGETS = ["ExplainTheoryAgent", "ExternalSearch", "ProblemGeneration"]
+
+
+class Counters:
+    agent_calls = 0
+    router_calls = 0
+
+
+def fake_agent(name: str) -> RunnableLambda:
+    async def _run(state):
+        Counters.agent_calls += 1
+        return {"messages": [AIMessage(content=f"{name} 결과")]}
+    return RunnableLambda(_run)
+
+
+def dithering_router(rng: random.Random, loop_rate: float) -> RunnableLambda:
+    """첫 hop은 ExplainTheoryAgent, 이후에는 loop_rate 확률로 다른 에이전트를 다시 고르는 가짜 TaskManager"""
+    async def _route(state):
+        Counters.router_calls += 1
+        if state["messages"][-1].name == "User":
+            return RouteResponse(next="ExplainTheoryAgent")
+        if rng.random() < loop_rate:
+            return RouteResponse(next=rng.choice(LOOP_TARGETS))
+        return RouteResponse(next="GeneratingResponse")
+    return RunnableLambda(_route)
+
+
+async def scenario(enabled: bool, n: int, loop_rate: float, max_hops: int, seed: int) -> dict:
+    guard = workflow.loop_guard
+    guard.enabled, guard.max_hops = enabled, max_hops
+    guard.hop_counts.clear()
+    guard.duplicates_skipped = guard.cycles = guard.revisits = guard.hop_budget_hits = 0
+    workflow.Task_Manager.agent = dithering_router(random.Random(seed), loop_rate)
+    Counters.agent_calls = Counters.router_calls = 0
+
+    hops, partial = Counter(), 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            result = await workflow.graph.ainvoke({"user_input": f"질문 {i}: 함수의 극한이란?"}, RunnableConfig(recursion_limit=10))
+            hops[len(result["hops"])] += 1
+            partial += workflow.is_partial_answer(workflow.final_answer(result))
+    return {
+        "agent_calls": Counters.agent_calls / n,
+        "router_calls": Counters.router_calls / n,
+        "hops": dict(sorted(hops.items())),
+        "partial": partial,
+        "stats": guard.stats(),
+    }
+
+
+async def main(n: int, loop_rate: float, max_hops: int, seed: int) -> None:
+    for name, agent in [
+        ("ExternalSearch", workflow.search_agent),
+        ("ProblemSolving", workflow.solving_agent),
+        ("ProblemGeneration", workflow.generating_agent),
+        ("GeneratingResponse", workflow.response_agent),
+        ("ExplainTheoryAgent", workflow.explain_theory_agent),
+    ]:
+        agent.agent = fake_agent(name)
+    workflow.latency_budget.budget = 0
+    print(f"요청 {n}개, 라우터가 다시 맴돌 확률 {loop_rate}, hop 예산 {max_hops}")
+    for mode, enabled in (("off", False), ("on", True)):
+        result = await scenario(enabled, n, loop_rate, max_hops, seed)
+        stats = result["stats"]
+        print(
+            f"{mode:<3} 요청당 에이전트 호출 {result['agent_calls']:.2f}회, TaskManager {result['router_calls']:.2f}회 | "
+            f"hop 분포 {result['hops']} | recursion_limit 도달(중간 답변) {result['partial']}"
+        )
+        if enabled:
+            print(
+                f"    중복 호출 재사용 {stats['duplicates_skipped']}, 순환 감지 {stats['cycles']}, 재방문 차단 {stats['revisits']}, "
+                f"hop 예산 소진 {stats['hop_budget_hits']}, p50 {stats['p50_hops']} / p95 {stats['p95_hops']} hop"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--loop-rate", type=float, default=0.7, help="TaskManager가 응답 생성 대신 에이전트를 다시 고를 확률")
+    parser.add_argument("--max-hops", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.loop_rate, args.max_hops, args.seed))
@@ -0,0 +1,84 @@
+"""
+이론 설명 검색 벤치마크 (소스별 도구 2개 순차 호출 vs 통합 검색 도구 1회 호출)
+
+benchmarks/md_queries.jsonl의 질의마다 영어/한국어 질의 한 쌍으로 두 저장소를 검색한다.
+- separate: 에이전트가 교재 검색 → (모델 턴) → 가이드 검색을 차례로 호출하는 기존 방식
+- merged:   한 번의 도구 호출로 두 질의 × 두 저장소를 스레드 풀에서 동시에 검색하고 RRF로 합치는 방식
+모델 턴은 --llm-latency초, 질의 임베딩은 호출마다 --embed-latency초 지연으로 흉내낸다 (API 호출 없음).
+교재 vectorstore가 없으면 md_vectorstore 벡터 검색을 교재 대신 사용한다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.merged_search --embed-latency 0.3 --llm-latency 1.5
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from hybrid_search import HybridSearcher
+from md_ingest import EMBEDDING_DIM
+from merged_search import MergedSearcher
+from vector_stores import load_faiss
+
+QUERIES_PATH = Path(__file__).with_name("md_queries.jsonl")
+
+
+class SlowEmbeddings(Embeddings):
+    """질의 임베딩 호출마다 latency초 지연 (스레드 풀에서 호출되므로 동기 sleep)"""
+
+    def __init__(self, latency: float):
+        self.embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+        self.latency = latency
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+
+def main(embed_latency: float, llm_latency: float) -> None:
+    embeddings = SlowEmbeddings(embed_latency)
+    guide = load_faiss("md_vectorstore", embeddings)
+    textbook = load_faiss("vectorstore", embeddings) if Path("vectorstore/index.faiss").exists() else guide
+    hybrid = HybridSearcher(lambda: guide)
+    sources = {
+        "textbook": lambda q, k: textbook.similarity_search(q, k=k),
+        "guide": hybrid.search,
+    }
+    merged = MergedSearcher(sources)
+    queries = [json.loads(line) for line in QUERIES_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+    # 한국어 질의 + 영어 질의 한 쌍 (영어 질의는 챕터 제목을 흉내낸 고정 문구)
+    pairs = [(f"calculus concept {i}", q["query"]) for i, q in enumerate(queries)]
+
+    separate, fused = [], []
+    for english, korean in pairs:
+        start = time.perf_counter()
+        sources["textbook"](english, 2)
+        time.sleep(llm_latency)             # 첫 결과를 보고 두 번째 도구를 부르는 모델 턴
+        sources["guide"](korean, 2)
+        separate.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        merged.search([english, korean])
+        fused.append(time.perf_counter() - start)
+
+    print(f"질의 쌍 {len(pairs)}개, 임베딩 {embed_latency}초, 모델 턴 {llm_latency}초")
+    for name, latencies, turns in (("separate", separate, 2), ("merged", fused, 1)):
+        print(
+            f"{name:<8} 도구 호출 {turns}회 | p50 {statistics.median(latencies) * 1000:7.1f}ms | "
+            f"평균 {statistics.mean(latencies) * 1000:7.1f}ms"
+        )
+    print(f"merged 통계: {merged.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-latency", type=float, default=0.3, help="가짜 임베딩 호출 1회 지연시간(초)")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="도구 호출 사이 모델 턴 1회 지연시간(초)")
+    args = parser.parse_args()
+    main(args.embed_latency, args.llm_latency)
@@ -0,0 +1,59 @@
+"""
+메트릭 기록 오버헤드 벤치마크
+
+지연시간이 0인 가짜 에이전트로 그래프를 실행해 (LLM 대기가 없으므로 그래프/메트릭 자체 비용만 남는다)
+METRICS 끔/켬의 요청당 처리 시간을 비교하고, 히스토그램 기록 1회와 /metrics 출력 1회의 비용을 잰다.
+
+실행 (main 디렉터리에서):
+    python -m benchmarks.metrics_overhead --requests 500
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+import timeit
+
+# 실제 API를 호출하지 않으므로 더미 키로 클라이언트 생성만 통과시킨다.
+for key in ("GOOGLE_API_KEY", "OPENAI_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(key, "benchmark-dummy-key")
+os.environ["INTENT_ROUTER"] = "off"
+
+from langchain_core.runnables import RunnableConfig
+
+import workflow
+from benchmarks.concurrency import install_fakes
+from metrics import NODE_LATENCY, metrics
+
+
+async def run(n: int) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(n):
+            await workflow.graph.ainvoke({"user_input": f"질문 {i}: 함수의 극한이란?"}, RunnableConfig(recursion_limit=10))
+        return (time.perf_counter() - start) / n
+
+
+async def main(n: int) -> None:
+    install_fakes(0.0, 0.0)
+    await run(20)   # 워밍업
+    results = {}
+    for mode, enabled in (("off", False), ("on", True), ("off", False), ("on", True)):
+        metrics.enabled = enabled
+        results.setdefault(mode, []).append(await run(n))
+    off, on = min(results["off"]), min(results["on"])
+    print(f"요청 {n}개 × 2회 (가짜 에이전트 지연 0, 요청당 노드 3개)")
+    print(f"METRICS off: 요청당 {off * 1000:.3f}ms | on: {on * 1000:.3f}ms | 차이 {(on - off) * 1e6:+.1f}µs ({(on / off - 1) * 100:+.1f}%)")
+
+    metrics.enabled = True
+    per_observe = timeit.timeit(lambda: NODE_LATENCY.observe(0.3, "ExplainTheoryAgent"), number=100000) / 100000
+    per_render = timeit.timeit(metrics.render, number=100) / 100
+    print(f"히스토그램 기록 1회 {per_observe * 1e6:.2f}µs | /metrics 출력 1회 {per_render * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,217 @@
+"""
+전체 그래프를 API 키/네트워크 없이 실행하기 위한 가짜 LLM, 임베딩, Tavily 검색
+
+install()을 workflow를 import하기 전에 호출하면
+- llm_registry.get()이 만드는 모든 채팅 모델(TaskManager의 gpt-4-turbo, 다섯 에이전트의 Gemini)이 ScriptedChatModel이 되고
+  (레지스트리의 제한기/메트릭 래퍼는 그대로 거친다),
+- ExplainTheoryAgent의 GoogleGenerativeAIEmbeddings가 StubEmbeddings로,
+- ExternalSearchAgent의 TavilySearchResults가 StubTavily로 바뀐다.
+ReAct 에이전트, 단일 호출 체인, 구조화 출력(RouteResponse), 도구 호출, 벡터스토어 검색은 실제 코드 그대로 실행된다.
+
+가짜 모델은 질의별 각본(Script.routes: 라우팅 순서, FAILED를 낼 에이전트)에 따라 결정적으로 응답하고,
+지연시간은 (질의, 호출 노드, 턴)으로 시드를 정한 로그정규 분포라 동시 실행 순서와 관계없이 같은 값이 나온다.
+"""
+import asyncio
+import random
+import time
+import zlib
+from collections import Counter
+from typing import Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, Field
+
+from agent.context_budget import estimate_tokens
+from llm_registry import caller_of
+from md_ingest import EMBEDDING_DIM
+
+ANSWER_FILLER = "정의와 성질을 차례로 정리하고, 예제를 통해 계산 과정을 단계별로 보인다. "
+
+
+class Script:
+    """가짜 모델/임베딩/검색이 함께 쓰는 각본, 지연시간 설정, 호출 통계"""
+
+    routes: dict[str, dict] = {}       # 질의 → {"route": [에이전트...], "parallel": bool, "fail": [에이전트...]}
+    llm_latency = 0.8                  # Gemini 에이전트 호출 1회 기준 지연시간(초)
+    router_latency = 0.4               # TaskManager(gpt-*) 호출 1회 기준 지연시간(초)
+    embed_latency = 0.05
+    search_latency = 0.3
+    jitter = 0.3                       # 로그정규 분포의 sigma (0이면 항상 기준값)
+    answer_sentences = 6               # 에이전트 답변 길이 (문장 수)
+
+    llm_calls: Counter = Counter()     # 호출 노드 → LLM 호출 수 (라우팅 호출은 어느 노드에서 불렀든 TaskManager로 센다)
+    prompt_tokens = 0
+    completion_tokens = 0
+    embed_calls = 0
+    search_calls = 0
+
+    @classmethod
+    def reset_counters(cls) -> None:
+        cls.llm_calls = Counter()
+        cls.prompt_tokens = cls.completion_tokens = cls.embed_calls = cls.search_calls = 0
+
+    @classmethod
+    def entry(cls, query: str) -> dict:
+        return cls.routes.get(query, {"route": ["ExplainTheoryAgent"]})
+
+    @classmethod
+    def latency(cls, base: float, *seed) -> float:
+        if not base or not cls.jitter:
+            return base
+        rng = random.Random(zlib.crc32("|".join(map(str, seed)).encode("utf-8")))
+        return base * rng.lognormvariate(0.0, cls.jitter)
+
+
+def user_query(messages) -> str:
+    """메시지 목록에서 사용자 질의를 찾는다 (이미지 질의면 텍스트 파트만)."""
+    for message in messages:
+        if isinstance(message, HumanMessage) and message.name in ("User", None):
+            content = message.content
+            if isinstance(content, list):
+                return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            return content
+    return ""
+
+
+class ScriptedChatModel(BaseChatModel):
+    """각본대로 라우팅/도구 호출/답변을 내는 가짜 채팅 모델. usage_metadata로 추정 토큰 수를 보고한다."""
+
+    model: str = "scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _decide(self, messages, caller: str, tools: list) -> AIMessage:
+        query = user_query(messages)
+        entry = Script.entry(query)
+        turn = sum(isinstance(m, AIMessage) for m in messages)
+        names = [tool["function"]["name"] for tool in tools]
+
+        if "RouteResponse" in names:
+            # TaskManager: 각본의 에이전트 중 아직 결과가 없는 것을 순서대로 (parallel이면 한꺼번에)
+            done = {m.name for m in messages if isinstance(m, HumanMessage) and m.name not in ("User", None)}
+            pending = [name for name in entry["route"] if name not in done]
+            args = {"next": pending[0] if pending else "GeneratingResponse", "parallel": []}
+            if pending and entry.get("parallel"):
+                args["parallel"] = pending[1:]
+            return AIMessage(content="", tool_calls=[{"name": "RouteResponse", "args": args, "id": f"route_{turn}"}])
+
+        if tools and not any(isinstance(m, ToolMessage) for m in messages):
+            # ReAct 에이전트 첫 턴: 첫 번째 도구를 질의로 호출
+            tool = tools[0]["function"]
+            args = {
+                key: [query] if schema.get("type") == "array" else query
+                for key, schema in tool.get("parameters", {}).get("properties", {}).items()
+            }
+            return AIMessage(content="", tool_calls=[{"name": tool["name"], "args": args, "id": f"call_{turn}"}])
+
+        body = f"[{caller}] {query}\n" + ANSWER_FILLER * Script.answer_sentences
+        if caller == "GeneratingResponse":
+            return AIMessage(content=body.strip())
+        status = "FAILED" if caller in entry.get("fail", []) else "COMPLETE"
+        return AIMessage(content=f"{body.strip()}\nStatus: {status}")
+
+    def _respond(self, messages, run_manager, kwargs) -> tuple[float, ChatResult]:
+        caller = caller_of(run_manager)
+        tools = kwargs.get("tools") or []
+        message = self._decide(messages, caller, tools)
+        prompt = sum(estimate_tokens(m.content) for m in messages)
+        completion = estimate_tokens(message.content) + 20 * len(message.tool_calls)
+        message.usage_metadata = {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+        routing = any(tool["function"]["name"] == "RouteResponse" for tool in tools)
+        Script.llm_calls["TaskManager" if routing else caller] += 1
+        Script.prompt_tokens += prompt
+        Script.completion_tokens += completion
+        base = Script.router_latency if self.model.startswith("gpt") else Script.llm_latency
+        delay = Script.latency(base, user_query(messages), caller, len(messages))
+        return delay, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        delay, result = self._respond(messages, run_manager, kwargs)
+        time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        delay, result = self._respond(messages, run_manager, kwargs)
+        await asyncio.sleep(delay)
+        return result
+
+
+class StubEmbeddings(Embeddings):
+    """GoogleGenerativeAIEmbeddings 대신 쓰는 결정적 가짜 임베딩 (차원은 md_vectorstore와 같다)"""
+
+    def __init__(self, model: str = "", **kwargs):
+        self.model = model
+        self.embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+
+    def embed_query(self, text: str, **kwargs) -> list[float]:
+        Script.embed_calls += 1
+        time.sleep(Script.embed_latency)
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        Script.embed_calls += 1
+        time.sleep(Script.embed_latency)
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str, **kwargs) -> list[float]:
+        Script.embed_calls += 1
+        await asyncio.sleep(Script.embed_latency)
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        Script.embed_calls += 1
+        await asyncio.sleep(Script.embed_latency)
+        return self.embeddings.embed_documents(texts)
+
+
+class TavilyInput(BaseModel):
+    query: str = Field(description="search query to look up")
+
+
+class StubTavily(BaseTool):
+    """TavilySearchResults와 같은 이름/입력의 가짜 웹 검색 도구"""
+
+    name: str = "tavily_search_results_json"
+    description: str = "A search engine optimized for comprehensive, accurate, and trusted results."
+    args_schema: type[BaseModel] = TavilyInput
+    max_results: int = 3
+    api_key: Optional[str] = None
+    search_depth: str = "advanced"
+
+    def _results(self, query: str) -> list[dict]:
+        Script.search_calls += 1
+        return [
+            {"url": f"https://example.com/calculus/{i}", "content": f"{query} 관련 자료 {i}: " + ANSWER_FILLER}
+            for i in range(self.max_results)
+        ]
+
+    def _run(self, query: str, run_manager=None) -> list[dict]:
+        time.sleep(Script.latency(Script.search_latency, query, "tavily"))
+        return self._results(query)
+
+    async def _arun(self, query: str, run_manager=None) -> list[dict]:
+        await asyncio.sleep(Script.latency(Script.search_latency, query, "tavily"))
+        return self._results(query)
+
+
+def install() -> None:
+    """workflow를 import하기 전에 호출해 모든 외부 모델/검색을 가짜로 바꾼다."""
+    import llm_registry
+    import agent.explain_theory_agent as explain_theory_agent
+    import agent.external_search_agent as external_search_agent
+
+    registry = llm_registry.llm_registry
+    get = llm_registry.LLMRegistry.get
+    registry.get = lambda model, provider=None, **kwargs: get(registry, model, provider=ScriptedChatModel, **kwargs)
+    explain_theory_agent.GoogleGenerativeAIEmbeddings = StubEmbeddings
+    external_search_agent.TavilySearchResults = StubTavily
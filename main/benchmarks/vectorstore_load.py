@@ -0,0 +1,80 @@
+"""
+벡터스토어 로드 방식 벤치마크 (FAISS.load_local vs mmap)
+
+워커 프로세스 N개가 각자 같은 인덱스를 로드하고 검색 한 번으로 페이지를 건드린 뒤,
+모두 살아 있는 상태에서 워커별 로드 시간, RSS(익명/파일 기반), PSS(공유 페이지를 나눠 계산한 실제 점유량)를 잰다.
+mmap 모드에서는 벡터가 파일 기반 페이지에 올라가 워커끼리 공유되므로 PSS 합계가 워커 수에 비례해 늘지 않는다.
+
+실행 (main 디렉터리에서, Linux):
+    python -m benchmarks.vectorstore_load --workers 4 --path md_vectorstore
+"""
+import argparse
+import multiprocessing as mp
+import statistics
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from vector_stores import load_faiss
+
+
+def memory_kb() -> dict:
+    """현재 프로세스의 RssAnon / RssFile / Pss (kB)"""
+    result = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                result[line.split(":")[0]] = int(line.split()[1])
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                result["Pss"] = int(line.split()[1])
+    return result
+
+
+def worker(path: str, mmap: bool, barrier, queue) -> None:
+    before = memory_kb()
+    start = time.perf_counter()
+    # 질의 임베딩은 쓰지 않으므로 임베딩 객체는 자리만 채운다
+    store = load_faiss(path, DeterministicFakeEmbedding(size=1), mmap=mmap)
+    elapsed = time.perf_counter() - start
+    # 검색 한 번으로 인덱스 전체 페이지를 건드린다 (IndexFlat은 모든 벡터를 읽는다)
+    store.index.search(np.random.rand(1, store.index.d).astype("float32"), 2)
+    barrier.wait()      # 모든 워커가 인덱스를 들고 있는 상태에서 측정
+    after = memory_kb()
+    queue.put({"elapsed": elapsed, **{k: after[k] - before[k] for k in after}})
+    barrier.wait()
+
+
+def run(path: str, mmap: bool, workers: int) -> list[dict]:
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(workers)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, mmap, barrier, queue)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return results
+
+
+def main(path: str, workers: int) -> None:
+    print(f"인덱스: {path}, 워커 {workers}개 (메모리는 로드 전 대비 증가량, kB)")
+    for label, mmap in [("load_local", False), ("mmap", True)]:
+        results = run(path, mmap, workers)
+        print(
+            f"{label:<10} 로드 {statistics.mean(r['elapsed'] for r in results) * 1000:7.1f}ms | "
+            f"RssAnon {statistics.mean(r['RssAnon'] for r in results):8.0f} | "
+            f"RssFile {statistics.mean(r['RssFile'] for r in results):8.0f} | "
+            f"Pss 합계 {sum(r['Pss'] for r in results):8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="md_vectorstore")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    main(args.path, args.workers)
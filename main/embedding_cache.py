@@ -0,0 +1,224 @@
+"""
+질의 임베딩 캐시 + 마이크로 배칭
+
+검색 도구(theory_search), 의도 라우터, 답변 캐시가 같은 질의를 요청마다/재시도마다 다시 임베딩하지 않도록
+langchain Embeddings를 감싸 질의 임베딩을 재사용한다.
+- 키: normalize_query()로 정규화한 질의 문자열 (정규화한 문자열을 임베딩하므로 같은 키는 항상 같은 벡터)
+- 메모리 LRU + 선택적으로 SQLite 파일(재시작 후에도 유지, 모델 이름별로 구분)
+- 마이크로 배처: 동시에 들어온 캐시 미스를 짧은 시간(window) 동안 모아 한 번의 배치 호출로 임베딩한다.
+  같은 키를 이미 임베딩 중이면 새로 호출하지 않고 그 결과를 기다린다.
+- 문서 임베딩(embed_documents)은 캐시 없이 그대로 전달한다 (색인 빌드용, 질의와 task type이 다르다).
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from answer_cache import normalize_query
+
+load_dotenv()
+
+
+class EmbeddingDiskStore:
+    """
+    질의 임베딩을 SQLite 파일에 보관하는 저장소.
+    같은 파일을 여러 임베딩 모델이 함께 쓸 수 있도록 namespace(모델 이름)로 구분한다.
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS query_embeddings (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT embedding FROM query_embeddings WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32).copy() if row else None
+
+    def put_many(self, items: list[tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                [(self.namespace, key, vector.tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM query_embeddings WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    질의 임베딩 캐시와 마이크로 배처를 붙인 Embeddings 래퍼.
+
+    Args:
+        base: 실제 임베딩 모델 (langchain Embeddings)
+        batch_kwargs: 여러 질의를 한 번에 임베딩할 때 base.embed_documents에 넘길 인자
+                      (예: Gemini는 {"task_type": "RETRIEVAL_QUERY"}로 embed_query와 같은 벡터를 얻는다)
+    """
+
+    def __init__(self, base: Embeddings, batch_kwargs: Optional[dict] = None):
+        self.base = base
+        self.batch_kwargs = batch_kwargs or {}
+        self.enabled = os.getenv("EMBEDDING_CACHE", "on") != "off"
+        self.max_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+        self.window = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10")) / 1000   # 0이면 모으지 않고 바로 호출
+        self.max_batch = int(os.getenv("EMBEDDING_BATCH_MAX", "32"))               # 이만큼 모이면 기다리지 않고 호출
+        path = os.getenv("EMBEDDING_CACHE_PATH", "")
+        namespace = str(getattr(base, "model", type(base).__name__))
+        self.disk = EmbeddingDiskStore(path, namespace) if path and self.enabled else None
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._inflight: dict[str, Future] = {}    # 임베딩 중인 키 → 결과
+        self._pending: list[str] = []             # 다음 배치로 보낼 키
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+
+        # 통계
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0      # 같은 키를 이미 임베딩 중이라 결과를 함께 받은 요청
+        self.misses = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember([(key, vector)])
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+        return None
+
+    def _remember(self, items: list[tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            for key, vector in items:
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def _flush(self, batch: list[str]) -> None:
+        """모은 키들을 한 번에 임베딩하고 기다리던 요청들에 결과를 전달한다."""
+        try:
+            if len(batch) == 1:
+                vectors = [self.base.embed_query(batch[0])]
+            else:
+                vectors = self.base.embed_documents(batch, **self.batch_kwargs)
+            items = [(key, np.asarray(v, dtype=np.float32)) for key, v in zip(batch, vectors)]
+            self._remember(items)
+            if self.disk is not None:
+                try:
+                    self.disk.put_many(items)
+                except Exception as e:
+                    print(f"임베딩 캐시 저장 오류: {e}")
+            results = dict(items)
+            error = None
+        except Exception as e:
+            results, error = {}, e
+        with self._lock:
+            self.batches += 1
+            self.batched_texts += len(batch)
+            futures = [self._inflight.pop(key) for key in batch]
+        for key, future in zip(batch, futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[key])
+
+    def _embed_miss(self, key: str) -> np.ndarray:
+        with self._lock:
+            # 조회 후 여기까지 오는 사이에 다른 배치가 끝났을 수 있다
+            vector = self._memory.get(key)
+            if vector is not None:
+                self.memory_hits += 1
+                return vector
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                self._pending.append(key)
+                # 비어 있던 대기열에 처음 넣은 요청이 window 동안 기다렸다가 모인 키를 한꺼번에 보낸다
+                leader = len(self._pending) == 1
+                if len(self._pending) >= self.max_batch:
+                    self._full.notify_all()
+        if leader:
+            with self._lock:
+                self._full.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window)
+                batch, self._pending = self._pending, []
+            self._flush(batch)
+        return future.result()
+
+    def embed_query(self, text: str) -> list[float]:
+        if not self.enabled:
+            return self.base.embed_query(text)
+        key = normalize_query(text) or text
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._embed_miss(key)
+        return vector.tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        if not self.enabled:
+            return await self.base.aembed_query(text)
+        key = normalize_query(text) or text
+        vector = self._lookup(key)
+        if vector is None:
+            # 캐시 미스는 스레드에서 처리해 동기 호출(검색 스레드 풀)과 같은 배치로 묶인다
+            vector = await asyncio.to_thread(self._embed_miss, key)
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.base.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits + self.coalesced
+        total = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._memory),
+            "disk_size": len(self.disk) if self.disk is not None else None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+        }
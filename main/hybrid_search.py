@@ -0,0 +1,205 @@
+"""
+한국어 md 가이드용 하이브리드 검색 (BM25 + 벡터)
+
+md_vectorstore의 docstore 청크로 로컬 BM25 역색인을 만들고, 벡터 검색 결과와 RRF(reciprocal rank fusion)로 합친다.
+질의 용어가 상위 BM25 청크의 헤더(Header 1~3)에 거의 그대로 있으면(예: "치환적분", "편미분")
+임베딩 API를 호출하지 않고 BM25 결과만 돌려준다.
+
+한국어 토큰화: 형태소 분석기 없이 한글 어절에서 끝 조사를 떼어낸 어간 + 글자 bigram을 쓴다.
+("치환 적분" / "치환적분" / "치환적분을"이 같은 bigram을 공유한다.)
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 어절 끝에서 떼어낼 조사/어미 (긴 것부터 검사)
+KOREAN_SUFFIXES = sorted(
+    ["이란", "란", "에서", "으로", "로", "의", "와", "과", "및", "을", "를", "은", "는", "이", "가", "에", "도", "만"],
+    key=len, reverse=True,
+)
+HEADER_KEYS = ("Header 1", "Header 2", "Header 3")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    BM25용 토큰 목록을 만든다.
+    한글 어절 → 조사를 뗀 어간 + 어간의 글자 bigram, 영문 → 소문자 단어, 숫자 → 그대로.
+    """
+    tokens = []
+    for word in re.findall(r"[가-힣]+|[a-z]+|\d+", text.lower()):
+        if "가" <= word[0] <= "힣":
+            for suffix in KOREAN_SUFFIXES:
+                if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                    word = word[: -len(suffix)]
+                    break
+            tokens.append(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1) if len(word) > 2)
+        elif len(word) > 1:
+            tokens.append(word)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int = 60) -> list:
+    """
+    여러 순위 목록을 RRF 점수(∑ 1 / (k + 순위))로 합친다. 여러 목록에 나온 항목은 한 번만 남는다.
+
+    Args:
+        rankings: 항목(해시 가능한 키) 순위 목록들
+        k (int): 순위 완화 상수 (클수록 하위 순위도 반영)
+
+    Returns:
+        list: 점수 높은 순으로 정렬한 항목
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    """
+    청크 목록에 대한 BM25 역색인.
+    헤더 메타데이터를 본문 앞에 붙여 색인해 헤더 용어 일치에 가중치를 준다.
+    """
+
+    def __init__(self, docs: list, k1: float = 1.5, b: float = 0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.headers = [set(tokenize(" ".join(str(d.metadata.get(h, "")) for h in HEADER_KEYS))) for d in docs]
+
+        self.postings = defaultdict(list)    # 토큰 → [(문서 번호, 빈도)]
+        self.lengths = []
+        for i, doc in enumerate(docs):
+            header_text = " ".join(str(doc.metadata.get(h, "")) for h in HEADER_KEYS)
+            counts = Counter(tokenize(header_text + "\n" + doc.page_content))
+            self.lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings[token].append((i, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """BM25 점수 상위 k개 (문서 번호, 점수). 일치하는 용어가 없으면 빈 목록."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for i, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def header_coverage(self, query: str, i: int) -> float:
+        """질의 토큰 중 문서 i의 헤더에 들어 있는 비율 (0 ~ 1)"""
+        tokens = set(tokenize(query))
+        return len(tokens & self.headers[i]) / len(tokens) if tokens else 0.0
+
+
+class HybridSearcher:
+    """
+    벡터스토어 하나에 대한 BM25 + 벡터 하이브리드 검색.
+    get_store()가 돌려주는 FAISS 벡터스토어의 docstore로 BM25 색인을 처음 검색할 때 한 번 만든다.
+
+    Args:
+        get_store: FAISS 벡터스토어(없으면 None)를 돌려주는 함수 (예: lambda: registry.get("md_vectorstore"))
+    """
+
+    def __init__(self, get_store: Callable):
+        self.get_store = get_store
+        self.enabled = os.getenv("HYBRID_SEARCH", "on") != "off"
+        # 상위 BM25 청크 헤더가 질의 토큰을 이 비율 이상 포함하면 임베딩 없이 BM25 결과만 사용
+        self.confidence = float(os.getenv("HYBRID_LEXICAL_CONFIDENCE", "0.8"))
+        self.candidates = int(os.getenv("HYBRID_CANDIDATES", "10"))    # 합치기 전에 각 방식에서 가져올 후보 수
+        self._index: Optional[BM25Index] = None
+        self._store = None
+        self._lock = threading.Lock()
+
+        # 통계
+        self.lexical_only = 0
+        self.fused = 0
+
+    def _prepare(self):
+        store = self.get_store()
+        if store is None:
+            return None, None
+        if self._store is not store:
+            with self._lock:
+                if self._store is not store:
+                    # FAISS 위치 순서와 같은 순서로 청크를 모아 두 검색 결과를 같은 번호로 비교한다.
+                    docs = [store.docstore.search(store.index_to_docstore_id[i]) for i in range(store.index.ntotal)]
+                    self._index = BM25Index(docs)
+                    self._store = store
+        return store, self._index
+
+    def _lexical(self, index: BM25Index, query: str) -> tuple[list[int], bool]:
+        hits = index.search(query, self.candidates)
+        ranked = [i for i, _ in hits]
+        confident = bool(hits) and index.header_coverage(query, ranked[0]) >= self.confidence
+        return ranked, confident
+
+    def _vector_positions(self, store, embedding: list[float]) -> list[int]:
+        vector = np.asarray([embedding], dtype=np.float32)
+        if getattr(store, "_normalize_L2", False):
+            faiss.normalize_L2(vector)
+        _, positions = store.index.search(vector, self.candidates)
+        return [int(i) for i in positions[0] if i != -1]
+
+    def _finish(self, index: BM25Index, lexical: list[int], vector: Optional[list[int]], k: int) -> list:
+        if vector is None:
+            self.lexical_only += 1
+            ranked = lexical
+        else:
+            self.fused += 1
+            ranked = reciprocal_rank_fusion([lexical, vector]) if self.enabled else vector
+        return [index.docs[i] for i in ranked[:k]]
+
+    def search(self, query: str, k: int = 2) -> list:
+        """
+        질의와 관련된 청크를 찾는다. 어휘 일치가 확실하면 임베딩 API를 호출하지 않는다.
+
+        Args:
+            query (str): 검색 질의 (한국어)
+            k (int): 돌려줄 청크 수
+
+        Returns:
+            list[Document]: 관련도 순 청크 (벡터스토어가 없으면 빈 목록)
+        """
+        store, index = self._prepare()
+        if store is None:
+            return []
+        lexical, confident = self._lexical(index, query) if self.enabled else ([], False)
+        if confident:
+            return self._finish(index, lexical, None, k)
+        return self._finish(index, lexical, self._vector_positions(store, store.embeddings.embed_query(query)), k)
+
+    async def asearch(self, query: str, k: int = 2) -> list:
+        """search()의 비동기 버전 (질의 임베딩을 aembed_query로 호출)"""
+        store, index = self._prepare()
+        if store is None:
+            return []
+        lexical, confident = self._lexical(index, query) if self.enabled else ([], False)
+        if confident:
+            return self._finish(index, lexical, None, k)
+        embedding = await store.embeddings.aembed_query(query)
+        return self._finish(index, lexical, self._vector_positions(store, embedding), k)
+
+    def stats(self) -> dict:
+        total = self.lexical_only + self.fused
+        return {
+            "lexical_only": self.lexical_only,
+            "fused": self.fused,
+            "embedding_skip_rate": round(self.lexical_only / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,99 @@
+"""
+요청별 시간 예산 (end-to-end deadline)
+
+요청이 그래프에 들어올 때 마감 시각(deadline)을 정해 그래프 상태에 실어 보내고, 노드마다 남은 시간으로 판단한다.
+- 라우팅: 다음 에이전트 + GeneratingResponse의 예상 소요 시간이 남은 시간에 들어가지 않으면 바로 GeneratingResponse로 보낸다.
+- 노드 제한 시간: 에이전트는 "남은 시간 - GeneratingResponse 예상 시간"까지만 기다리고,
+  GeneratingResponse는 남은 시간(최소 REQUEST_RESPONSE_MIN_TIMEOUT초)까지 기다린다.
+- 예상 소요 시간은 노드별 최근 실행 시간의 지수 이동 평균이다 (기록이 없으면 REQUEST_NODE_ESTIMATE초).
+
+설정 (.env):
+    REQUEST_BUDGET=60                  # 요청당 시간 예산(초), 0이면 제한 없음
+    REQUEST_NODE_ESTIMATE=8            # 실행 기록이 없는 노드의 예상 소요 시간(초)
+    REQUEST_RESPONSE_MIN_TIMEOUT=5     # 예산을 다 써도 GeneratingResponse에 주는 최소 시간(초)
+"""
+import math
+import os
+import time
+from collections import Counter
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class LatencyBudget:
+    """
+    요청 마감 시각 계산과 노드별 예상 소요 시간.
+
+    Args:
+        budget (float): 요청당 시간 예산(초), 0이면 제한 없음
+        default_estimate (float): 실행 기록이 없는 노드의 예상 소요 시간(초)
+        response_min_timeout (float): GeneratingResponse에 항상 주는 최소 시간(초)
+    """
+
+    def __init__(self, budget: float, default_estimate: float, response_min_timeout: float):
+        self.budget = budget
+        self.default_estimate = default_estimate
+        self.response_min_timeout = response_min_timeout
+        self.estimates: dict[str, float] = {}      # 노드 이름 → 실행 시간 지수 이동 평균(초)
+
+        # 통계
+        self.requests = 0
+        self.forced_response = 0                   # 예산 부족으로 GeneratingResponse로 바꾼 라우팅 수
+        self.timeouts: Counter = Counter()         # 노드별 제한 시간 초과 수
+        self.partial_answers = 0                   # GeneratingResponse가 마감을 넘겨 중간 답변으로 끝난 요청 수
+
+    def deadline(self) -> float:
+        """지금 시작하는 요청의 마감 시각 (time.monotonic 기준, 예산이 없으면 0)"""
+        self.requests += 1
+        return time.monotonic() + self.budget if self.budget > 0 else 0.0
+
+    @staticmethod
+    def remaining(deadline: float) -> float:
+        """마감까지 남은 시간(초). 마감이 없으면 inf."""
+        return deadline - time.monotonic() if deadline else math.inf
+
+    def estimate(self, name: str) -> float:
+        return self.estimates.get(name, self.default_estimate)
+
+    def record(self, name: str, elapsed: float) -> None:
+        """제한 시간 안에 끝난 노드의 실행 시간을 예상 소요 시간에 반영한다."""
+        previous = self.estimates.get(name)
+        self.estimates[name] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+
+    def fits(self, deadline: float, *names: str) -> bool:
+        """
+        names를 차례로 실행한 뒤 GeneratingResponse까지 마감 안에 끝날 것으로 보이는지.
+        병렬로 실행하는 에이전트들은 호출하는 쪽에서 가장 느린 것 하나만 넘긴다.
+        """
+        needed = sum(self.estimate(name) for name in names) + self.estimate("GeneratingResponse")
+        return self.remaining(deadline) >= needed
+
+    def timeout(self, deadline: float, name: str) -> Optional[float]:
+        """노드 name을 기다릴 최대 시간(초). 마감이 없으면 None."""
+        if not deadline:
+            return None
+        remaining = self.remaining(deadline)
+        if name == "GeneratingResponse":
+            return max(remaining, self.response_min_timeout)
+        # 최종 응답을 만들 시간은 남겨 둔다
+        return max(remaining - self.estimate("GeneratingResponse"), 0.0)
+
+    def stats(self) -> dict:
+        return {
+            "budget": self.budget,
+            "requests": self.requests,
+            "forced_response": self.forced_response,
+            "timeouts": dict(self.timeouts),
+            "partial_answers": self.partial_answers,
+            "estimates_ms": {name: round(value * 1000, 1) for name, value in sorted(self.estimates.items())},
+        }
+
+
+latency_budget = LatencyBudget(
+    budget=float(os.getenv("REQUEST_BUDGET", "60")),
+    default_estimate=float(os.getenv("REQUEST_NODE_ESTIMATE", "8")),
+    response_min_timeout=float(os.getenv("REQUEST_RESPONSE_MIN_TIMEOUT", "5")),
+)
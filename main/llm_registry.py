@@ -0,0 +1,376 @@
+"""
+공유 LLM 클라이언트 레지스트리 + 모델별 동시 호출/속도 제한
+
+에이전트마다 따로 만들던 ChatGoogleGenerativeAI / ChatOpenAI 클라이언트를 한곳에서 만들어 공유한다.
+- 같은 모델 이름 + 같은 설정이면 같은 클라이언트 객체를 돌려준다.
+- 모델 이름마다 제한기(ModelLimiter) 하나를 두고, 그 모델의 모든 호출(설정이 달라도)이 함께 쓴다.
+  · 토큰 버킷: 분당 요청 수(rpm)만큼 토큰이 차고, 호출마다 하나씩 쓴다 (burst개까지 한 번에 가능)
+  · 동시 호출 상한(max_in_flight)
+  · 공정한 대기열: 호출한 워크플로 노드(에이전트)별 대기열을 번갈아 처리해 한 에이전트의 폭주가 다른 에이전트를 굶기지 않는다
+- 제한은 실제 API를 부르는 _agenerate/_astream(동기 _generate/_stream 포함)에만 걸리므로
+  bind_tools, with_structured_output, create_react_agent, 토큰 스트리밍은 그대로 동작한다.
+- 가짜 채팅 모델 클래스도 provider로 넘길 수 있어 API 없이 제한 동작을 확인할 수 있다 (benchmarks/llm_limits.py).
+
+설정 (.env):
+    LLM_MAX_IN_FLIGHT=8          # 모델별 동시 호출 상한 (0이면 제한 없음)
+    LLM_RPM=0                    # 모델별 분당 요청 수 (0이면 제한 없음)
+    LLM_LIMITS=gemini-2.5-pro-preview-06-05=60:4,gpt-4-turbo=500:16   # 모델별 rpm:max_in_flight
+"""
+import asyncio
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+
+from metrics import LLM_CALLS, LLM_LATENCY, LLM_TOKENS
+
+load_dotenv()
+
+# 현재 컨텍스트가 이미 슬롯을 잡고 있는 제한기 (provider 내부에서 다른 호출 경로로 다시 들어와도 두 번 잡지 않도록)
+_held: ContextVar[Optional["ModelLimiter"]] = ContextVar("llm_slot_held", default=None)
+
+
+class ModelLimiter:
+    """
+    모델 하나에 대한 토큰 버킷 + 동시 호출 상한 + 호출자별 라운드 로빈 대기열.
+    asyncio 호출과 스레드(동기) 호출이 같은 한도를 나눠 쓴다.
+
+    Args:
+        name (str): 모델 이름
+        rpm (float): 분당 요청 수 (0이면 속도 제한 없음)
+        max_in_flight (int): 동시 호출 상한 (0이면 제한 없음)
+        burst (int): 버킷 크기 (쉬고 있다가 한 번에 보낼 수 있는 요청 수, 기본은 max_in_flight 또는 1)
+    """
+
+    def __init__(self, name: str, rpm: float = 0, max_in_flight: int = 0, burst: Optional[int] = None):
+        self.name = name
+        self.rate = rpm / 60.0
+        self.max_in_flight = max_in_flight
+        self.capacity = float(burst or max(1, max_in_flight))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()    # 호출자 → 대기 중인 grant 함수들
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+        # 통계
+        self.calls = 0
+        self.throttled = 0      # 토큰이 없어 기다린 적이 있는 호출 수
+        self.peak_in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _dispatch(self) -> None:
+        """(lock을 잡은 상태에서) 보낼 수 있는 만큼 대기열 앞의 호출을 깨운다."""
+        while self._queues and (not self.max_in_flight or self.in_flight < self.max_in_flight):
+            self._refill(time.monotonic())
+            if self.rate and self.tokens < 1:
+                if self._timer is None:
+                    self._timer = threading.Timer((1 - self.tokens) / self.rate, self._wake)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            owner, queue = next(iter(self._queues.items()))
+            grant = queue.popleft()
+            if queue:
+                self._queues.move_to_end(owner)      # 같은 호출자의 다음 요청은 다른 호출자 뒤로
+            else:
+                del self._queues[owner]
+            if self.rate:
+                self.tokens -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            grant()
+
+    def _wake(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _enqueue(self, owner: str, grant) -> None:
+        with self._lock:
+            self.calls += 1
+            self._refill(time.monotonic())
+            if self.rate and self.tokens < 1:
+                self.throttled += 1
+            self._queues.setdefault(owner, deque()).append(grant)
+            self._dispatch()
+
+    def _record_wait(self, start: float) -> None:
+        waited = time.monotonic() - start
+        with self._lock:
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    async def acquire(self, owner: str = "default") -> None:
+        """슬롯을 얻을 때까지 기다린다 (취소되면 대기열에서 빠지거나 받은 슬롯을 돌려준다)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if future.cancelled():
+                self.release()
+            else:
+                future.set_result(None)
+
+        def grant():
+            loop.call_soon_threadsafe(resolve)
+
+        start = time.monotonic()
+        self._enqueue(owner, grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queue = self._queues.get(owner)
+                if queue is not None and grant in queue:
+                    queue.remove(grant)
+                    if not queue:
+                        del self._queues[owner]
+                    raise
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        self._record_wait(start)
+
+    def acquire_sync(self, owner: str = "default") -> None:
+        """acquire()의 동기 버전 (스레드에서 호출)"""
+        event = threading.Event()
+        start = time.monotonic()
+        self._enqueue(owner, event.set)
+        event.wait()
+        self._record_wait(start)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, owner: str = "default"):
+        if _held.get() is self:
+            yield
+            return
+        await self.acquire(owner)
+        # 스트리밍 제너레이터는 스텝마다 다른 컨텍스트에서 실행될 수 있어 reset(token) 대신 이전 값을 다시 넣는다
+        previous = _held.get()
+        _held.set(self)
+        try:
+            yield
+        finally:
+            _held.set(previous)
+            self.release()
+
+    @contextlib.contextmanager
+    def slot_sync(self, owner: str = "default"):
+        if _held.get() is self:
+            yield
+            return
+        self.acquire_sync(owner)
+        # 스트리밍 제너레이터는 스텝마다 다른 컨텍스트에서 실행될 수 있어 reset(token) 대신 이전 값을 다시 넣는다
+        previous = _held.get()
+        _held.set(self)
+        try:
+            yield
+        finally:
+            _held.set(previous)
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rpm": round(self.rate * 60, 2),
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "waiting": self._waiting(),
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "peak_in_flight": self.peak_in_flight,
+                "avg_wait_ms": round(self.total_wait / self.calls * 1000, 1) if self.calls else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+
+def caller_of(run_manager) -> str:
+    """LLM을 부른 워크플로 노드 이름 (중첩 ReAct 에이전트도 바깥 노드 기준). 그래프 밖 호출은 "default"."""
+    metadata = getattr(run_manager, "metadata", None) or {}
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    return namespace.split(":", 1)[0] or metadata.get("langgraph_node") or "default"
+
+
+class CallMetrics:
+    """
+    LLM 호출 하나의 메트릭 (슬롯을 얻은 뒤의 제공자 지연시간, 호출 수, 입력/출력 토큰 수).
+    이미 슬롯을 잡은 컨텍스트에서 다시 들어온 호출(provider 내부 경로)은 두 번 세지 않는다.
+    """
+
+    def __init__(self, limiter: "ModelLimiter", caller: str):
+        self.model = limiter.name
+        self.caller = caller
+        self.nested = _held.get() is limiter
+        self.start = 0.0
+
+    def usage(self, message) -> None:
+        """응답(또는 스트리밍 청크) 메시지의 usage_metadata 토큰 수를 더한다."""
+        usage = getattr(message, "usage_metadata", None)
+        if usage and not self.nested:
+            LLM_TOKENS.inc(self.model, "prompt", amount=usage.get("input_tokens", 0))
+            LLM_TOKENS.inc(self.model, "completion", amount=usage.get("output_tokens", 0))
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.nested:
+            return False
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            outcome = "cancelled"
+        else:
+            outcome = "error"
+        LLM_LATENCY.observe(time.perf_counter() - self.start, self.model)
+        LLM_CALLS.inc(self.model, self.caller, outcome)
+        return False
+
+
+def limited_class(cls: type) -> type:
+    """
+    채팅 모델 클래스의 실제 호출 메서드를 인스턴스의 limiter로 감싸고 호출 메트릭을 기록하는 하위 클래스를 만든다.
+    원래 클래스가 구현한 메서드만 감싸므로 스트리밍 지원 여부 판단(_should_stream)은 바뀌지 않는다.
+    """
+    namespace = {"__module__": __name__}
+
+    if cls._generate is not BaseChatModel._generate:
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            caller = caller_of(run_manager)
+            call = CallMetrics(self.limiter, caller)
+            with self.limiter.slot_sync(caller), call:
+                result = cls._generate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+            for generation in result.generations:
+                call.usage(generation.message)
+            return result
+        namespace["_generate"] = _generate
+
+    if cls._agenerate is not BaseChatModel._agenerate:
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            caller = caller_of(run_manager)
+            call = CallMetrics(self.limiter, caller)
+            async with self.limiter.slot(caller):
+                with call:
+                    result = await cls._agenerate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+            for generation in result.generations:
+                call.usage(generation.message)
+            return result
+        namespace["_agenerate"] = _agenerate
+
+    if cls._stream is not BaseChatModel._stream:
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            caller = caller_of(run_manager)
+            call = CallMetrics(self.limiter, caller)
+            with self.limiter.slot_sync(caller), call:
+                for chunk in cls._stream(self, messages, stop=stop, run_manager=run_manager, **kwargs):
+                    call.usage(chunk.message)
+                    yield chunk
+        namespace["_stream"] = _stream
+
+    if cls._astream is not BaseChatModel._astream:
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            caller = caller_of(run_manager)
+            call = CallMetrics(self.limiter, caller)
+            async with self.limiter.slot(caller):
+                with call:
+                    async for chunk in cls._astream(self, messages, stop=stop, run_manager=run_manager, **kwargs):
+                        call.usage(chunk.message)
+                        yield chunk
+        namespace["_astream"] = _astream
+
+    return type(f"Limited{cls.__name__}", (cls,), namespace)
+
+
+def parse_limits(spec: str) -> dict[str, tuple[float, int]]:
+    """"모델=rpm:max_in_flight,..." 형식의 모델별 제한 설정을 읽는다."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.rpartition("=")
+        rpm, _, in_flight = values.partition(":")
+        limits[model] = (float(rpm or 0), int(in_flight or os.getenv("LLM_MAX_IN_FLIGHT", "8")))
+    return limits
+
+
+class LLMRegistry:
+    """모델 이름 + 설정 → 공유 클라이언트, 모델 이름 → 제한기"""
+
+    def __init__(self):
+        self.default_rpm = float(os.getenv("LLM_RPM", "0"))
+        self.default_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+        self.limits = parse_limits(os.getenv("LLM_LIMITS", ""))
+        self._clients: dict = {}
+        self._classes: dict[type, type] = {}
+        self._limiters: dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model: str) -> ModelLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                rpm, in_flight = self.limits.get(model, (self.default_rpm, self.default_in_flight))
+                self._limiters[model] = ModelLimiter(model, rpm=rpm, max_in_flight=in_flight)
+            return self._limiters[model]
+
+    def get(self, model: str, provider: Optional[type] = None, **kwargs) -> BaseChatModel:
+        """
+        모델 이름과 설정에 맞는 공유 채팅 모델 클라이언트를 돌려준다.
+
+        Args:
+            model (str): 모델 이름 (예: "gemini-2.5-pro-preview-06-05", "gpt-4-turbo")
+            provider (type): 채팅 모델 클래스. 없으면 이름으로 고른다 (gpt-* → ChatOpenAI, 그 외 → ChatGoogleGenerativeAI)
+            **kwargs: 클라이언트 생성 인자 (temperature 등). 값이 같으면 같은 객체를 재사용한다
+
+        Returns:
+            BaseChatModel: 모델별 제한기를 거쳐 호출하는 클라이언트
+        """
+        if provider is None:
+            if model.startswith("gpt"):
+                from langchain_openai import ChatOpenAI as provider
+            else:
+                from langchain_google_genai import ChatGoogleGenerativeAI as provider
+        key = (provider, model, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+        limiter = self.limiter(model)
+        with self._lock:
+            if key not in self._clients:
+                if provider not in self._classes:
+                    self._classes[provider] = limited_class(provider)
+                client = self._classes[provider](model=model, **kwargs)
+                # pydantic 필드가 아니므로 검증을 거치지 않고 인스턴스에 붙인다
+                object.__setattr__(client, "limiter", limiter)
+                self._clients[key] = client
+            return self._clients[key]
+
+    def stats(self) -> dict:
+        clients = {}
+        for _, model, _ in self._clients:
+            clients[model] = clients.get(model, 0) + 1
+        return {
+            model: {"clients": clients.get(model, 0), **limiter.stats()}
+            for model, limiter in self._limiters.items()
+        }
+
+
+# 프로세스 전체에서 공유하는 레지스트리
+llm_registry = LLMRegistry()
@@ -2,22 +2,71 @@
 EMA (Engineering Mathematics Assistant) 메인 실행 파일
 """
 import os
+import asyncio
 import warnings
 import re, json
 from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel, Field
-from langchain_core.messages import HumanMessage
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field, model_validator
+from difflib import SequenceMatcher
+from langchain_core.messages import HumanMessage, AIMessageChunk
 from langchain_core.runnables import RunnableConfig
-from workflow import graph
+from langgraph.errors import GraphRecursionError
+from workflow import graph, final_answer, partial_answer, is_partial_answer, explain_theory_agent, intent_router, generating_agent, loop_guard, context_budget
+from agent.problem_generation_agent import NewQuestionResponse
+from answer_cache import SemanticAnswerCache, InMemoryCacheBackend, SQLiteCacheBackend, normalize_query
+from question_pool import QuestionPool
+from vector_stores import registry as vector_store_registry
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_registry import llm_registry
+from admission import AdmissionMiddleware, build_controllers
+from latency_budget import latency_budget
+from metrics import metrics, MetricsMiddleware
 import traceback 
 warnings.filterwarnings("ignore", message="Convert_system_message_to_human will be deprecated!")
 config = RunnableConfig(recursion_limit=10)
+load_dotenv()
+
+# 답변 캐시 설정 (ANSWER_CACHE_BACKEND: memory | sqlite | off)
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", "memory")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX_SIZE = int(os.getenv("ANSWER_CACHE_MAX_SIZE", "1000"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+
+if ANSWER_CACHE_BACKEND == "sqlite":
+    cache_backend = SQLiteCacheBackend(ANSWER_CACHE_PATH, max_size=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL)
+else:
+    cache_backend = InMemoryCacheBackend(max_size=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL)
+answer_cache = SemanticAnswerCache(
+    explain_theory_agent.embeddings, backend=cache_backend, threshold=ANSWER_CACHE_THRESHOLD
+)
 
-def process_query(query: str) -> str:
+# 그래프가 최종 답변을 만들지 못했을 때의 응답 (캐시에 저장하지 않는다)
+NO_ANSWER = "응답을 생성할 수 없습니다."
+
+async def process_query(query: str) -> str:
     """
     사용자 질의를 처리하고 응답을 반환합니다.
+    같거나 거의 같은 질의는 답변 캐시에서 바로 응답합니다.
+    시간 예산 안에 끝나지 못한 중간 답변과 답변 생성 실패 응답은 캐시에 저장하지 않습니다.
+
+    Args:
+        query (str): 사용자의 질의
+
+    Returns:
+        str: 시스템의 응답
+    """
+    if ANSWER_CACHE_BACKEND != "off":
+        return await answer_cache.get_or_compute(
+            query, lambda: run_query(query), cacheable=lambda answer: answer != NO_ANSWER and not is_partial_answer(answer)
+        )
+    return await run_query(query)
+
+async def run_query(query: str) -> str:
+    """
+    캐시를 거치지 않고 그래프를 실행해 질의를 처리합니다.
 
     Args:
         query (str): 사용자의 질의
@@ -27,12 +76,11 @@ def process_query(query: str) -> str:
     """
     print(f"사용자 질의 처리 시작: {query}")
 
-    state = {"messages": [HumanMessage(content=query, name="User")]}
+    state = {"user_input": query}
     
     try:
-        final_state = graph.invoke(state, config=config)
-        messages = final_state['messages']
-        final_message = messages[-1].content if messages else "응답을 생성할 수 없습니다."
+        final_state = await graph.ainvoke(state, config=config)
+        final_message = final_answer(final_state) or NO_ANSWER
 
         return final_message
 
@@ -42,23 +90,115 @@ def process_query(query: str) -> str:
         print(f"오류 상세 정보 (Traceback): \n{traceback.format_exc()}")
         return
 
-load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
+llm = llm_registry.get(
+    "gemini-2.0-flash",
     google_api_key=GOOGLE_API_KEY,
     convert_system_message_to_human=True,
     temperature=0.2
 )
+# 문제 풀 설정 (QUESTION_POOL: on | off, 유료 LLM 호출로 채우므로 기본 꺼짐)
+QUESTION_POOL = os.getenv("QUESTION_POOL", "off")
+# 꺼져 있으면 SQLite 파일도 만들지 않도록 풀 자체를 만들지 않는다
+question_pool = None if QUESTION_POOL != "on" else QuestionPool(
+    generating_agent.agenerate_question,
+    NewQuestionResponse,
+    generating_agent.chapter,
+    path=os.getenv("QUESTION_POOL_PATH", "question_pool.sqlite3"),
+    low_water=int(os.getenv("QUESTION_POOL_LOW_WATER", "2")),
+    target=int(os.getenv("QUESTION_POOL_TARGET", "5")),
+    workers=int(os.getenv("QUESTION_POOL_WORKERS", "2")),
+    prefill=os.getenv("QUESTION_POOL_PREFILL", "off") == "on",
+    retry_delay=float(os.getenv("QUESTION_POOL_RETRY_DELAY", "5")),
+    max_failures=int(os.getenv("QUESTION_POOL_MAX_FAILURES", "5")),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 벡터스토어를 워커 시작 시 미리 로드해 첫 질의가 로드 시간을 기다리지 않게 한다.
+    if os.getenv("VECTORSTORE_PRELOAD", "on") != "off":
+        await asyncio.to_thread(vector_store_registry.preload)
+    if question_pool is not None:
+        question_pool.start()
+    yield
+    if question_pool is not None:
+        await question_pool.stop()
+    cache_backend.flush()
+
 app = FastAPI(
     title="Calc-Question Generator API",
     description="미적분 객관식 문제를 생성하는 REST API",
     version="1.0.0",
+    lifespan=lifespan,
 )
+
+# 엔드포인트별 수락 제어 (ADMISSION_CONTROL: on | off)
+# 동시 처리 상한을 넘는 요청은 대기열에서 기다리고, 대기열이 차거나 마감을 넘기면 429/503 + Retry-After로 바로 응답한다.
+ADMISSION_PATHS = ["/qna", "/qna/stream", "/qnantitle", "/qnaimg", "/newquestions", "/newquestions/batch"]
+admission_controllers = build_controllers(ADMISSION_PATHS)
+if os.getenv("ADMISSION_CONTROL", "on") != "off":
+    app.add_middleware(AdmissionMiddleware, controllers=admission_controllers)
+
+# 엔드포인트별 지연시간/처리 중 요청 수 (METRICS: on | off). 수락 제어 바깥에 두어 대기 시간과 429/503도 함께 잰다.
+app.add_middleware(MetricsMiddleware)
+
+# 기존 통계는 /metrics를 읽을 때 게이지로 함께 내보낸다 (실행 경로에는 비용 없음)
+metrics.register_stats("answer_cache", answer_cache.stats)
+metrics.register_stats("embedding_cache", explain_theory_agent.embeddings.stats)
+metrics.register_stats("merged_search", explain_theory_agent.searcher.stats)
+metrics.register_stats("hybrid_search", explain_theory_agent.md_searcher.stats)
+metrics.register_stats("vectorstore", vector_store_registry.stats, label="store")
+metrics.register_stats("intent_router", intent_router.stats)
+metrics.register_stats("context_budget", context_budget.stats, label="node")
+metrics.register_stats("latency_budget", latency_budget.stats)
+metrics.register_stats("loop_guard", loop_guard.stats)
+metrics.register_stats("llm_limiter", llm_registry.stats, label="model")
+metrics.register_stats("admission", lambda: {path: c.stats() for path, c in admission_controllers.items()}, label="path")
+if question_pool is not None:
+    metrics.register_stats("question_pool", question_pool.stats)
+
 @app.get("/")
 async def root():
     return {"message": "EMA Backend API"}
 
+@app.get("/metrics", summary="Prometheus 메트릭 (노드/엔드포인트/LLM/검색 지연시간, 토큰, 라우팅, 캐시 적중률)")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache/stats", summary="답변 캐시 적중/미스 통계")
+async def cache_stats():
+    return answer_cache.stats()
+
+@app.get("/embeddings/stats", summary="질의 임베딩 캐시 적중률과 배치 통계")
+async def embedding_stats():
+    return explain_theory_agent.embeddings.stats()
+
+@app.get("/llm/stats", summary="모델별 동시 호출/속도 제한 상태")
+async def llm_stats():
+    return llm_registry.stats()
+
+@app.get("/admission/stats", summary="엔드포인트별 처리 중 요청 수, 대기열 길이, 대기 시간, 거절 수")
+async def admission_stats():
+    return {path: controller.stats() for path, controller in admission_controllers.items()}
+
+@app.get("/loop/stats", summary="요청별 에이전트 hop 수 분포, 재사용한 중복 호출 수, 순환/hop 예산으로 끊은 수")
+async def loop_stats():
+    return loop_guard.stats()
+
+@app.get("/latency/stats", summary="요청 시간 예산: 노드별 예상 소요 시간, 제한 시간 초과 수, 중간 답변 수")
+async def latency_stats():
+    return latency_budget.stats()
+
+@app.get("/vectorstores", summary="벡터스토어 로드 상태")
+async def vector_store_stats():
+    return vector_store_registry.stats()
+
+@app.get("/newquestions/pool", summary="문제 풀 버킷별 문제 수와 적중 통계")
+async def question_pool_stats():
+    if question_pool is None:
+        return {"enabled": False}
+    return question_pool.stats()
+
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
 # new 문제생성 api
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
@@ -69,18 +209,6 @@ class NewQuestionRequest(BaseModel):
     difficulty: str       = Field(..., example="Normal")
     quiz_examples: str    = Field(..., example="(예시 문제)")
 
-class NewQuestionResponse(BaseModel):
-    chapter : str
-    question: str
-    choice1: str
-    choice2: str
-    choice3: str
-    choice4: str
-    answer: int
-    solution: str
-    difficulty: str
-    ai_summary: str
-
 @app.post(
     "/newquestions",
     response_model=NewQuestionResponse,
@@ -89,75 +217,22 @@ class NewQuestionResponse(BaseModel):
 )
 async def create_question(payload: NewQuestionRequest):
     """
-    LangChain + OpenAI 모델을 사용해 객관식 문제를 생성하여 JSON 으로 반환합니다.
+    미리 생성해 둔 문제 풀에서 (챕터, 난이도)에 맞는 문제를 꺼내 바로 반환합니다.
+    풀의 문제는 개인화 없이 만들어 두므로 summarized/quiz_examples가 비어 있고 range가 "1"인 요청에만 씁니다.
+    개인화 필드가 있거나 풀이 비어 있으면 ProblemGenerationAgent의 직접 생성 모드로 객관식 문제를 생성하여 JSON 으로 반환합니다.
+    (TaskManager 라우팅과 별도의 JSON 변환 호출 없이 한 번의 구조화된 LLM 호출로 끝납니다.)
     """
     try:
-        # 1) payload → JSON string
+        if question_pool is not None:
+            if payload.summarized.strip() or payload.quiz_examples.strip() or payload.range_.strip() not in ("", "1"):
+                question_pool.personalized += 1
+            else:
+                pooled = question_pool.pop(payload.topics, payload.difficulty)
+                if pooled is not None:
+                    return pooled
+
         payload_str = payload.model_dump_json(by_alias=True)
-        # 2) 1차 LLM 요청: “문제 생성”
-        query = (
-            "다음 JSON을 기반으로 객관식 문제를 만들어줘. 그리고 그 문제를 풀어줘.\n"
-            "summarized에서 사용자를 위한 요구 목표를 반영해줘"
-            f"{payload_str}"
-        )
-        raw_result: str = process_query(query)
-        print("***** raw_result = ", raw_result)
-        # 3) 2차 LLM 요청: “JSON으로 변환”
-        json_prompt = f"""
-        당신은 교육용 문제 데이터를 JSON으로 포맷팅하는 전문가입니다.
-        아래 입력(input) 문자열에 포함된 모든 정보를 사용하여, 반드시 다음 스키마에 맞는 JSON을 생성하세요.
-
-        --- 스키마 설명 (NewQuestionResponse) ---
-        - chapter    : 문자열 (예: "함수와 모델 (Functions and Models)", "적분론" 등)
-        - question   : 문자열 (문제 지문, LaTeX 수식 포함)
-        - choice1    : 문자열 (선택지 1, LaTeX 수식 포함)
-        - choice2    : 문자열 (선택지 2, LaTeX 수식 포함)
-        - choice3    : 문자열 (선택지 3, LaTeX 수식 포함)
-        - choice4    : 문자열 (선택지 4, LaTeX 수식 포함)
-        - answer     : 정수 (1~4 중 하나; 정답이 몇 번 선택지인지)
-        - solution   : 문자열 (문제 풀이 과정이나 해설, LaTeX 수식 포함)
-        - difficulty : 문자열(EASY, NORMAL, HARD 중 하나)
-        - ai_summary : 문자열(문제 한줄평)
-
-        ※ 주의사항
-        1. **answer** 필드는 반드시 1, 2, 3, 4 중 하나여야 합니다.
-        2. **difficulty** 필드는 반드시 EASY, NORMAL, HARD 중 하나여야 합니다.
-        3. **LaTeX 구조 보존**: 모든 수학 표현식은 원본의 LaTeX 형식을 정확히 유지해야 합니다.
-        - 인라인 수식: `$...$` 형태 유지
-        - 디스플레이 수식: `$$...$$` 형태 유지
-        - JSON 내에서 백슬래시는 이중 이스케이프 처리: `\\`로 표현
-        4. 출력은 JSON 형식으로만 이루어져야 하고, 다른 텍스트나 주석을 포함하면 안 됩니다.
-        5. 하나의 JSON 객체만 출력하세요.
-
-        --- input 문자열 ---
-        {raw_result}
-
-        --- JSON 예시 ---
-        ```json
-        {{
-        "chapter": "함수와 모델 (Functions and Models)",
-        "question": "함수 $f(x) = x^2 + 2x + 1$의 극값을 구하시오.",
-        "choice1": "$x = -1$에서 최솟값 $0$",
-        "choice2": "$x = 0$에서 최댓값 $1$",
-        "choice3": "$x = 1$에서 최솟값 $4$",
-        "choice4": "극값이 존재하지 않음",
-        "answer": 1,
-        "solution": "주어진 함수 $f(x) = x^2 + 2x + 1 = (x+1)^2$이다. 도함수를 구하면 $f'(x) = 2x + 2$이다. $f'(x) = 0$에서 $2x + 2 = 0$, 즉 $x = -1$이다. 이계도함수 $f''(x) = 2 > 0$이므로 $x = -1$에서 최솟값을 가진다. $f(-1) = (-1)^2 + 2(-1) + 1 = 0$이므로 최솟값은 $0$이다.",
-        "difficulty": "NORMAL",
-        "ai_summary": "기본적인 도함수 계산과 극값 판별을 묻는 문제입니다."
-        }}
-        ```
-
-        위 예시에서:
-        - "answer": 1 (선택지 1이 정답)
-        - "difficulty": "NORMAL" (보통 난이도)
-        - LaTeX 수식은 `$...$` 형태로 보존됨
-
-        위 input 문자열 텍스트를 바탕으로, 동일한 형식의 JSON 객체를 출력해 주세요. 출력 시 LaTeX 구조를 정확히 보존하고, 따옴표(")와 이스케이프 문자(\\)를 정확히 지켜야 하며, 불필요한 설명은 포함하지 말고 오로지 JSON 객체만 반환하시기 바랍니다.
-        """
-        structured_llm = llm.with_structured_output(NewQuestionResponse)
-        response = await structured_llm.ainvoke([HumanMessage(content=json_prompt)])
-        return response
+        return await generating_agent.agenerate_question(payload_str)
 
     except Exception as e:
         print(f"오류 발생: {e}")
@@ -169,6 +244,155 @@ async def create_question(payload: NewQuestionRequest):
             detail=str(e),
         )
 
+# ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
+# 문제 여러 개 생성 api
+# ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
+# 동시 생성 개수, 전체 제한 시간(초), 최대 문제 수, 중복으로 볼 문제 지문 유사도
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "60"))
+BATCH_MAX_COUNT = int(os.getenv("BATCH_MAX_COUNT", "20"))
+BATCH_DEDUPE_THRESHOLD = float(os.getenv("BATCH_DEDUPE_THRESHOLD", "0.9"))
+# 중복 문제가 나왔을 때 같은 요청을 다시 생성하는 최대 횟수
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "1"))
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+class NewQuestionBatchRequest(BaseModel):
+    request: NewQuestionRequest | None = Field(None, description="count개만큼 반복 생성할 요청")
+    count: int = Field(1, ge=1, description="request를 반복할 횟수")
+    requests: list[NewQuestionRequest] | None = Field(None, description="문제마다 다른 요청 목록")
+    timeout: float | None = Field(None, gt=0, description="전체 제한 시간(초), 초과 시 완료된 문제만 반환")
+    stream: bool = Field(False, description="true면 완료되는 순서대로 SSE로 전송")
+
+    @model_validator(mode="after")
+    def check_requests(self):
+        if (self.request is None) == (self.requests is None):
+            raise ValueError("request(+count)와 requests 중 하나만 지정해야 합니다.")
+        if len(self.items()) > BATCH_MAX_COUNT:
+            raise ValueError(f"한 번에 최대 {BATCH_MAX_COUNT}개까지 생성할 수 있습니다.")
+        return self
+
+    def items(self) -> list[NewQuestionRequest]:
+        return self.requests if self.requests is not None else [self.request] * self.count
+
+class NewQuestionBatchResponse(BaseModel):
+    questions: list[NewQuestionResponse]
+    requested: int
+    failed: int
+    duplicates: int
+    timed_out: bool
+
+def is_duplicate_question(question: NewQuestionResponse, accepted: list[NewQuestionResponse]) -> bool:
+    """이미 받은 문제와 지문이 거의 같거나 (지문, 선택지)가 같으면 중복으로 봅니다."""
+    text = normalize_query(question.question)
+    choices = {question.choice1, question.choice2, question.choice3, question.choice4}
+    for other in accepted:
+        other_text = normalize_query(other.question)
+        if text == other_text and choices == {other.choice1, other.choice2, other.choice3, other.choice4}:
+            return True
+        if SequenceMatcher(None, text, other_text).ratio() >= BATCH_DEDUPE_THRESHOLD:
+            return True
+    return False
+
+async def iter_batch_questions(items: list[NewQuestionRequest], timeout: float):
+    """
+    문제들을 batch_semaphore 한도 안에서 동시에 생성하고, 완료되는 순서대로 결과를 내보냅니다.
+    중복 문제는 BATCH_MAX_RETRIES번까지 다시 생성하고, 제한 시간이 지나면 남은 작업을 취소합니다.
+
+    Yields:
+        tuple[str, int, object]: ("question", 요청 번호, 문제) / ("error", 요청 번호, 예외) /
+                                 ("duplicate", 요청 번호, 문제) / ("timeout", 남은 작업 수, None)
+    """
+    async def generate(index: int):
+        async with batch_semaphore:
+            try:
+                payload_str = items[index].model_dump_json(by_alias=True)
+                return index, await generating_agent.agenerate_question(payload_str), None
+            except Exception as e:
+                return index, None, e
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    retries = [0] * len(items)
+    accepted: list[NewQuestionResponse] = []
+    pending = {asyncio.create_task(generate(i)) for i in range(len(items))}
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                yield "timeout", len(pending), None
+                return
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, question, error = task.result()
+                if error is not None:
+                    yield "error", index, error
+                elif is_duplicate_question(question, accepted):
+                    if retries[index] < BATCH_MAX_RETRIES:
+                        retries[index] += 1
+                        pending.add(asyncio.create_task(generate(index)))
+                    else:
+                        yield "duplicate", index, question
+                else:
+                    accepted.append(question)
+                    yield "question", index, question
+    finally:
+        for task in pending:
+            task.cancel()
+
+@app.post(
+    "/newquestions/batch",
+    response_model=NewQuestionBatchResponse,
+    summary="객관식 문제 여러 개 생성",
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_questions_batch(payload: NewQuestionBatchRequest):
+    """
+    객관식 문제 여러 개를 제한된 동시성으로 함께 생성합니다.
+    stream=true면 완료되는 문제부터 SSE(question/error/duplicate/timeout/done 이벤트)로 보내고,
+    done 이벤트에는 JSON 응답과 같은 집계(requested/failed/duplicates/timed_out)를 싣습니다.
+    아니면 제한 시간 안에 완료된 문제만 모아 반환합니다.
+    """
+    items = payload.items()
+    timeout = payload.timeout or BATCH_TIMEOUT
+
+    if payload.stream:
+        async def event_stream():
+            totals = {"requested": len(items), "failed": 0, "duplicates": 0, "timed_out": False}
+            async for kind, index, value in iter_batch_questions(items, timeout):
+                if kind == "question":
+                    yield sse_event("question", {"index": index, **value.model_dump()})
+                elif kind == "error":
+                    totals["failed"] += 1
+                    yield sse_event("error", {"index": index, "detail": str(value)})
+                elif kind == "duplicate":
+                    totals["duplicates"] += 1
+                    yield sse_event("duplicate", {"index": index})
+                elif kind == "timeout":
+                    totals["timed_out"] = True
+                    yield sse_event("timeout", {"pending": index})
+            yield sse_event("done", totals)
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    questions, failed, duplicates, timed_out = [], 0, 0, False
+    async for kind, index, value in iter_batch_questions(items, timeout):
+        if kind == "question":
+            questions.append(value)
+        elif kind == "error":
+            failed += 1
+            print(f"문제 생성 오류 (#{index}): {value}")
+        elif kind == "duplicate":
+            duplicates += 1
+        elif kind == "timeout":
+            timed_out = True
+    return NewQuestionBatchResponse(
+        questions=questions, requested=len(items), failed=failed, duplicates=duplicates, timed_out=timed_out
+    )
+
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
 # 질의응답 api
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
@@ -189,7 +413,7 @@ async def answer_query(payload: QARequest):
     사용자로부터 받은 질의를 AI 그래프에 전달해 답변을 생성합니다.
     """
     try:
-        result = process_query(payload.query)
+        result = await process_query(payload.query)
         return QAResponse(answer=result)
     except Exception as e:
         raise HTTPException(
@@ -197,6 +421,65 @@ async def answer_query(payload: QARequest):
             detail=str(e),
         )
 
+# ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
+# 질의응답 스트리밍(SSE) api
+# ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
+def sse_event(event: str, data: dict) -> str:
+    """Server-Sent Events 형식의 메시지 한 건을 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post(
+    "/qna/stream",
+    summary="사용자 질의응답 (SSE 스트리밍)",
+    status_code=status.HTTP_200_OK,
+)
+async def answer_query_stream(payload: QARequest):
+    """
+    노드 전환(route / node_start / node_end)마다 진행 이벤트를 보내고,
+    GeneratingResponse 단계의 응답은 token 이벤트로 토큰 단위 스트리밍합니다.
+    마지막에 answer 이벤트로 전체 답변을 보냅니다.
+    recursion_limit에 걸리면 그때까지의 에이전트 결과로 만든 중간 답변을 answer 이벤트로 보냅니다.
+    """
+    state = {"user_input": payload.query}
+
+    async def event_stream():
+        results, hops = {}, 0
+        try:
+            async for mode, chunk in graph.astream(
+                state, config=config, stream_mode=["custom", "messages", "updates"]
+            ):
+                if mode == "custom":
+                    # workflow의 노드들이 get_stream_writer()로 보낸 진행 이벤트
+                    data = dict(chunk)
+                    yield sse_event(data.pop("event"), data)
+                elif mode == "messages":
+                    # 중첩된 ReAct 에이전트의 토큰도 checkpoint_ns 접두어로 소속 노드를 알 수 있다.
+                    message, metadata = chunk
+                    node = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0]
+                    if node == "GeneratingResponse" and isinstance(message, AIMessageChunk) and message.content:
+                        yield sse_event("token", {"content": message.content})
+                elif "GeneratingResponse" in chunk:
+                    final_message = chunk["GeneratingResponse"]["results"]["GeneratingResponse"].content
+                    yield sse_event("answer", {"answer": final_message})
+                else:
+                    for update in chunk.values():
+                        results.update((update or {}).get("results") or {})
+                        hops += len((update or {}).get("hops") or ())
+        except GraphRecursionError:
+            print("recursion_limit 도달 → 중간 결과로 응답")
+            loop_guard.record(hops, recursion=True)
+            yield sse_event("answer", {"answer": partial_answer(results, "recursion")})
+        except Exception as e:
+            print(f"오류 발생: {e}")
+            print(f"오류 상세 정보 (Traceback): \n{traceback.format_exc()}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
 # 질의응답 + 제목 api
 # ㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡㅡ
@@ -204,6 +487,61 @@ class QATResponse(BaseModel):
     answer: str
     title: str
 
+# 제목 생성 설정: LLM 제목을 기다리는 최대 시간(초), 로컬 제목을 쓰는 짧은 질의 길이
+TITLE_TIMEOUT = float(os.getenv("TITLE_TIMEOUT", "5"))
+LOCAL_TITLE_MAX_LENGTH = int(os.getenv("LOCAL_TITLE_MAX_LENGTH", "40"))
+TITLE_SUFFIX = {
+    "ExplainTheoryAgent": "개념 설명",
+    "ProblemSolving": "문제 풀이",
+    "ProblemGeneration": "문제 생성",
+}
+
+def local_title(query: str) -> str | None:
+    """
+    chapters_md 헤더 용어를 질의에서 찾아 LLM 호출 없이 제목을 만듭니다.
+
+    Args:
+        query (str): 사용자의 질의
+
+    Returns:
+        str | None: 제목 (헤더 용어를 찾지 못하면 None)
+    """
+    terms = intent_router.find_terms(query)[:3]
+    if not terms:
+        return None
+    intents = intent_router.match_intents(query)
+    suffix = TITLE_SUFFIX[intents.pop()] if len(intents) == 1 else "질문"
+    return " ".join(terms + [suffix])
+
+async def generate_title(query: str) -> str:
+    """
+    채팅방 제목을 생성합니다.
+    짧은 질의는 로컬 키워드 추출로 바로 만들고, 그 외에는 LLM을 TITLE_TIMEOUT초까지만 기다립니다.
+    """
+    if len(query) <= LOCAL_TITLE_MAX_LENGTH:
+        title = local_title(query)
+        if title:
+            return title
+
+    prompt = f"""System:
+        당신은 ‘채팅방 제목 생성기(Chat Title Generator)’입니다.
+        사용자가 보낸 메시지를 입력으로 받아, 그 메시지의 핵심 주제를 3~6개의 단어로 요약한 짧고 명확한 제목을 출력하세요.
+        • 제목에는 불필요한 조사나 접속사를 쓰지 마세요.
+        • 구체적인 키워드를 포함해 대화 내용을 한눈에 알 수 있게 작성하세요.
+        • 출력 형식은 제목 텍스트만, 따옴표나 볼드체 등의 스타일, 추가 설명 없이 제공해야 합니다.
+
+        User:
+        {query}"""
+    try:
+        response = await asyncio.wait_for(
+            llm.agenerate([[HumanMessage(content=prompt)]]), timeout=TITLE_TIMEOUT
+        )
+        return response.generations[0][0].text.strip()
+    except Exception as e:
+        # 제목이 늦거나 실패해도 답변은 그대로 돌려준다.
+        print(f"제목 생성 실패({type(e).__name__}), 대체 제목 사용")
+        return local_title(query) or query.strip()[:30]
+
 @app.post(
     "/qnantitle",
     response_model=QATResponse,
@@ -215,22 +553,11 @@ async def answer_query(payload: QARequest):
     사용자로부터 받은 질의를 AI 그래프에 전달해 답변을 생성합니다.
     """
     try:
-        result = process_query(payload.query)
-        prompt = f"""System:
-        당신은 ‘채팅방 제목 생성기(Chat Title Generator)’입니다.
-        사용자가 보낸 메시지를 입력으로 받아, 그 메시지의 핵심 주제를 3~6개의 단어로 요약한 짧고 명확한 제목을 출력하세요.
-        • 제목에는 불필요한 조사나 접속사를 쓰지 마세요.
-        • 구체적인 키워드를 포함해 대화 내용을 한눈에 알 수 있게 작성하세요.
-        • 출력 형식은 제목 텍스트만, 따옴표나 볼드체 등의 스타일, 추가 설명 없이 제공해야 합니다.
-
-        User:
-        {payload.query}"""
-
-
-        response = await llm.agenerate([[HumanMessage(content=prompt)]])
-        tit = response.generations[0][0].text.strip()
-        print("***** tit = ", tit)
-
+        # 제목은 질의에만 의존하므로 답변 생성과 동시에 만든다.
+        result, tit = await asyncio.gather(
+            process_query(payload.query),
+            generate_title(payload.query),
+        )
         return QATResponse(answer=result, title=tit)
     except Exception as e:
         raise HTTPException(
@@ -262,28 +589,22 @@ async def answer_query(payload: QAImageRequest):
 
         # 3) 질의 + 이미지 데이터를 그래프 상태에 삽입
         state = {
-            "messages": [
-                HumanMessage(
-                    content=[
-                        {
-                            "type": "text",
-                            "text": ""
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": payload.image_base64
-                            }
-                        }
-                    ],
-                    name="User"
-                )
+            "user_input": [
+                {
+                    "type": "text",
+                    "text": ""
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": payload.image_base64
+                    }
+                }
             ]
         }
 
-        final_state = graph.invoke(state, config=config)
-        messages = final_state['messages']
-        final_message = messages[-1].content if messages else "응답을 생성할 수 없습니다."
+        final_state = await graph.ainvoke(state, config=config)
+        final_message = final_answer(final_state) or NO_ANSWER
         return QAResponse(answer=final_message)
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,202 @@
+"""
+chapters_md → md_vectorstore 증분 빌드
+
+마크다운을 헤더(#, ##, ###) 기준으로 나눈 뒤 500자 단위로 다시 자르고(기존 md_vectorstore와 같은 분할),
+청크마다 내용 해시를 계산해 새로 생겼거나 바뀐 청크만 임베딩한다.
+- 기존 인덱스 문서의 해시도 같은 방식으로 계산하므로 별도 매니페스트 파일이 필요 없다.
+- 임베딩은 batch_size개씩 묶어 최대 concurrency개를 동시에 호출한다.
+- FAISS 인덱스는 그 자리에서 갱신한다 (사라진 청크 삭제 → 새 청크 추가 → 저장).
+
+실행 (main 디렉터리에서):
+    python md_ingest.py                       # Gemini 임베딩으로 md_vectorstore 갱신
+    python md_ingest.py --dry-run             # 바뀐 청크 수만 출력
+    python md_ingest.py --fake-embeddings --index-dir /tmp/md_vectorstore   # API 없이 결정적 가짜 임베딩으로 빌드
+    python md_ingest.py --index-type sq8      # 갱신 후 압축 인덱스(index.sq8.faiss)도 다시 만든다
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from vector_stores import INDEX_TYPES, build_index, index_file
+
+load_dotenv()
+
+CHAPTERS_DIR = "chapters_md"
+INDEX_DIR = "md_vectorstore"
+URL_TEMPLATE = "https://ema-sigma.vercel.app/study/{:02d}"
+HEADERS_TO_SPLIT_ON = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+EMBEDDING_DIM = 3072    # models/gemini-embedding-exp-03-07
+
+
+def split_chapters(chapters_dir: str = CHAPTERS_DIR) -> list[Document]:
+    """
+    챕터 마크다운 파일들을 헤더 기준으로 나눠 청크 문서 목록을 만든다.
+
+    Args:
+        chapters_dir (str): "Chapter NN ....md" 파일들이 있는 디렉터리
+
+    Returns:
+        list[Document]: source / Header 1~3 / url 메타데이터가 붙은 청크 (파일 이름 순)
+    """
+    header_splitter = MarkdownHeaderTextSplitter(HEADERS_TO_SPLIT_ON, strip_headers=False)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    chunks = []
+    for path in sorted(Path(chapters_dir).glob("*.md")):
+        match = re.match(r"Chapter (\d+)", path.stem)
+        url = URL_TEMPLATE.format(int(match.group(1))) if match else None
+        for doc in text_splitter.split_documents(header_splitter.split_text(path.read_text(encoding="utf-8"))):
+            doc.metadata = {"source": f"{Path(chapters_dir).name}/{path.name}", **doc.metadata}
+            if url:
+                doc.metadata["url"] = url
+            chunks.append(doc)
+    return chunks
+
+
+def chunk_hash(doc: Document) -> str:
+    """
+    청크 내용 + 메타데이터의 해시. 새 청크의 문서 ID로도 쓴다.
+    source는 경로 구분자(윈도우에서 만든 기존 인덱스는 '\\')에 영향받지 않도록 파일 이름만 사용한다.
+    """
+    metadata = dict(doc.metadata)
+    metadata["source"] = os.path.basename(str(metadata.get("source", "")).replace("\\", "/"))
+    payload = json.dumps([doc.page_content, metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def embed_batches(embeddings, texts: list[str], batch_size: int, concurrency: int) -> list[list[float]]:
+    """texts를 batch_size개씩 나눠 최대 concurrency개의 임베딩 호출을 동시에 보낸다 (결과 순서는 입력 순서)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+async def ingest(
+    embeddings,
+    chapters_dir: str = CHAPTERS_DIR,
+    index_dir: str = INDEX_DIR,
+    batch_size: int = 32,
+    concurrency: int = 4,
+    dry_run: bool = False,
+    index_type: str = "flat",
+) -> dict:
+    """
+    chapters_md의 현재 내용에 맞게 FAISS 인덱스를 증분 갱신한다.
+
+    Args:
+        embeddings: langchain Embeddings (바뀐 청크만 임베딩하는 데 사용)
+        chapters_dir (str): 챕터 마크다운 디렉터리
+        index_dir (str): FAISS 인덱스 디렉터리 (없으면 새로 만든다)
+        batch_size (int): 임베딩 호출 한 번에 넣는 청크 수
+        concurrency (int): 동시에 보내는 임베딩 호출 수
+        dry_run (bool): True면 변경 사항만 계산하고 임베딩/저장은 하지 않는다
+        index_type (str): flat이 아니면 기본 인덱스 갱신 후 이 형식 인덱스도 다시 만든다 (없거나 오래된 경우 포함)
+
+    Returns:
+        dict: total / unchanged / added / deleted / embed_calls / elapsed
+    """
+    start_time = time.time()
+
+    # 같은 청크가 여러 번 나오면 하나만 남긴다 (해시가 문서 ID이므로)
+    chunks = {}
+    for doc in split_chapters(chapters_dir):
+        chunks.setdefault(chunk_hash(doc), doc)
+
+    store = None
+    existing = {}   # 청크 해시 → 인덱스의 문서 ID
+    if (Path(index_dir) / "index.faiss").exists():
+        store = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        for doc_id in store.index_to_docstore_id.values():
+            existing[chunk_hash(store.docstore.search(doc_id))] = doc_id
+
+    stale = [doc_id for h, doc_id in existing.items() if h not in chunks]
+    new = [h for h in chunks if h not in existing]
+    report = {
+        "total": len(chunks),
+        "unchanged": len(chunks) - len(new),
+        "added": len(new),
+        "deleted": len(stale),
+        "embed_calls": 0 if dry_run else -(-len(new) // batch_size),
+    }
+    if dry_run or (not new and not stale):
+        _build_variant(index_dir, index_type, dry_run)
+        report["elapsed"] = round(time.time() - start_time, 3)
+        return report
+
+    vectors = await embed_batches(embeddings, [chunks[h].page_content for h in new], batch_size, concurrency)
+    text_embeddings = [(chunks[h].page_content, vector) for h, vector in zip(new, vectors)]
+    metadatas = [chunks[h].metadata for h in new]
+
+    if store is None:
+        store = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=new)
+    else:
+        if stale:
+            store.delete(stale)
+        if new:
+            store.add_embeddings(text_embeddings, metadatas=metadatas, ids=new)
+    store.save_local(index_dir)
+    _build_variant(index_dir, index_type, dry_run)
+
+    report["elapsed"] = round(time.time() - start_time, 3)
+    return report
+
+
+def _build_variant(index_dir: str, index_type: str, dry_run: bool) -> None:
+    """압축/분할 형식 인덱스가 없거나 기본 인덱스보다 오래됐으면 다시 만든다."""
+    if index_type == "flat" or dry_run or not index_file(index_dir).exists():
+        return
+    variant = index_file(index_dir, index_type)
+    if not variant.exists() or variant.stat().st_mtime < index_file(index_dir).stat().st_mtime:
+        print(f"{variant} 생성")
+        build_index(index_dir, index_type)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="chapters_md로 md_vectorstore를 증분 갱신")
+    parser.add_argument("--chapters-dir", default=CHAPTERS_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="변경 사항만 출력")
+    parser.add_argument("--fake-embeddings", action="store_true", help="API 없이 결정적 가짜 임베딩 사용 (테스트/벤치마크용)")
+    parser.add_argument("--index-type", default="flat", choices=list(INDEX_TYPES), help="함께 만들 압축/분할 인덱스 형식")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+    else:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-exp-03-07")
+
+    report = asyncio.run(
+        ingest(
+            embeddings, args.chapters_dir, args.index_dir, args.batch_size, args.concurrency, args.dry_run, args.index_type
+        )
+    )
+    print(
+        f"청크 {report['total']}개: 유지 {report['unchanged']}, 추가 {report['added']}, 삭제 {report['deleted']} "
+        f"(임베딩 호출 {report['embed_calls']}회, {report['elapsed']:.3f}초)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+여러 벡터스토어 통합 검색
+
+질의(여러 개 가능) × 검색 소스(교재 vectorstore, 한국어 md 가이드 등)의 모든 조합을 스레드 풀에서 동시에 검색하고,
+각 검색 결과 순위를 RRF(reciprocal rank fusion)로 합친 뒤 같은 청크는 한 번만 남긴다.
+에이전트가 소스마다 도구를 따로 호출하지 않고 한 번의 도구 호출로 두 저장소를 모두 검색하게 하려는 용도.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+from dotenv import load_dotenv
+
+from hybrid_search import reciprocal_rank_fusion
+from metrics import RETRIEVAL_LATENCY, RETRIEVAL_RESULTS
+
+load_dotenv()
+
+
+class MergedSearcher:
+    """
+    이름 → 검색 함수 목록을 받아 통합 검색을 제공한다.
+
+    Args:
+        sources: 소스 이름 → search(query, k) -> list[Document] 함수 (동기 함수, 스레드 풀에서 실행된다)
+    """
+
+    def __init__(self, sources: dict[str, Callable[[str, int], list]]):
+        self.sources = sources
+        self.per_source = int(os.getenv("MERGED_SEARCH_PER_SOURCE", "3"))    # 소스·질의마다 가져올 후보 수
+        self.top_k = int(os.getenv("MERGED_SEARCH_TOP_K", "4"))              # 합친 뒤 돌려줄 청크 수
+        self.max_queries = int(os.getenv("MERGED_SEARCH_MAX_QUERIES", "4"))  # 한 번에 받는 질의 수 상한
+        self._pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MERGED_SEARCH_WORKERS", "8")), thread_name_prefix="merged-search"
+        )
+
+        # 통계
+        self.calls = 0
+        self.sub_searches = 0
+        self.duplicates = 0
+
+    def _queries(self, queries: Union[str, list[str]]) -> list[str]:
+        if isinstance(queries, str):
+            queries = [queries]
+        unique = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        return unique[: self.max_queries]
+
+    def _run(self, name: str, query: str) -> tuple[str, list]:
+        start = time.perf_counter()
+        try:
+            docs = self.sources[name](query, self.per_source)
+        except Exception as e:
+            # 한 소스가 실패해도 나머지 결과는 돌려준다
+            print(f"통합 검색 '{name}' 실패 ({query[:30]}): {e}")
+            docs = []
+        RETRIEVAL_LATENCY.observe(time.perf_counter() - start, name)
+        RETRIEVAL_RESULTS.observe(len(docs), name)
+        return name, docs
+
+    def _fuse(self, results: list[tuple[str, list]], k: int) -> list[tuple[str, object]]:
+        first = {}      # 청크 내용 → (소스 이름, 문서), 처음 나온 것만 유지
+        rankings = []
+        for name, docs in results:
+            ranking = []
+            for doc in docs:
+                key = doc.page_content
+                if key in first:
+                    self.duplicates += 1
+                else:
+                    first[key] = (name, doc)
+                ranking.append(key)
+            rankings.append(ranking)
+        return [first[key] for key in reciprocal_rank_fusion(rankings)[:k]]
+
+    def search(self, queries: Union[str, list[str]], k: int = None) -> list[tuple[str, object]]:
+        """
+        모든 (질의, 소스) 조합을 동시에 검색해 RRF로 합친다.
+
+        Args:
+            queries: 검색 질의 하나 또는 여러 개 (언어가 다른 표현을 함께 넣으면 소스별로 맞는 쪽이 상위에 온다)
+            k (int): 돌려줄 청크 수 (기본 MERGED_SEARCH_TOP_K)
+
+        Returns:
+            list[tuple[str, Document]]: (소스 이름, 청크)를 관련도 순으로, 같은 청크는 한 번만
+        """
+        jobs = [(name, q) for q in self._queries(queries) for name in self.sources]
+        self.calls += 1
+        self.sub_searches += len(jobs)
+        results = list(self._pool.map(lambda job: self._run(*job), jobs))
+        return self._fuse(results, k or self.top_k)
+
+    async def asearch(self, queries: Union[str, list[str]], k: int = None) -> list[tuple[str, object]]:
+        """search()의 비동기 버전 (검색은 같은 스레드 풀에서 실행하고 이벤트 루프는 막지 않는다)"""
+        jobs = [(name, q) for q in self._queries(queries) for name in self.sources]
+        self.calls += 1
+        self.sub_searches += len(jobs)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._pool, self._run, name, q) for name, q in jobs))
+        return self._fuse(results, k or self.top_k)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "sub_searches": self.sub_searches,
+            "duplicates_removed": self.duplicates,
+        }
@@ -0,0 +1,281 @@
+"""
+프로세스 내 메트릭 수집 + Prometheus 텍스트 형식(/metrics) 출력
+
+실행 경로(노드, 엔드포인트, LLM 호출, 검색)에서는 카운터/히스토그램 값만 올리고,
+문자열 조립은 /metrics를 읽을 때만 한다. 값 갱신은 메트릭마다 잠금 한 번 + dict 연산이라 요청 처리 시간에 비해 무시할 만하다.
+기존 stats() 딕셔너리(답변 캐시, 임베딩 캐시, 수락 제어, LLM 제한기 등)는 register_stats()로 등록해 읽을 때 게이지로 내보낸다.
+
+설정 (.env):
+    METRICS=on      # on | off (off면 /metrics는 비어 있고 기록도 하지 않는다)
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 초 단위 지연시간 버킷 (라우팅 수 ms ~ LLM 여러 번 호출하는 요청 수십 초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in sorted(items):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """증가만 하는 값 (호출 수, 토큰 수 등)"""
+
+    kind = "counter"
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        if not metrics.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    """오르내리는 값 (지금 실행 중인 노드/요청 수 등)"""
+
+    kind = "gauge"
+
+    def add(self, *label_values, amount: float = 1) -> None:
+        if not metrics.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    @contextmanager
+    def track(self, *label_values):
+        """with 블록을 실행하는 동안 1 올려 둔다."""
+        self.add(*label_values)
+        try:
+            yield
+        finally:
+            self.add(*label_values, amount=-1)
+
+
+class Histogram(_Metric):
+    """버킷별 누적 개수 + 합계 + 개수 (Prometheus에서 histogram_quantile로 p50/p99를 구한다)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values) -> None:
+        if not metrics.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """with 블록의 실행 시간을 기록한다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        for label_values, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """메트릭과 stats() 수집 함수를 모아 Prometheus 텍스트 형식으로 출력한다."""
+
+    def __init__(self):
+        self.enabled = os.getenv("METRICS", "on") != "off"
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[tuple[str, Callable[[], dict], Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: tuple, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help, labels, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict], label: Optional[str] = None) -> None:
+        """
+        stats() 딕셔너리의 숫자 값을 /metrics를 읽을 때마다 게이지 ema_<prefix>_<키>로 내보낸다.
+
+        Args:
+            prefix (str): 메트릭 이름 접두어 (예: answer_cache)
+            stats: 통계 딕셔너리를 돌려주는 함수
+            label (str): 지정하면 stats()가 {라벨 값: 통계 딕셔너리} 형태이고, 그 키를 이 라벨로 붙인다
+                         (예: 경로별 수락 제어 통계 → label="path")
+        """
+        self._collectors.append((prefix, stats, label))
+
+    def _render_stats(self, prefix: str, stats: Callable[[], dict], label: Optional[str]) -> list[str]:
+        try:
+            data = stats()
+        except Exception as e:
+            return [f"# {prefix} 통계 수집 실패: {type(e).__name__}"]
+        groups = data.items() if label else [(None, data)]
+        series: dict[str, list[str]] = {}
+        for label_value, values in groups:
+            if not isinstance(values, dict):
+                continue
+            labels = _format_labels((label,), (label_value,)) if label else ""
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                series.setdefault(f"ema_{prefix}_{key}", []).append(f"{labels} {_format_value(value)}")
+        lines = []
+        for name, samples in series.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{sample}" for sample in samples)
+        return lines
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식(version 0.0.4)"""
+        if not self.enabled:
+            return ""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for prefix, stats, label in self._collectors:
+            lines.extend(self._render_stats(prefix, stats, label))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    엔드포인트별 지연시간(응답 본문 전송 완료까지)과 처리 중 요청 수를 기록하는 ASGI 미들웨어.
+    라벨 수가 늘지 않도록 등록된 라우트에 맞지 않은 요청은 path="unmatched"로 묶는다.
+    """
+
+    def __init__(self, app, skip: tuple = ("/metrics",)):
+        self.app = app
+        self.skip = skip
+        self._paths: Optional[set] = None
+
+    def _label(self, scope) -> str:
+        if self._paths is None:
+            # Starlette/FastAPI 앱은 scope["app"]에 자신을 넣어 두므로 처음 요청 때 등록된 라우트 경로를 읽는다
+            self._paths = {getattr(route, "path", None) for route in getattr(scope.get("app"), "routes", [])}
+        return scope["path"] if scope["path"] in self._paths else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        path = self._label(scope)
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.add(path)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.add(path, amount=-1)
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], path, str(status))
+
+
+metrics = MetricsRegistry()
+
+# 그래프 / 엔드포인트
+NODE_LATENCY = metrics.histogram("ema_node_duration_seconds", "Graph node latency", ("node",))
+NODE_IN_FLIGHT = metrics.gauge("ema_node_in_flight", "Graph nodes currently running", ("node",))
+NODE_RESULTS = metrics.counter("ema_node_results_total", "Agent node results by Status", ("node", "status"))
+ROUTING_DECISIONS = metrics.counter("ema_routing_decisions_total", "Routing decisions by deciding component and next node", ("source", "next"))
+PARTIAL_ANSWERS = metrics.counter(
+    "ema_partial_answers_total", "Requests answered with a partial answer by cause (deadline | recursion)", ("reason",)
+)
+GRAPH_LATENCY = metrics.histogram("ema_graph_duration_seconds", "End-to-end graph execution latency", ("mode",))
+REQUEST_HOPS = metrics.histogram("ema_request_hops", "Agent hops per request including GeneratingResponse", buckets=(1, 2, 3, 4, 5, 6, 8, 10))
+HTTP_LATENCY = metrics.histogram("ema_http_request_duration_seconds", "HTTP request latency including the response body", ("method", "path", "status"))
+HTTP_IN_FLIGHT = metrics.gauge("ema_http_requests_in_flight", "HTTP requests currently being processed", ("path",))
+
+# /newquestions 직접 생성 (그래프를 거치지 않는 구조화 출력 호출 1회, 문제 풀 보충 포함)
+QUESTION_GENERATION_LATENCY = metrics.histogram(
+    "ema_question_generation_duration_seconds", "ProblemGenerationAgent direct structured question generation latency"
+)
+
+# LLM
+LLM_LATENCY = metrics.histogram("ema_llm_request_duration_seconds", "LLM provider call latency (excluding limiter wait)", ("model",))
+LLM_CALLS = metrics.counter("ema_llm_calls_total", "LLM provider calls", ("model", "caller", "outcome"))
+LLM_TOKENS = metrics.counter("ema_llm_tokens_total", "LLM tokens reported by the provider", ("model", "type"))
+
+# 검색
+RETRIEVAL_LATENCY = metrics.histogram("ema_retrieval_duration_seconds", "Vector store search latency", ("store",))
+RETRIEVAL_RESULTS = metrics.histogram(
+    "ema_retrieval_results", "Documents returned per vector store search", ("store",), buckets=(0, 1, 2, 3, 4, 5, 8, 10, 20)
+)
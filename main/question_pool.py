@@ -0,0 +1,246 @@
+"""
+미리 생성해 둔 객관식 문제 풀
+
+(챕터, 난이도) 버킷마다 문제를 SQLite에 쌓아 두고, /newquestions 요청은 풀에서 바로 꺼내 간다.
+버킷의 문제 수가 low_water 미만으로 떨어지면 백그라운드 워커가 target개까지 다시 채운다.
+보충은 버킷을 처음 꺼낼 때 시작하고(prefill=True면 서버 시작 시 전체 버킷), 생성이 실패하면 지수 백오프로 다시 시도하다가
+max_failures번 연속 실패한 버킷은 더 채우지 않는다.
+문제는 개인화 필드(summarized, quiz_examples) 없이 만들어지므로 그런 필드가 없는 요청에만 써야 한다.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Awaitable, Callable, Optional
+
+DIFFICULTIES = ("EASY", "NORMAL", "HARD")
+
+
+class QuestionPool:
+    """
+    Args:
+        generate: 요청 JSON 문자열을 받아 문제(pydantic 모델)를 만드는 코루틴 함수
+        model: 저장된 문제를 되살릴 pydantic 모델 클래스 (예: NewQuestionResponse)
+        chapters: 버킷을 만들 챕터 이름 목록 (ProblemGenerationAgent.chapter)
+        path: SQLite 파일 경로
+        low_water: 버킷 문제 수가 이 값 미만이면 보충 시작
+        target: 보충할 때 채우는 목표 문제 수
+        workers: 동시에 문제를 생성하는 백그라운드 워커 수
+        prefill: True면 start()에서 low_water 미만인 버킷을 모두 보충 큐에 넣는다 (False면 처음 꺼낼 때부터 보충)
+        retry_delay: 생성 실패 후 첫 재시도까지 대기 시간(초). 연속 실패마다 두 배 (max_retry_delay까지)
+        max_failures: 이 횟수만큼 연속 실패한 버킷은 보충을 멈춘다
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable],
+        model,
+        chapters: list[str],
+        path: str = "question_pool.sqlite3",
+        low_water: int = 2,
+        target: int = 5,
+        workers: int = 2,
+        prefill: bool = False,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        max_failures: int = 5,
+    ):
+        self.generate = generate
+        self.model = model
+        self.chapters = chapters
+        self.low_water = low_water
+        self.target = max(target, low_water)
+        self.workers = workers
+        self.prefill = prefill
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_failures = max_failures
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS question_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chapter TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                question TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_question_pool_bucket ON question_pool (chapter, difficulty, id)")
+        self._conn.commit()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: set[tuple[str, str]] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._failures: dict[tuple[str, str], int] = {}    # 버킷 → 연속 실패 횟수
+        self._retries: dict[tuple[str, str], asyncio.TimerHandle] = {}    # 재시도 대기 중인 버킷
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self.personalized = 0    # 개인화 필드가 있어 풀을 건너뛴 요청 수
+
+    # --- 버킷 ---
+    def match_bucket(self, topics: str, difficulty: str) -> Optional[tuple[str, str]]:
+        """요청의 topics/difficulty를 (챕터, 난이도) 버킷으로 맞춘다. 맞는 챕터가 없으면 None."""
+        difficulty = difficulty.strip().upper()
+        if difficulty not in DIFFICULTIES:
+            return None
+        wanted = topics.strip().lower()
+        for chapter in self.chapters:
+            if chapter.lower() == wanted:
+                return chapter, difficulty
+        # "적분 (Integrals)" → "적분", "integrals" 중 하나만 적어도 맞춘다.
+        for chapter in self.chapters:
+            names = [n.strip().lower() for n in re.split(r"[()]", chapter) if n.strip()]
+            if wanted in names:
+                return chapter, difficulty
+        return None
+
+    def count(self, chapter: str, difficulty: str) -> int:
+        with self._lock:
+            (n,) = self._conn.execute(
+                "SELECT COUNT(*) FROM question_pool WHERE chapter = ? AND difficulty = ?", (chapter, difficulty)
+            ).fetchone()
+        return n
+
+    def _push(self, chapter: str, difficulty: str, question) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO question_pool (chapter, difficulty, question, created_at) VALUES (?, ?, ?, ?)",
+                (chapter, difficulty, question.model_dump_json(), time.time()),
+            )
+            self._conn.commit()
+
+    def pop(self, topics: str, difficulty: str):
+        """
+        버킷에서 가장 오래된 문제 하나를 꺼낸다 (없으면 None). 꺼낸 뒤 문제 수가 부족하면 보충을 예약한다.
+
+        Args:
+            topics (str): 요청의 주제 (챕터 이름)
+            difficulty (str): 요청의 난이도
+
+        Returns:
+            꺼낸 문제 (model 인스턴스) 또는 None
+        """
+        bucket = self.match_bucket(topics, difficulty)
+        if bucket is None:
+            self.misses += 1
+            return None
+
+        # 고르기와 지우기를 한 문장으로 해서 같은 파일을 쓰는 다른 프로세스와 같은 문제를 꺼내지 않게 한다.
+        with self._lock:
+            row = self._conn.execute(
+                """DELETE FROM question_pool WHERE id = (
+                    SELECT id FROM question_pool WHERE chapter = ? AND difficulty = ? ORDER BY id LIMIT 1
+                ) RETURNING question""",
+                bucket,
+            ).fetchone()
+            self._conn.commit()
+
+        self.request_refill(*bucket)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.model.model_validate_json(row[0])
+
+    # --- 백그라운드 보충 ---
+    def request_refill(self, chapter: str, difficulty: str) -> None:
+        """버킷 문제 수가 low_water 미만이면 보충 큐에 넣는다 (이미 대기 중이거나 보충을 멈춘 버킷이면 무시)."""
+        bucket = (chapter, difficulty)
+        if self._queue is None or bucket in self._queued or self._failures.get(bucket, 0) >= self.max_failures:
+            return
+        if self.count(chapter, difficulty) < self.low_water:
+            self._queued.add((chapter, difficulty))
+            self._queue.put_nowait((chapter, difficulty))
+
+    def _requeue(self, bucket: tuple[str, str]) -> None:
+        self._retries.pop(bucket, None)
+        if self._queue is not None:
+            self._queue.put_nowait(bucket)
+
+    async def _worker(self) -> None:
+        while True:
+            bucket = await self._queue.get()
+            chapter, difficulty = bucket
+            try:
+                # 같은 파일을 쓰는 다른 프로세스가 이미 채웠으면 생성하지 않는다.
+                if self.count(chapter, difficulty) >= self.target:
+                    self._queued.discard(bucket)
+                    continue
+                request = json.dumps(
+                    {"topics": chapter, "range": "1", "summarized": "", "difficulty": difficulty, "quiz_examples": ""},
+                    ensure_ascii=False,
+                )
+                question = await self.generate(request)
+                self._push(chapter, difficulty, question)
+                self.generated += 1
+                self._failures.pop(bucket, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                failures = self._failures[bucket] = self._failures.get(bucket, 0) + 1
+                # 키/쿼터 오류는 버킷마다 같은 내용이 반복되므로 전체 traceback은 첫 실패에만 남긴다.
+                detail = f"\n{traceback.format_exc()}" if failures == 1 else f"{type(e).__name__}: {e}"
+                if failures >= self.max_failures:
+                    self._queued.discard(bucket)
+                    print(f"문제 풀 보충 실패 ({chapter}, {difficulty}) {failures}회 연속 → 이 버킷 보충 중단: {detail}")
+                    continue
+                delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+                print(f"문제 풀 보충 실패 ({chapter}, {difficulty}) {failures}회, {delay:.0f}초 뒤 재시도: {detail}")
+                # 기다리는 동안 워커가 다른 버킷을 채울 수 있도록 대기는 타이머에 맡긴다.
+                self._retries[bucket] = asyncio.get_running_loop().call_later(delay, self._requeue, bucket)
+                continue
+            finally:
+                self._queue.task_done()
+
+            # 목표 수에 못 미치면 다시 줄 뒤에 세워 다른 버킷과 번갈아 채운다.
+            if self.count(chapter, difficulty) < self.target:
+                self._queue.put_nowait(bucket)
+            else:
+                self._queued.discard(bucket)
+
+    def start(self) -> None:
+        """워커를 띄운다. prefill이면 low_water 미만인 버킷을 모두 보충 큐에 넣는다 (이벤트 루프 안에서 호출)."""
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if not self.prefill:
+            return
+        for chapter in self.chapters:
+            for difficulty in DIFFICULTIES:
+                self.request_refill(chapter, difficulty)
+
+    async def stop(self) -> None:
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chapter, difficulty, COUNT(*) FROM question_pool GROUP BY chapter, difficulty"
+            ).fetchall()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "errors": self.errors,
+            "personalized": self.personalized,
+            "stopped_buckets": sum(n >= self.max_failures for n in self._failures.values()),
+            "refill_queue": len(self._queued),
+            "buckets": {f"{chapter}|{difficulty}": n for chapter, difficulty, n in rows},
+        }
@@ -0,0 +1,113 @@
+"""
+의미 기반 답변 캐시 테스트 (메모리 저장소, 결정적 가짜 임베딩, API 호출 없음)
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+import asyncio
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from answer_cache import InMemoryCacheBackend, SemanticAnswerCache, normalize_query
+
+# 질의 → 임베딩. "극한이란"과 "극한 정의"는 거의 같은 방향, "적분"은 직교
+VECTORS = {
+    "극한이란": [1.0, 0.0, 0.0],
+    "극한 정의": [0.99, 0.1, 0.0],
+    "적분": [0.0, 0.0, 1.0],
+}
+
+
+class TableEmbeddings(Embeddings):
+    """정해 둔 벡터를 돌려주고 호출 수를 세는 가짜 임베딩"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return VECTORS.get(text, [0.0, 1.0, 0.0])
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def answer_with(text):
+    calls = []
+
+    async def compute():
+        calls.append(text)
+        return text
+
+    return compute, calls
+
+
+def cache(**backend) -> SemanticAnswerCache:
+    return SemanticAnswerCache(TableEmbeddings(), InMemoryCacheBackend(**backend), threshold=0.95)
+
+
+def test_normalize_query():
+    assert normalize_query("  극한이란   무엇인가?? ") == "극한이란 무엇인가"
+    assert normalize_query("Limit  DEFINITION.") == "limit definition"
+    assert normalize_query("ｆ(x)") == "f(x)"
+
+
+def test_exact_hit_skips_embedding():
+    answers = cache()
+    compute, calls = answer_with("극한은 ...")
+    asyncio.run(answers.get_or_compute("극한이란?", compute))
+    embed_calls = answers.embeddings.calls
+
+    assert asyncio.run(answers.get_or_compute("  극한이란 ", compute)) == "극한은 ..."
+    assert calls == ["극한은 ..."] and answers.embeddings.calls == embed_calls
+    assert answers.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_and_miss():
+    answers = cache()
+    compute, calls = answer_with("극한은 ...")
+    asyncio.run(answers.get_or_compute("극한이란", compute))
+
+    assert asyncio.run(answers.get_or_compute("극한 정의", answer_with("다른 답")[0])) == "극한은 ..."
+    assert asyncio.run(answers.get_or_compute("적분", answer_with("적분은 ...")[0])) == "적분은 ..."
+    stats = answers.stats()
+    assert (stats["semantic_hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+
+
+def test_uncacheable_answer_is_not_stored():
+    answers = cache()
+    compute, calls = answer_with("답변을 만들지 못했습니다")
+    for _ in range(2):
+        asyncio.run(answers.get_or_compute("극한이란", compute, cacheable=lambda answer: "못했습니다" not in answer))
+    assert len(calls) == 2 and len(answers.backend) == 0
+
+
+def expire_all(answers: SemanticAnswerCache) -> None:
+    for entry in answers.backend._entries.values():
+        entry.created_at = time.time() - 120
+
+
+def test_expired_entry_is_recomputed():
+    # 만료된 항목은 정확 일치로 돌려주지 않는다
+    answers = cache(ttl=60)
+    asyncio.run(answers.get_or_compute("극한이란", answer_with("예전 답")[0]))
+    expire_all(answers)
+    assert asyncio.run(answers.get_or_compute("극한이란", answer_with("새 답")[0])) == "새 답"
+
+    # 유사도 검색으로도 돌려주지 않는다
+    answers = cache(ttl=60)
+    asyncio.run(answers.get_or_compute("극한이란", answer_with("예전 답")[0]))
+    expire_all(answers)
+    assert asyncio.run(answers.get_or_compute("극한 정의", answer_with("새 답")[0])) == "새 답"
+    assert answers.stats()["semantic_hits"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    answers = cache(max_size=2)
+    asyncio.run(answers.get_or_compute("극한이란", answer_with("극한")[0]))
+    asyncio.run(answers.get_or_compute("적분", answer_with("적분")[0]))
+    asyncio.run(answers.get_or_compute("극한이란", answer_with("-")[0]))     # 극한을 최근 사용으로
+    asyncio.run(answers.get_or_compute("미분", answer_with("미분")[0]))
+
+    assert set(answers.backend._entries) == {"극한이란", "미분"}
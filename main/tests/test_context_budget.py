@@ -0,0 +1,33 @@
+"""
+컨텍스트 예산의 토큰 추정(estimate_tokens)과 출력 자르기(trim_text) 테스트
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+from agent.context_budget import IMAGE_TOKENS, MIN_TRIM_TOKENS, TRIM_MARKER, estimate_tokens, trim_text
+
+LONG_OUTPUT = "극한과 연속의 정의를 정리한다. " * 40 + "\nStatus: COMPLETE"
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("극한") == 2
+    assert estimate_tokens("limit") == 2
+    parts = [{"type": "text", "text": "극한"}, {"type": "image_url", "image_url": {"url": "data:"}}]
+    assert estimate_tokens(parts) == 2 + IMAGE_TOKENS
+
+
+def test_short_text_is_unchanged():
+    assert trim_text("Status: COMPLETE", 100) == "Status: COMPLETE"
+
+
+def test_trim_keeps_head_and_status():
+    trimmed = trim_text(LONG_OUTPUT, 100)
+    assert trimmed.startswith("극한과 연속의 정의")
+    assert TRIM_MARKER in trimmed and trimmed.endswith("Status: COMPLETE")
+    assert estimate_tokens(trimmed) < estimate_tokens(LONG_OUTPUT)
+
+
+def test_tiny_budget_sends_only_status():
+    assert trim_text(LONG_OUTPUT, MIN_TRIM_TOKENS - 1) == "Status: COMPLETE"
+    assert trim_text("극한 " * 100, 1) == ""
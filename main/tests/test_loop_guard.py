@@ -0,0 +1,37 @@
+"""
+루프 제어의 순환 감지(find_cycle) 테스트
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+import pytest
+
+from agent.loop_guard import find_cycle
+
+
+@pytest.mark.parametrize(
+    "nodes, cycle",
+    [
+        (["ExplainTheoryAgent", "ExplainTheoryAgent"], ["ExplainTheoryAgent"]),
+        (["ExternalSearch", "ProblemSolving", "ExternalSearch", "ProblemSolving"], ["ExternalSearch", "ProblemSolving"]),
+        (["ProblemGeneration", "ExternalSearch", "ProblemSolving", "ExternalSearch", "ProblemSolving"], ["ExternalSearch", "ProblemSolving"]),
+    ],
+)
+def test_repeated_tail_is_a_cycle(nodes, cycle):
+    assert find_cycle(nodes) == cycle
+
+
+@pytest.mark.parametrize(
+    "nodes",
+    [
+        [],
+        ["ExplainTheoryAgent"],
+        ["ExplainTheoryAgent", "ExternalSearch"],
+        # 왕복(A→B→A)은 구간 반복이 아니다 (LoopGuard.revisit의 방문 횟수 제한이 맡는다)
+        ["ExplainTheoryAgent", "ExternalSearch", "ExplainTheoryAgent"],
+        # 반복이 끝에 있지 않으면 순환이 아니다
+        ["ExternalSearch", "ExternalSearch", "ProblemSolving"],
+    ],
+)
+def test_no_cycle(nodes):
+    assert find_cycle(nodes) is None
@@ -0,0 +1,116 @@
+"""
+md_ingest 증분 빌드 테스트 (결정적 가짜 임베딩, API 호출 없음)
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from md_ingest import chunk_hash, ingest, split_chapters
+
+CHAPTER = """# Chapter 02 Limits and Derivatives
+
+## 2.1 극한
+
+함수 f(x)에서 x가 a에 가까워질 때 f(x)가 L에 가까워지면 극한값을 L이라 한다.
+
+## 2.2 연속
+
+lim x→a f(x) = f(a)이면 f는 a에서 연속이다.
+
+## 2.3 도함수
+
+f'(a) = lim h→0 (f(a+h) - f(a)) / h
+"""
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """임베딩한 텍스트를 기록하는 결정적 가짜 임베딩"""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    chapters = tmp_path / "chapters_md"
+    chapters.mkdir()
+    (chapters / "Chapter 02 Limits and Derivatives.md").write_text(CHAPTER, encoding="utf-8")
+    return chapters, tmp_path / "index"
+
+
+def build(chapters, index_dir):
+    embeddings = CountingEmbeddings(size=16, embedded=[])
+    report = asyncio.run(ingest(embeddings, str(chapters), str(index_dir), batch_size=2, concurrency=2))
+    store = FAISS.load_local(str(index_dir), embeddings, allow_dangerous_deserialization=True)
+    return report, embeddings.embedded, store
+
+
+def contents(store) -> set[str]:
+    return {store.docstore.search(doc_id).page_content for doc_id in store.index_to_docstore_id.values()}
+
+
+def test_chunk_hash_ignores_source_directory():
+    doc = Document(page_content="극한", metadata={"source": "chapters_md/Chapter 02.md", "Header 1": "Chapter 02"})
+    windows = Document(page_content="극한", metadata={"source": "chapters_md\\Chapter 02.md", "Header 1": "Chapter 02"})
+    assert chunk_hash(doc) == chunk_hash(windows)
+    assert chunk_hash(doc) != chunk_hash(Document(page_content="연속", metadata=doc.metadata))
+
+
+def test_first_build_embeds_every_chunk(corpus):
+    chapters, index_dir = corpus
+    report, embedded, store = build(chapters, index_dir)
+
+    chunks = split_chapters(str(chapters))
+    assert len(chunks) == 3
+    assert report["added"] == report["total"] == 3 and report["deleted"] == 0
+    assert sorted(embedded) == sorted(doc.page_content for doc in chunks)
+    assert store.index.ntotal == 3
+    assert set(store.index_to_docstore_id.values()) == {chunk_hash(doc) for doc in chunks}
+
+
+def test_unchanged_rebuild_embeds_nothing(corpus):
+    chapters, index_dir = corpus
+    build(chapters, index_dir)
+    report, embedded, store = build(chapters, index_dir)
+
+    assert embedded == []
+    assert report["unchanged"] == 3 and report["added"] == report["deleted"] == 0
+    assert store.index.ntotal == 3
+
+
+def test_edited_chunk_is_the_only_one_reembedded(corpus):
+    chapters, index_dir = corpus
+    build(chapters, index_dir)
+    path = next(chapters.glob("*.md"))
+    path.write_text(CHAPTER.replace("f는 a에서 연속이다", "f는 점 a에서 연속이라 한다"), encoding="utf-8")
+
+    report, embedded, store = build(chapters, index_dir)
+
+    assert report["unchanged"] == 2 and report["added"] == 1 and report["deleted"] == 1
+    assert len(embedded) == 1 and "점 a에서 연속" in embedded[0]
+    # 바뀌기 전 청크는 FAISS 인덱스와 docstore 양쪽에서 그 자리에서 지워진다
+    assert store.index.ntotal == 3 == len(store.index_to_docstore_id)
+    assert not any("f는 a에서 연속이다" in text for text in contents(store))
+
+
+def test_deleted_chunk_is_removed_without_embedding(corpus):
+    chapters, index_dir = corpus
+    build(chapters, index_dir)
+    path = next(chapters.glob("*.md"))
+    path.write_text(CHAPTER.split("## 2.3 도함수")[0], encoding="utf-8")
+
+    report, embedded, store = build(chapters, index_dir)
+
+    assert embedded == []
+    assert report["unchanged"] == 2 and report["added"] == 0 and report["deleted"] == 1
+    assert store.index.ntotal == 2 == len(store.index_to_docstore_id)
+    assert not any("도함수" in text for text in contents(store))
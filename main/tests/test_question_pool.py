@@ -0,0 +1,95 @@
+"""
+문제 풀의 버킷 매칭, 꺼내기, 백그라운드 보충 테스트 (임시 SQLite 파일, 가짜 생성 함수)
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from question_pool import QuestionPool
+
+CHAPTERS = ["함수와 모델 (Functions and Models)", "적분 (Integrals)"]
+
+
+class Question(BaseModel):
+    chapter: str
+    question: str
+
+
+def make_pool(tmp_path, generate=None, **kwargs) -> QuestionPool:
+    async def never(request):
+        raise AssertionError("생성하면 안 됨")
+
+    return QuestionPool(generate or never, Question, CHAPTERS, path=str(tmp_path / "pool.sqlite3"), **kwargs)
+
+
+@pytest.mark.parametrize(
+    "topics, difficulty, bucket",
+    [
+        ("함수와 모델 (Functions and Models)", "Normal", ("함수와 모델 (Functions and Models)", "NORMAL")),
+        (" integrals ", "hard", ("적분 (Integrals)", "HARD")),
+        ("적분", "EASY", ("적분 (Integrals)", "EASY")),
+        ("미분", "Normal", None),
+        ("적분", "Expert", None),
+    ],
+)
+def test_match_bucket(tmp_path, topics, difficulty, bucket):
+    assert make_pool(tmp_path).match_bucket(topics, difficulty) == bucket
+
+
+def test_pop_returns_oldest_then_none(tmp_path):
+    pool = make_pool(tmp_path)
+    for n in range(2):
+        pool._push("적분 (Integrals)", "NORMAL", Question(chapter="적분", question=f"문제 {n}"))
+
+    assert pool.pop("적분", "Normal").question == "문제 0"
+    assert pool.pop("Integrals", "normal").question == "문제 1"
+    assert pool.pop("적분", "Normal") is None
+    assert pool.pop("미분", "Normal") is None
+    assert (pool.hits, pool.misses) == (2, 2)
+
+
+def test_pop_refills_bucket_in_background(tmp_path):
+    async def generate(request):
+        return Question(chapter="적분", question="새 문제")
+
+    async def run():
+        pool = make_pool(tmp_path, generate, low_water=1, target=2, workers=1)
+        pool.start()
+        assert pool.pop("적분", "Easy") is None
+        for _ in range(100):
+            if pool.count("적분 (Integrals)", "EASY") >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.count("적분 (Integrals)", "EASY") == 2 and pool.generated == 2
+    assert pool.count("함수와 모델 (Functions and Models)", "EASY") == 0     # 꺼내지 않은 버킷은 채우지 않는다
+
+
+def test_failing_bucket_backs_off_then_stops(tmp_path):
+    attempts = []
+
+    async def generate(request):
+        attempts.append(request)
+        raise RuntimeError("quota")
+
+    async def run():
+        pool = make_pool(tmp_path, generate, workers=1, retry_delay=0.01, max_failures=3)
+        pool.start()
+        pool.pop("적분", "Hard")
+        await asyncio.sleep(0.3)
+        # 보충을 멈춘 버킷은 다시 꺼내도 큐에 넣지 않는다
+        pool.pop("적분", "Hard")
+        await asyncio.sleep(0.05)
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert len(attempts) == 3 and pool.errors == 3
+    assert pool.stats()["stopped_buckets"] == 1 and pool.stats()["refill_queue"] == 0
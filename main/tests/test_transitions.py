@@ -0,0 +1,60 @@
+"""
+에이전트 Status 파싱과 표 기반 전이(decide_transition) 테스트
+
+실행 (main 디렉터리에서):
+    python -m pytest tests
+"""
+from dataclasses import dataclass, field
+
+import pytest
+
+from agent.transitions import decide_transition, parse_status
+
+
+@dataclass
+class Result:
+    status: str
+
+
+@dataclass
+class State:
+    """decide_transition이 쓰는 부분만 흉내 낸 그래프 상태 (마지막 hop = last)"""
+    last: str
+    results: dict = field(default_factory=dict)
+
+    def last_result(self):
+        return self.last, self.results[self.last]
+
+
+def state(last: str, status, **others) -> State:
+    return State(last, {last: Result(status), **{name: Result(s) for name, s in others.items()}})
+
+
+@pytest.mark.parametrize(
+    "content, status",
+    [
+        ("극한의 정의를 설명했다.\nStatus: COMPLETE", "COMPLETE"),
+        ("검색 결과 없음\n**Status:** failed", "FAILED"),
+        ("Status: FAILED\n다시 찾아 보충했다.\nStatus: COMPLETE", "COMPLETE"),
+        ("Status 줄이 없는 답변", None),
+        ([{"type": "text", "text": "Status: COMPLETE"}], None),
+    ],
+)
+def test_parse_status(content, status):
+    assert parse_status(content) == status
+
+
+def test_complete_goes_to_response():
+    assert decide_transition(state("ExplainTheoryAgent", "COMPLETE"), {"explain"})[0] == "GeneratingResponse"
+
+
+def test_failed_goes_to_fallback_once():
+    assert decide_transition(state("ExplainTheoryAgent", "FAILED"), {"explain"})[0] == "ExternalSearch"
+    # 대체 에이전트를 이미 실행했으면 한계를 안고 응답 생성
+    already = state("ExplainTheoryAgent", "FAILED", ExternalSearch="COMPLETE")
+    assert decide_transition(already, {"explain"})[0] == "GeneratingResponse"
+
+
+def test_undecidable_is_left_to_task_manager():
+    assert decide_transition(state("ProblemSolving", None), {"solve"})[0] is None
+    assert decide_transition(state("ProblemSolving", "COMPLETE"), {"solve", "explain"})[0] is None
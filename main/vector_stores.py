@@ -0,0 +1,193 @@
+"""
+FAISS 벡터스토어 레지스트리
+
+인덱스마다 프로세스당 한 번만, 처음 검색할 때 로드한다 (워크플로 import 시점에는 로드하지 않음).
+- 인덱스 파일은 mmap 모드로 읽어 벡터가 파일 기반 페이지에 올라간다.
+  같은 파일을 여는 워커 프로세스들은 OS 페이지 캐시를 공유하고, fork 전에 로드하면 그대로 물려받는다.
+- 인덱스 디렉터리가 없거나 읽을 수 없으면 None을 돌려주고, 검색 도구는 빈 결과로 동작한다.
+- mmap으로 연 인덱스는 읽기 전용이다. 인덱스 갱신은 md_ingest.py(FAISS.load_local)로 한다.
+- 기본 인덱스(index.faiss, float32 Flat) 외에 압축/분할 형식(fp16, sq8, ivf, ivf_sq8)을
+  같은 디렉터리에 index.<형식>.faiss로 만들어 두고 설정(VECTORSTORE_INDEX_TYPE)으로 골라 쓸 수 있다.
+  벡터 순서가 같으므로 index.pkl(docstore)은 그대로 공유한다.
+"""
+import math
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+# 인덱스 형식 → faiss index_factory 문자열 ({nlist}는 벡터 수로 정한다)
+INDEX_TYPES = {
+    "flat": "Flat",                 # float32 원본, 전수 검색
+    "fp16": "SQfp16",               # float16으로 저장 (크기 1/2)
+    "sq8": "SQ8",                   # 차원별 8비트 스칼라 양자화 (크기 1/4)
+    "ivf": "IVF{nlist},Flat",       # 군집 nprobe개만 검색
+    "ivf_sq8": "IVF{nlist},SQ8",
+}
+
+
+def index_file(path: str, index_type: str = "flat") -> Path:
+    return Path(path) / ("index.faiss" if index_type == "flat" else f"index.{index_type}.faiss")
+
+
+def ivf_nlist(n: int) -> int:
+    """IVF 군집 수: 약 4√n개, 군집마다 학습 벡터가 39개 이상 되도록 제한"""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_index(path: str, index_type: str) -> Path:
+    """
+    기본 인덱스(index.faiss)의 벡터로 index_type 형식 인덱스를 만들어 같은 디렉터리에 저장한다.
+
+    Args:
+        path (str): 인덱스 디렉터리
+        index_type (str): INDEX_TYPES의 키
+
+    Returns:
+        Path: 저장한 인덱스 파일 경로
+    """
+    flat = faiss.read_index(str(index_file(path)))
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    index = faiss.index_factory(flat.d, INDEX_TYPES[index_type].format(nlist=ivf_nlist(flat.ntotal)), flat.metric_type)
+    index.train(vectors)
+    index.add(vectors)
+    target = index_file(path, index_type)
+    faiss.write_index(index, str(target))
+    return target
+
+
+def read_index(file: Path, index_type: str = "flat", mmap: bool = True, nprobe: int = 8):
+    """
+    faiss 인덱스 파일을 읽는다. mmap이면 Flat/SQ는 벡터 코드(IFC)를, IVF는 역색인 리스트를 mmap으로 연다
+    (IVF에 두 플래그를 함께 주면 읽지 못한다. 구버전 faiss에는 IFC 플래그가 없다).
+    """
+    flags = 0
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP if index_type.startswith("ivf") else getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    index = faiss.read_index(str(file), flags)
+    if index_type.startswith("ivf"):
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    return index
+
+
+def load_faiss(path: str, embeddings, mmap: bool = True, index_type: str = "flat", nprobe: int = 8) -> FAISS:
+    """
+    FAISS.save_local로 저장한 디렉터리(index.faiss + index.pkl)를 읽는다.
+
+    Args:
+        path (str): 인덱스 디렉터리
+        embeddings: 질의 임베딩에 쓸 langchain Embeddings
+        mmap (bool): True면 인덱스를 mmap 모드로 연다, False면 FAISS.load_local과 같이 전부 메모리로 읽는다
+        index_type (str): 읽을 인덱스 형식. 해당 파일이 없거나 기본 인덱스보다 오래됐으면 기본 인덱스를 읽는다
+        nprobe (int): IVF 형식에서 검색할 군집 수
+
+    Returns:
+        FAISS: langchain FAISS 벡터스토어
+    """
+    file = index_file(path, index_type)
+    if index_type != "flat" and (not file.exists() or file.stat().st_mtime < index_file(path).stat().st_mtime):
+        print(f"{file} 없음 또는 기본 인덱스보다 오래됨 → index.faiss 사용 (md_ingest.py --index-type {index_type}로 생성)")
+        file, index_type = index_file(path), "flat"
+    if not mmap and index_type == "flat":
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    index = read_index(file, index_type, mmap, nprobe)
+    with open(Path(path) / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+class VectorStoreRegistry:
+    """
+    이름 → 인덱스 디렉터리를 등록해 두고, get() 첫 호출 때 한 번만 로드해 재사용한다.
+    여러 에이전트(스레드)가 동시에 처음 요청해도 로드는 한 번만 일어난다.
+    """
+
+    def __init__(self, mmap: Optional[bool] = None):
+        self.mmap = os.getenv("VECTORSTORE_MMAP", "on") != "off" if mmap is None else mmap
+        self.index_type = os.getenv("VECTORSTORE_INDEX_TYPE", "flat")
+        self.nprobe = int(os.getenv("VECTORSTORE_NPROBE", "8"))
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"VECTORSTORE_INDEX_TYPE은 {list(INDEX_TYPES)} 중 하나여야 합니다: {self.index_type}")
+        self._paths: dict[str, tuple[str, object]] = {}
+        self._stores: dict[str, Optional[FAISS]] = {}
+        self._load_times: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str, embeddings) -> None:
+        """인덱스를 등록한다 (로드는 하지 않는다)."""
+        with self._lock:
+            self._paths.setdefault(name, (path, embeddings))
+
+    def get(self, name: str) -> Optional[FAISS]:
+        """
+        등록된 인덱스를 돌려준다. 처음 호출될 때 로드하며, 없거나 읽을 수 없으면 None.
+
+        Args:
+            name (str): register()에 쓴 이름
+
+        Returns:
+            Optional[FAISS]: 로드된 벡터스토어 또는 None
+        """
+        if name in self._stores:
+            return self._stores[name]
+        with self._lock:
+            if name not in self._stores:
+                self._stores[name] = self._load(name)
+        return self._stores[name]
+
+    def _load(self, name: str) -> Optional[FAISS]:
+        path, embeddings = self._paths[name]
+        if not (Path(path) / "index.faiss").exists():
+            print(f"벡터스토어 '{name}' 없음 ({path}) → 이 인덱스 검색은 빈 결과를 돌려줍니다.")
+            return None
+        start_time = time.time()
+        try:
+            store = load_faiss(path, embeddings, mmap=self.mmap, index_type=self.index_type, nprobe=self.nprobe)
+        except Exception as e:
+            print(f"벡터스토어 '{name}' 로드 실패: {e}")
+            return None
+        self._load_times[name] = round(time.time() - start_time, 3)
+        print(
+            f"벡터스토어 '{name}' 로드: {self._load_times[name]:.3f}초 "
+            f"({store.index.ntotal}개, {type(store.index).__name__}, mmap={self.mmap})"
+        )
+        return store
+
+    def preload(self) -> None:
+        """등록된 인덱스를 모두 미리 로드한다 (서버 시작 시 첫 요청 지연을 없애거나, fork 전에 공유하려고 할 때)."""
+        for name in list(self._paths):
+            self.get(name)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "path": path,
+                "loaded": name in self._stores,
+                "available": self._stores.get(name) is not None if name in self._stores else None,
+                "size": self._stores[name].index.ntotal if self._stores.get(name) is not None else 0,
+                "load_time": self._load_times.get(name),
+            }
+            for name, (path, _) in self._paths.items()
+        }
+
+
+# 프로세스 전체에서 공유하는 레지스트리
+registry = VectorStoreRegistry()
+
+
+if __name__ == "__main__":
+    # 저장된 FAISS 디렉터리(예: vectorstore)로 압축/분할 형식 인덱스를 만든다.
+    #   python vector_stores.py vectorstore --index-type ivf_sq8
+    import argparse
+
+    parser = argparse.ArgumentParser(description="기본 인덱스(index.faiss)로 압축/분할 형식 인덱스 생성")
+    parser.add_argument("path")
+    parser.add_argument("--index-type", required=True, choices=[t for t in INDEX_TYPES if t != "flat"])
+    args = parser.parse_args()
+    target = build_index(args.path, args.index_type)
+    print(f"{target} 생성 ({os.path.getsize(target) / 1e6:.2f}MB, 기본 {os.path.getsize(index_file(args.path)) / 1e6:.2f}MB)")
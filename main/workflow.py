@@ -1,16 +1,28 @@
-from typing import TypedDict, Sequence, Annotated
+from dataclasses import dataclass, field
+from typing import Annotated, List, Optional, Union
 import operator
+import asyncio
 import time
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.config import get_stream_writer
+from langgraph.errors import GraphRecursionError
 from langchain_core.messages import HumanMessage, AIMessage
 from agent.external_search_agent import ExternalSearchAgent
 from agent.problem_solving_agent import ProblemSolvingAgent
 from agent.problem_generation_agent import ProblemGenerationAgent
 from agent.response_generation_agent import ResponseGenerationAgent
 from agent.explain_theory_agent import ExplainTheoryAgent
-from agent.task_manager import TaskManager
+from agent.task_manager import TaskManager, RouteResponse, worker_members
+from agent.intent_router import IntentRouter
+from agent.transitions import decide_transition, parse_status
+from agent.context_budget import ContextBudget
+from agent.loop_guard import LoopGuard
+from latency_budget import latency_budget
+from metrics import NODE_LATENCY, NODE_IN_FLIGHT, NODE_RESULTS, ROUTING_DECISIONS, GRAPH_LATENCY, PARTIAL_ANSWERS
 from functools import partial
+import random
 
 search_agent = ExternalSearchAgent()
 solving_agent = ProblemSolvingAgent()
@@ -18,25 +30,260 @@ generating_agent = ProblemGenerationAgent()
 response_agent = ResponseGenerationAgent()
 explain_theory_agent = ExplainTheoryAgent()
 Task_Manager = TaskManager()
+intent_router = IntentRouter(explain_theory_agent.embeddings)
+context_budget = ContextBudget()
+loop_guard = LoopGuard()
 
 members = ["ExternalSearch", "ProblemSolving", "ProblemGeneration", "ExplainTheoryAgent"]
 
-def supervisor_agent(state):
-    start_time = time.time()
-    result = Task_Manager.agent.invoke(state)
-    end_time = time.time()
-    
-    print(f"TaskManager: {end_time - start_time:.3f}초 → {result.next} 선택")
-    return result
-
-def agent_node(state, agent, name):
-    start_time = time.time()
-    agent_response = agent.agent.invoke(state)
-    end_time = time.time()
-    print(f"{name}: {end_time - start_time:.3f}초")
+@dataclass(slots=True, frozen=True)
+class AgentResult:
+    """에이전트 하나의 최신 실행 결과"""
+    content: str
+    status: Optional[str]   # COMPLETE | FAILED | None (Status 줄 없음)
+    hop: int                # 몇 번째 hop에서 나온 결과인지 (프롬프트를 만들 때 시간순 정렬에 사용)
+    input_key: str = ""     # 이 결과를 만든 입력 메시지의 지문 (같은 입력으로 다시 부르면 재사용)
+
+
+@dataclass(slots=True, frozen=True)
+class Hop:
+    """hop 기록 한 줄 (실행한 에이전트, 결과 Status, 소요 시간, 이전 결과 재사용 여부)"""
+    node: str
+    status: Optional[str]
+    elapsed: float
+    reused: bool = False
+
+
+def merge_results(left: dict, right: dict) -> dict:
+    """에이전트별 최신 결과만 남긴다 (같은 에이전트를 다시 실행하면 이전 결과를 덮어쓴다)."""
+    return {**left, **right}
+
+
+@dataclass(slots=True)
+class AgentState:
+    """
+    그래프 상태. 메시지를 계속 이어 붙이는 대신 에이전트 이름별 최신 결과만 보관하고,
+    에이전트에 보낼 메시지는 messages()로 필요할 때 만든다.
+    hop마다 복사되는 양이 hop 수와 관계없이 (에이전트 수만큼으로) 일정하다.
+    """
+    user_input: Union[str, list] = ""     # 사용자 질의 (이미지가 있으면 content 파트 목록)
+    results: Annotated[dict[str, AgentResult], merge_results] = field(default_factory=dict)
+    hops: Annotated[tuple[Hop, ...], operator.add] = ()
+    next: str = ""
+    plan: List[str] = field(default_factory=list)     # 이번 hop에 실행할 에이전트 (2개 이상이면 병렬 실행 후 JoinResults에서 합류)
+    deadline: float = 0.0                              # 요청 마감 시각 (time.monotonic 기준, 0이면 제한 없음)
+
+    def messages(self) -> list[HumanMessage]:
+        """사용자 메시지 + 에이전트별 최신 결과를 실행 순서대로 메시지 목록으로 만든다."""
+        ordered = sorted(self.results.items(), key=lambda item: item[1].hop)
+        return [HumanMessage(content=self.user_input, name="User")] + [
+            HumanMessage(content=result.content, name=name) for name, result in ordered
+        ]
+
+    def last_result(self) -> Optional[tuple[str, AgentResult]]:
+        """가장 최근 hop에서 실행한 에이전트의 (이름, 결과). 아직 실행한 에이전트가 없으면 None."""
+        if not self.hops:
+            return None
+        name = self.hops[-1].node
+        return name, self.results[name]
+
+
+PARTIAL_ANSWER_NOTE = "※ 처리 시간·단계 제한으로 답변을 끝까지 만들지 못해 중간 결과를 보여드립니다.\n\n"
+
+
+def partial_answer(results: dict, reason: Optional[str] = None) -> str:
+    """
+    GeneratingResponse 없이 끝난 요청에 돌려줄 최선의 중간 답변.
+    가장 최근에 COMPLETE로 끝난 에이전트 결과(없으면 가장 최근 결과)를 Status 줄을 빼고 돌려준다.
+
+    Args:
+        results (dict): 에이전트 이름 → AgentResult
+        reason (str): 중간 답변으로 끝난 원인 (deadline | recursion). 주면 원인별로 센다
+                      (이미 센 결과를 다시 꺼낼 때는 주지 않는다). deadline만 latency_budget 통계에 들어간다.
+
+    Returns:
+        str: PARTIAL_ANSWER_NOTE로 시작하는 답변
+    """
+    if reason:
+        PARTIAL_ANSWERS.inc(reason)
+        if reason == "deadline":
+            latency_budget.partial_answers += 1
+    candidates = sorted(
+        (result for name, result in results.items() if name != "GeneratingResponse" and isinstance(result.content, str)),
+        key=lambda result: (result.status == "COMPLETE", result.hop),
+    )
+    if not candidates:
+        return PARTIAL_ANSWER_NOTE + "아직 참고할 수 있는 결과가 없습니다. 잠시 후 다시 질문해 주세요."
+    body = "\n".join(line for line in candidates[-1].content.splitlines() if parse_status(line) is None)
+    return PARTIAL_ANSWER_NOTE + body.strip()
+
+
+def is_partial_answer(answer: Optional[str]) -> bool:
+    """partial_answer()가 만든 중간 답변인지 (답변 캐시에 저장하지 않는다)."""
+    return bool(answer) and answer.startswith(PARTIAL_ANSWER_NOTE)
+
+
+def final_answer(result: dict) -> Optional[str]:
+    """
+    그래프 실행 결과(상태 dict)에서 GeneratingResponse의 답변을 꺼낸다.
+    GeneratingResponse까지 가지 못했으면 다른 에이전트 결과로 만든 중간 답변을 돌려준다
+    (원인별 집계는 실행을 끝낸 쪽(TimedGraph.ainvoke 등)에서 이미 했으므로 여기서는 세지 않는다).
+    """
+    results = result.get("results") or {}
+    answer = results.get("GeneratingResponse")
+    if answer:
+        return answer.content
+    return partial_answer(results) if results else None
+
+
+def guard_route(state, route: dict, source: str) -> dict:
+    """
+    라우팅 결과(next, plan)를 루프 제어와 남은 시간 예산에 맞춘다.
+    - hop 예산을 다 썼거나, 같은 에이전트 구간을 다시 돌거나, 다시 실행해도 소용없는 에이전트(같은 입력으로 실패/이미 재사용,
+      최대 실행 횟수 도달)로 가려 하면 GeneratingResponse로 바꾼다.
+    - 고른 에이전트(병렬이면 가장 느린 것)와 GeneratingResponse가 마감 안에 끝나지 않을 것 같으면 GeneratingResponse로 바꾼다.
+    """
+    if route["next"] == "GeneratingResponse":
+        return route
+    plan = route["plan"] or [route["next"]]
+    for node in plan:
+        input_key = loop_guard.input_key(context_budget.select(state.messages(), node, record=False)) if loop_guard.enabled else ""
+        reason = loop_guard.check(state, node, input_key)
+        if reason:
+            return force_response(state, "LoopGuard", f"{source}: {reason}")
+    if state.deadline and not latency_budget.fits(state.deadline, max(plan, key=latency_budget.estimate)):
+        latency_budget.forced_response += 1
+        remaining = latency_budget.remaining(state.deadline)
+        return force_response(state, "LatencyBudget", f"{source}: 남은 시간 {remaining:.1f}초로 {' + '.join(plan)} 실행 불가")
+    return route
+
+
+def emit_route(event: dict) -> None:
+    """라우팅 결정을 메트릭에 세고, 스트리밍 실행(stream_mode="custom")이면 진행 이벤트로도 보낸다."""
+    ROUTING_DECISIONS.inc(event["node"], event["next"])
+    get_stream_writer()(event)
+
+
+def force_response(state, guard: str, reason: str) -> dict:
+    """guard(LoopGuard / LatencyBudget)가 reason으로 남은 에이전트를 건너뛰고 GeneratingResponse로 보내는 라우팅 결과"""
+    print(f"{reason} → GeneratingResponse 선택")
+    emit_route({"event": "route", "node": guard, "next": "GeneratingResponse", "reason": reason, "elapsed": 0.0})
+    return {"next": "GeneratingResponse", "plan": ["GeneratingResponse"]}
+
+async def supervisor_agent(state):
+    route, _ = await supervise(state)
+    return route
+
+async def supervise(state) -> tuple[dict, Optional[RouteResponse]]:
+    """
+    TaskManager로 다음 노드를 정한다.
+
+    Returns:
+        (루프 제어·시간 예산을 적용한 라우팅 결과, TaskManager의 원래 결정 — TaskManager를 부르지 못했으면 None)
+    """
+    # hop 예산을 다 썼거나 TaskManager 호출 + 가장 빠른 에이전트 하나도 시간 안에 들어가지 않으면 라우팅 없이 바로 응답 생성
+    if loop_guard.hops_spent(state):
+        loop_guard.hop_budget_hits += 1
+        return force_response(state, "LoopGuard", f"TaskManager: hop 예산 {loop_guard.max_hops}회 소진"), None
+    if state.deadline and not latency_budget.fits(state.deadline, "TaskManager", min(worker_members, key=latency_budget.estimate)):
+        latency_budget.forced_response += 1
+        remaining = latency_budget.remaining(state.deadline)
+        return force_response(state, "LatencyBudget", f"TaskManager: 남은 시간 {remaining:.1f}초로 TaskManager 실행 불가"), None
+
+    start_time = time.perf_counter()
+    try:
+        with NODE_IN_FLIGHT.track("TaskManager"):
+            result = await asyncio.wait_for(
+                Task_Manager.agent.ainvoke({"messages": context_budget.select(state.messages(), "TaskManager")}),
+                latency_budget.timeout(state.deadline, "TaskManager"),
+            )
+    except asyncio.TimeoutError:
+        NODE_LATENCY.observe(time.perf_counter() - start_time, "TaskManager")
+        latency_budget.timeouts["TaskManager"] += 1
+        return force_response(state, "LatencyBudget", "TaskManager: 시간 예산 초과"), None
+    end_time = time.perf_counter()
+    NODE_LATENCY.observe(end_time - start_time, "TaskManager")
+    latency_budget.record("TaskManager", end_time - start_time)
     
-    msg = HumanMessage(content=agent_response["messages"][-1].content, name=name)
-    return {"messages": [msg]}
+    print(f"TaskManager → {' + '.join(result.plan)} 선택")
+    emit_route({"event": "route", "node": "TaskManager", "next": result.next, "plan": result.plan, "elapsed": round(end_time - start_time, 3)})
+    return guard_route(state, {"next": result.next, "plan": result.plan}, "TaskManager"), result
+
+async def intent_router_node(state):
+    """
+    첫 번째 hop을 로컬 분류기로 결정한다.
+    신뢰도가 낮을 때만 TaskManager(LLM)를 호출하고, 그때 로컬 판단과의 일치 여부를 기록한다.
+    """
+    if not intent_router.enabled:
+        return await supervisor_agent(state)
+
+    start_time = time.perf_counter()
+    guess = await intent_router.classify(state)
+    end_time = time.perf_counter()
+    NODE_LATENCY.observe(end_time - start_time, "IntentRouter")
+
+    if guess.confidence >= intent_router.threshold:
+        intent_router.fast_path += 1
+        print(f"IntentRouter → {' + '.join(guess.plan)} 선택 (신뢰도 {guess.confidence:.2f}, {guess.reason})")
+        emit_route({"event": "route", "node": "IntentRouter", "next": guess.next, "plan": guess.plan, "elapsed": round(end_time - start_time, 3)})
+        if random.random() < intent_router.shadow_rate:
+            intent_router.shadow_compare(
+                guess, Task_Manager.agent.ainvoke({"messages": context_budget.select(state.messages(), "TaskManager")})
+            )
+        return guard_route(state, {"next": guess.next, "plan": guess.plan}, "IntentRouter")
+
+    intent_router.fallbacks += 1
+    print(f"IntentRouter: 신뢰도 {guess.confidence:.2f} ({guess.reason}) → TaskManager에 위임")
+    ROUTING_DECISIONS.inc("IntentRouter", "TaskManager")
+    route, decision = await supervise(state)
+    # 루프 제어/시간 예산이 바꾼 라우팅이 아니라 TaskManager 자체의 판단과 비교한다 (부르지 못했으면 기록하지 않는다)
+    if decision is not None:
+        intent_router.record_agreement(guess.next, decision.next)
+    return route
+
+async def agent_node(state, agent, name):
+    writer = get_stream_writer()
+    # 이 에이전트에 필요한 메시지만 골라 토큰 예산 안으로 줄여서 전달
+    messages = context_budget.select(state.messages(), name)
+    input_key = loop_guard.input_key(messages)
+    previous = state.results.get(name)
+    if loop_guard.enabled and previous is not None and previous.input_key == input_key:
+        # 같은 입력으로 이미 실행한 에이전트는 다시 부르지 않고 이전 출력을 그대로 쓴다
+        loop_guard.duplicates_skipped += 1
+        NODE_RESULTS.inc(name, "reused")
+        print(f"{name}: 같은 입력으로 이미 실행함 → 이전 결과 재사용 (Status: {previous.status})")
+        writer({"event": "node_reused", "node": name, "status": previous.status})
+        return {"hops": (Hop(node=name, status=previous.status, elapsed=0.0, reused=True),)}
+
+    writer({"event": "node_start", "node": name})
+    start_time = time.perf_counter()
+    timeout = latency_budget.timeout(state.deadline, name)
+    try:
+        with NODE_IN_FLIGHT.track(name):
+            agent_response = await asyncio.wait_for(agent.agent.ainvoke({"messages": messages}), timeout)
+        content = agent_response["messages"][-1].content
+        latency_budget.record(name, time.perf_counter() - start_time)
+    except asyncio.TimeoutError:
+        input_key = ""      # 시간 초과로 만든 결과는 재사용하지 않는다
+        # 시간 예산을 넘긴 에이전트는 FAILED로 기록하고, 최종 응답 단계였다면 지금까지의 결과로 답한다
+        latency_budget.timeouts[name] += 1
+        print(f"{name}: 시간 예산({timeout:.1f}초) 초과로 중단")
+        if name == "GeneratingResponse":
+            content = partial_answer(state.results, "deadline")
+        else:
+            content = f"{name}: 시간 예산({timeout:.1f}초) 안에 결과를 만들지 못했습니다.\nStatus: FAILED"
+    elapsed = time.perf_counter() - start_time
+    NODE_LATENCY.observe(elapsed, name)
+    writer({"event": "node_end", "node": name, "elapsed": round(elapsed, 3)})
+
+    status = parse_status(content)
+    NODE_RESULTS.inc(name, status or "NONE")
+    if name == "GeneratingResponse":
+        loop_guard.record(len(state.hops) + 1)
+    return {
+        "results": {name: AgentResult(content=content, status=status, hop=len(state.hops), input_key=input_key)},
+        "hops": (Hop(node=name, status=status, elapsed=round(elapsed, 3)),),
+    }
 
 search_node = partial(agent_node, agent=search_agent, name="ExternalSearch")
 solving_node = partial(agent_node, agent=solving_agent, name="ProblemSolving")
@@ -44,9 +291,16 @@ generating_node = partial(agent_node, agent=generating_agent, name="ProblemGener
 explain_node = partial(agent_node, agent=explain_theory_agent, name="ExplainTheoryAgent")
 response_node = partial(agent_node, agent=response_agent, name="GeneratingResponse")
 
-class AgentState(TypedDict):
-    messages: Annotated[Sequence[HumanMessage], operator.add]
-    next: str
+async def join_node(state):
+    """
+    병렬로 실행한 에이전트들의 결과를 모은 뒤 다음 단계를 정한다.
+    모두 COMPLETE면 바로 GeneratingResponse, 하나라도 실패하면 TaskManager가 복구 경로를 고른다.
+    """
+    statuses = {name: state.results[name].status if name in state.results else None for name in state.plan}
+    next_node = "GeneratingResponse" if all(v == "COMPLETE" for v in statuses.values()) else "TaskManager"
+    print(f"JoinResults: {statuses} → {next_node} 선택")
+    emit_route({"event": "route", "node": "JoinResults", "next": next_node, "statuses": statuses, "elapsed": 0.0})
+    return {"next": next_node, "plan": []}
 
 workflow = StateGraph(AgentState)
 
@@ -56,38 +310,78 @@ workflow.add_node("ProblemGeneration", generating_node)
 workflow.add_node("GeneratingResponse", response_node)
 workflow.add_node("ExplainTheoryAgent", explain_node)
 workflow.add_node("TaskManager", supervisor_agent)
+workflow.add_node("IntentRouter", intent_router_node)
+workflow.add_node("JoinResults", join_node)
+
+def route_by_status(state):
+    """
+    에이전트 실행 직후 Status(COMPLETE/FAILED)로 다음 노드를 정한다.
+    전이표로 결정할 수 없는 경우(Status 없음, 복합 의도)에만 TaskManager(LLM)를 거친다.
+    병렬 실행 중이면 모든 결과가 모이도록 JoinResults로 보낸다.
+    """
+    if len(state.plan) > 1:
+        return "JoinResults"
+    next_node, reason = decide_transition(state, intent_router.request_intents(state))
+    if next_node is None:
+        print(f"StatusRouter: {reason} → TaskManager에 위임")
+        ROUTING_DECISIONS.inc("StatusRouter", "TaskManager")
+        return "TaskManager"
+    print(f"StatusRouter: {reason} → {next_node} 선택")
+    emit_route({"event": "route", "node": "StatusRouter", "next": next_node, "elapsed": 0.0})
+    return guard_route(state, {"next": next_node, "plan": [next_node]}, "StatusRouter")["next"]
 
+status_map = {name: name for name in members + ["GeneratingResponse", "TaskManager", "JoinResults"]}
 for m in members:
-    workflow.add_edge(m, "TaskManager")
+    workflow.add_conditional_edges(m, route_by_status, status_map)
 
 members.append("GeneratingResponse")
 conditional_map = {name: name for name in members}
 
 def get_next(state):
-    return state["next"]
+    return state.next
 
-workflow.add_conditional_edges("TaskManager", get_next, conditional_map)
-workflow.add_edge(START, "TaskManager")
+def dispatch(state):
+    """라우터가 에이전트 여러 개를 골랐으면 Send로 동시에 실행하고, 아니면 next 하나로 이동한다."""
+    if len(state.plan) > 1:
+        return [Send(name, state) for name in state.plan]
+    return state.next
+
+workflow.add_conditional_edges("TaskManager", dispatch, conditional_map)
+workflow.add_conditional_edges("IntentRouter", dispatch, conditional_map)
+workflow.add_conditional_edges("JoinResults", get_next, {**conditional_map, "TaskManager": "TaskManager"})
+workflow.add_edge(START, "IntentRouter")
 workflow.add_edge("GeneratingResponse", END)
 
 original_graph = workflow.compile()
 
 class TimedGraph:
+    """
+    그래프 전체 실행 시간을 메트릭(ema_graph_duration_seconds)에 기록하고,
+    요청마다 시간 예산 마감 시각(deadline)을 상태에 넣어 실행한다. 호출하는 쪽이 state에 deadline을 넣으면 그 값을 쓴다.
+    """
     def __init__(self, graph):
         self.graph = graph
     
-    def invoke(self, state, config=None):
-        print(f"\n 처리 시작: {state['messages'][0].content[:50]}...")
-        print("="*60)
-        
-        start_time = time.time()
-        result = self.graph.invoke(state, config)
-        end_time = time.time()
-        
-        print("="*60)
-        print(f" 총 처리시간: {end_time - start_time:.3f}초")
-        print("="*60)
-        
+    async def ainvoke(self, state, config=None):
+        print(f"처리 시작: {str(state['user_input'])[:50]}...")
+        result = {}
+        with GRAPH_LATENCY.time("invoke"):
+            try:
+                # 중간 상태를 받아 두었다가 recursion_limit에 걸리면 그때까지의 결과로 중간 답변을 만든다
+                async for result in self.graph.astream(
+                    {"deadline": latency_budget.deadline(), **state}, config, stream_mode="values"
+                ):
+                    pass
+            except GraphRecursionError:
+                print(f"recursion_limit 도달 → 중간 결과로 응답 ({len(result.get('hops', ()))} hop)")
+                PARTIAL_ANSWERS.inc("recursion")
+                loop_guard.record(len(result.get("hops", ())), recursion=True)
         return result
 
+    async def astream(self, state, config=None, stream_mode="updates"):
+        print(f"스트리밍 처리 시작: {str(state['user_input'])[:50]}...")
+        with GRAPH_LATENCY.time("stream"):
+            async for chunk in self.graph.astream({"deadline": latency_budget.deadline(), **state}, config, stream_mode=stream_mode):
+                yield chunk
+
 graph = TimedGraph(original_graph)
\ No newline at end of file